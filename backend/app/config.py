@@ -8,14 +8,86 @@ class Settings(BaseSettings):
     openai_model: str = "gpt-3.5-turbo"
     openai_embedding_model: str = "text-embedding-3-small"
 
+    # Embeddings
+    embedding_provider: str = "openai"  # "openai" (openai_embedding_model) or "local" (offline hashed n-grams, for tests/benchmarks)
+    local_embedding_dim: int = 384  # Vector size of the local provider
+
     # RAG Settings
     chunk_size: int = 1000
     chunk_overlap: int = 200
     retrieval_top_k: int = 3
+    text_splitter: str = "recursive"  # "recursive" (LangChain, characters) or "hebrew" (native, tokens)
+    chunk_size_tokens: int = 300  # Used by the "hebrew" splitter
+    chunk_overlap_tokens: int = 60
+    tokenizer_encoding: str = "cl100k_base"  # Tokenizer of the text-embedding-3 models
+    rag_backend: str = "full"  # "full" (RAGService) or "lite" (exact FAISS + chunk store, no LangChain on the query path)
+    retrieval_mode: str = "vector"  # "vector" or "hybrid" (BM25 + vectors, reciprocal rank fusion)
+    lexical_candidates: int = 20  # BM25 / vector hits fused per query in hybrid mode
+    rrf_k: int = 60  # Reciprocal rank fusion constant
+    lexical_fast_path: bool = True  # Hybrid mode: answer from BM25 alone, without embedding, when it is decisive
+    lexical_fast_path_max_terms: int = 3  # Only queries this short qualify
+    lexical_fast_path_margin: float = 1.5  # Top BM25 score must beat the runner-up by this factor
+    filter_exact_max: int = 20000  # HNSW/IVF: filters matching at most this many chunks are scored exactly instead
+    context_token_budget: int = 0  # Pack merged hits into this many tokens instead of joining top_k (0 = off)
+    context_candidates: int = 12  # Hits retrieved for packing
+    context_min_relevance: float = 0.0  # Drop hits below this relevance (0..1) before packing
+
+    # Ingestion
+    ingest_workers: int = 0  # Parser processes for directory loads (0 = one per CPU core)
+    ingest_queue_size: int = 8  # Parsed files buffered between pipeline stages
+    embedding_batch_size: int = 256  # Chunks per embedding call during ingestion
+    ndjson_max_record_bytes: int = 10_000_000  # Longest line accepted by the streaming NDJSON endpoint
+    upload_max_mb: float = 100  # Largest document upload, and largest unpacked archive (0 = no limit)
+    upload_chunk_kb: int = 1024  # Uploads are copied to disk in chunks of this size
+    upload_max_files: int = 1000  # Most files in one multi-file upload, archive entries included
+    pdf_page_cache: bool = True  # Cache extracted PDF page text by (file hash, page)
+    pdf_page_cache_max_mb: float = 512  # Evict least recently used files from the page cache above this much text (0 = no limit)
+    pdf_page_workers: int = 0  # Processes extracting one large PDF (0 = one per CPU core)
+    pdf_pages_per_task: int = 32  # Pages handed to an extraction worker at a time
+
+    # Query embedding micro-batching
+    query_batch_window_ms: float = 5.0  # Max time a batch of queued query embeddings waits for more (0 = off; a lone query never waits)
+    query_batch_max_size: int = 64  # Max queries per embedding call
+
+    # Query caches (0 = off)
+    query_embedding_cache_size: int = 4096  # Normalized question -> embedding
+    query_result_cache_size: int = 1024  # (question, k, index version) -> retrieval result
+
+    # Startup warm-up (see app.services.warmup)
+    warmup_on_startup: bool = True  # Load the default collection and clients before /ready reports ready
+    warmup_questions: int = 100  # Most frequent recorded questions pre-warmed into the caches (0 = none)
+    warmup_dummy_search: bool = True  # Run one search to page in the index
+    question_log_size: int = 1000  # Questions whose frequency is recorded per collection (0 = off)
+
+    # Vector index
+    faiss_index_type: str = "flat"  # "flat" (exact), "hnsw" or "ivf"
+    faiss_hnsw_m: int = 32  # Graph neighbours per node
+    faiss_hnsw_ef_construction: int = 200
+    faiss_hnsw_ef_search: int = 64  # Default search breadth, can be overridden per query
+    faiss_ivf_nlist: int = 0  # k-means cells (0 = 4 * sqrt(corpus size))
+    faiss_ivf_nprobe: int = 8  # Default cells visited per query, can be overridden per query
+    faiss_quantization: str = "none"  # "none" (float32), "fp16", "sq8" (int8) or "pq"
+    faiss_pq_m: int = 0  # PQ bytes per vector (0 = dim / 4, 16x smaller than float32)
+    faiss_rerank_factor: int = 0  # Re-rank k * factor candidates with exact vectors from disk (0 = off)
+    faiss_search_dimensions: int = 0  # Index only the first N dims, re-rank at full dim (0 = full; text-embedding-3 only)
+    faiss_min_train_factor: int = 39  # Stay exact until the corpus is this many times the training need
+    faiss_retrain_growth: float = 4.0  # Retrain once the corpus has grown this many times
 
     # ChromaDB
     chroma_persist_directory: str = "./data/chroma_db"
-    collection_name: str = "documents"
+    collection_name: str = "documents"  # Default collection; others live under <persist directory>/collections/
+    collection_memory_budget_mb: float = 0  # Evict least recently used collections above this much RAM (0 = no limit)
+
+    # Sharding
+    shard_count: int = 0  # Split each collection's index across this many worker processes (0 = in-process)
+    shard_omp_threads: int = 1  # FAISS threads per shard worker
+    shard_timeout_seconds: float = 30  # Searches skip a shard that takes longer than this
+
+    # Embedding model migration
+    migration_batch_size: int = 256  # Chunks per embedding call while re-embedding
+    migration_concurrency: int = 2  # Embedding calls in flight at once
+    migration_max_chunks_per_second: float = 0  # Re-embedding rate limit, to stay under API quotas (0 = none)
+    migration_keep_previous_hours: float = 24  # Rollback window after a switch (0 = until discarded)
 
     # Email Settings (Gmail SMTP)
     smtp_email: str = ""  # Your Gmail address
@@ -1,14 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.routers import chat_router, documents_router, prompts_router
 from app.config import get_settings
+from app.services.warmup import get_readiness, save_question_logs, warm_up
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background: /health answers at once, /ready once warm
+    task = None
+    if settings.warmup_on_startup:
+        task = asyncio.create_task(asyncio.to_thread(warm_up))
+    else:
+        get_readiness().mark_ready()
+    yield
+    if task is not None and not task.done():
+        await task
+    save_question_logs()
+
+
 app = FastAPI(
     title="SmartSupport AI API",
     description="AI-powered chat API with RAG capabilities",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware - allow frontend to connect
@@ -36,6 +56,7 @@ async def root():
         "message": "SmartSupport AI API",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
     }
 
 
@@ -44,6 +65,16 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Ready once the index and clients are loaded and the caches warmed
+    (503 until then), with the time each warm-up step took.
+    """
+    status = get_readiness().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 if __name__ == "__main__":
     import uvicorn
 
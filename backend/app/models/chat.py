@@ -19,6 +19,7 @@ class ChatRequest(BaseModel):
     use_rag: bool = True  # Whether to use RAG for context
     prompt_key: str = "default"  # Which system prompt to use
     use_tools: bool = True  # Whether to enable agent tools (function calling)
+    collection: Optional[str] = None  # Knowledge base collection to search (None = default collection)
 
 
 class ToolCall(BaseModel):
@@ -1,12 +1,18 @@
+import asyncio
 from fastapi import APIRouter, HTTPException
 from app.models import ChatRequest, ChatResponse
+from app.services.collections import get_collection_manager
 from app.services.openai_service import get_openai_service
-from app.services.rag_service import get_rag_service
 from app.prompts import get_prompt_by_key
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
+def _query_collection(collection: str | None, question: str) -> tuple[str, list[str]]:
+    """Query a collection, loading it first if it is cold (blocking, run in a worker thread)."""
+    return get_collection_manager().get(collection).query(question)
+
+
 @router.post("", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """
@@ -19,7 +25,12 @@ async def chat(request: ChatRequest) -> ChatResponse:
     `search_knowledge_base` tool and can decide when to use it based on intent.
 
     If use_rag is True AND use_tools is False, RAG context is automatically injected (legacy mode).
+
+    collection selects the knowledge base to search (default collection when omitted).
     """
+    if request.use_rag and request.collection and not get_collection_manager().exists(request.collection):
+        raise HTTPException(status_code=404, detail=f"Collection not found: {request.collection}")
+
     try:
         openai_service = get_openai_service()
 
@@ -27,7 +38,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
         system_prompt = get_prompt_by_key(request.prompt_key)
         print(f"[PROMPT] Using: {request.prompt_key}")
         print(f"[TOOLS] Enabled: {request.use_tools}")
-        print(f"[RAG] Enabled: {request.use_rag}")
+        print(f"[RAG] Enabled: {request.use_rag}" + (f" (collection: {request.collection})" if request.collection else ""))
 
         # Get AI response - with or without tools
         if request.use_tools:
@@ -37,6 +48,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
                 messages=request.messages,
                 system_prompt=system_prompt,
                 include_rag=request.use_rag,  # Pass RAG toggle to include/exclude the tool
+                collection=request.collection,
             )
 
             # Extract sources from tool calls if knowledge base was searched
@@ -59,13 +71,12 @@ async def chat(request: ChatRequest) -> ChatResponse:
 
             if request.use_rag:
                 try:
-                    rag_service = get_rag_service()
                     # Get the last user message for RAG query
                     user_messages = [m for m in request.messages if m.role.value == "user"]
                     if user_messages:
                         rag_query = user_messages[-1].content
                         print(f"[RAG LEGACY] Query: {rag_query}")
-                        context, sources = rag_service.query(rag_query)
+                        context, sources = await asyncio.to_thread(_query_collection, request.collection, rag_query)
                         print(f"[RAG LEGACY] Found: {len(context) if context else 0} chars")
                 except Exception as e:
                     print(f"[RAG LEGACY] Error: {e}")
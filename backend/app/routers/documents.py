@@ -1,9 +1,27 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+import asyncio
+import time
+from typing import TYPE_CHECKING
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from app.services.rag_service import get_rag_service
+from starlette.background import BackgroundTask
+from app.services.collections import CollectionNotFoundError, get_collection_manager
+from app.services.ndjson_ingest import ingest_ndjson, jobs
+from app.services.ingestion import SUPPORTED_EXTENSIONS
+from app.services.uploads import (
+    ARCHIVE_EXTENSIONS,
+    UploadTooLargeError,
+    extract_archive,
+    max_upload_bytes,
+    save_upload,
+)
+from app.config import get_settings
 import tempfile
 import os
 
+if TYPE_CHECKING:
+    from app.services.rag_service import RAGService
+
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
@@ -21,19 +39,127 @@ class AddTextResponse(BaseModel):
     message: str
 
 
+class UploadManyResponse(BaseModel):
+    chunks_added: int
+    files: dict[str, int]
+    failed: list[str]
+    errors: dict[str, str]
+    skipped: list[str]
+    elapsed_seconds: float
+    message: str
+
+
+class SyncDirectoryResponse(BaseModel):
+    added: list[str]
+    updated: list[str]
+    removed: list[str]
+    failed: list[str]
+    errors: dict[str, str]
+    unchanged: int
+    chunks_added: int
+    chunks_removed: int
+    elapsed_seconds: float
+
+
+class CollectionInfo(BaseModel):
+    name: str
+    loaded: bool
+    memory_bytes: int
+
+
+class CollectionsResponse(BaseModel):
+    memory_budget_bytes: int
+    resident_bytes: int
+    loads: int
+    evictions: int
+    collections: list[CollectionInfo]
+
+
 class StatsResponse(BaseModel):
     total_documents: int
     collection_name: str
+    index_type: str
+    quantization: str
+    index_memory_bytes: int
+    vectors_on_disk_bytes: int
+    search_dimensions: int
+    vector_dimensions: int
+    embedding_batcher: dict | None = None
+    index_version: int = 0
+    retrieval_mode: str = "vector"
+    lexical_fast_path_queries: int = 0
+    query_cache: dict | None = None
+    recall: dict | None = None
+    shards: list[dict] | None = None
+
+class NDJSONIngestResponse(BaseModel):
+    id: str
+    collection: str
+    state: str
+    bytes_read: int
+    records: int
+    chunks_added: int
+    invalid_records: int
+    errors: dict[int, str]
+    error: str | None = None
+    started_at: float
+    finished_at: float | None = None
+    records_per_second: float
+
+
+class SnapshotImportResponse(BaseModel):
+    chunks: int
+    embedding_model: str
+    message: str
+
+
+class MigrationRequest(BaseModel):
+    model: str
+    concurrency: int | None = None
+    max_chunks_per_second: float | None = None
+
+
+class MigrationStatus(BaseModel):
+    collection: str
+    embedding_model: str
+    state: str
+    from_model: str | None = None
+    to_model: str | None = None
+    total_chunks: int = 0
+    embedded_chunks: int = 0
+    progress: float | None = None
+    chunks_per_second: float | None = None
+    eta_seconds: float | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    previous: dict | None = None
+
+
+def _collection_service(collection: str | None, create: bool = False) -> "RAGService":
+    """
+    The service of the requested collection (None = the default one).
+
+    Writes create the collection on first use; everything else returns 404
+    for an unknown collection. Loading a cold collection reads its index
+    from disk, so handlers call this in a worker thread.
+    """
+    try:
+        return get_collection_manager().get(collection, create=create)
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/add-text", response_model=AddTextResponse)
-async def add_text(request: AddTextRequest) -> AddTextResponse:
+async def add_text(request: AddTextRequest, collection: str | None = None) -> AddTextResponse:
     """
     Add raw text to the knowledge base.
     """
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
     try:
-        rag_service = get_rag_service()
-        chunks_added = rag_service.add_texts(request.texts, request.metadatas)
+        chunks_added = await asyncio.to_thread(rag_service.add_texts, request.texts, request.metadatas)
 
         return AddTextResponse(
             chunks_added=chunks_added,
@@ -43,72 +169,152 @@ async def add_text(request: AddTextRequest) -> AddTextResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/add-ndjson", response_model=NDJSONIngestResponse)
+async def add_ndjson(request: Request, collection: str | None = None, job_id: str | None = None) -> NDJSONIngestResponse:
+    """
+    Stream newline-delimited JSON records ({"text": ..., "metadata": {...}}
+    per line) into the knowledge base. The body is parsed, split and
+    embedded as it arrives, so memory does not grow with its size.
+
+    Progress is visible under GET /ingestions while the upload runs
+    (pass job_id to pick the id it is reported under).
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
+    try:
+        progress = await ingest_ndjson(rag_service, request.stream(), job_id)
+        return NDJSONIngestResponse(**progress.to_dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/ingestions", response_model=list[NDJSONIngestResponse])
+async def list_ingestions() -> list[NDJSONIngestResponse]:
+    """
+    Progress of running and recent NDJSON imports, newest first.
+    """
+    return [NDJSONIngestResponse(**job) for job in jobs()]
+
+
 @router.post("/upload", response_model=AddTextResponse)
-async def upload_document(file: UploadFile = File(...)) -> AddTextResponse:
+async def upload_document(file: UploadFile = File(...), collection: str | None = None) -> AddTextResponse:
     """
     Upload a document (PDF, TXT, DOCX, MD) to the knowledge base.
     """
-    allowed_extensions = {".pdf", ".txt", ".docx", ".doc", ".md"}
     file_ext = os.path.splitext(file.filename or "")[1].lower()
 
-    if file_ext not in allowed_extensions:
+    if file_ext not in SUPPORTED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
-            detail=f"File type not supported. Allowed: {', '.join(allowed_extensions)}",
+            detail=f"File type not supported. Allowed: {', '.join(sorted(SUPPORTED_EXTENSIONS))}",
         )
 
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
     try:
-        # Save to temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_path = temp_file.name
-
-        try:
-            rag_service = get_rag_service()
-
-            # Load based on file type
-            from langchain_community.document_loaders import (
-                TextLoader,
-                PyPDFLoader,
-                Docx2txtLoader,
-            )
-
-            if file_ext == ".pdf":
-                loader = PyPDFLoader(temp_path)
-            elif file_ext in [".docx", ".doc"]:
-                loader = Docx2txtLoader(temp_path)
-            else:  # .txt, .md
-                loader = TextLoader(temp_path, encoding="utf-8")
+        # Copied to a temp file in chunks, never held in memory whole
+        temp_path = await save_upload(file, file_ext)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        # Pages are streamed into chunking and embedding as they are extracted
+        documents = rag_service.iter_file_documents(temp_path, source=file.filename)
 
-            documents = loader.load()
+        chunks_added = await asyncio.to_thread(rag_service.add_documents, documents)
 
-            # Add source metadata
-            for doc in documents:
-                doc.metadata["source"] = file.filename
+        return AddTextResponse(
+            chunks_added=chunks_added,
+            message=f"Successfully processed '{file.filename}' and added {chunks_added} chunks.",
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Clean up temp file
+        os.unlink(temp_path)
 
-            chunks_added = rag_service.add_documents(documents)
 
-            return AddTextResponse(
-                chunks_added=chunks_added,
-                message=f"Successfully processed '{file.filename}' and added {chunks_added} chunks.",
-            )
-        finally:
-            # Clean up temp file
-            os.unlink(temp_path)
+@router.post("/upload-many", response_model=UploadManyResponse)
+async def upload_many(files: list[UploadFile] = File(...), collection: str | None = None) -> UploadManyResponse:
+    """
+    Upload several documents at once; .zip archives are unpacked. Files are
+    parsed in parallel and embedded in batches, like a directory sync.
+    Unsupported files and archive entries are skipped and listed.
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    upload_max_files and upload_max_mb apply to the whole request: all
+    files, archive entries included, and all bytes written.
+    """
+    settings = get_settings()
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
+    started = time.perf_counter()
+    max_files = settings.upload_max_files
+    max_bytes = max_upload_bytes()
+    written = 0
+    paths: dict[str, str] = {}
+    skipped: list[str] = []
+
+    with tempfile.TemporaryDirectory(prefix="upload-") as directory:
+        try:
+            for file in files:
+                name = file.filename or "upload"
+                file_ext = os.path.splitext(name)[1].lower()
+                if file_ext not in ARCHIVE_EXTENSIONS and file_ext not in SUPPORTED_EXTENSIONS:
+                    skipped.append(name)
+                    continue
+                # Checked before every part, so a full count can never reach extract_archive as 0 (= no limit)
+                if max_files and len(paths) >= max_files:
+                    raise ValueError(f"More than {max_files} files in one upload")
+                if max_bytes and written >= max_bytes:
+                    raise UploadTooLargeError(f"The upload is larger than {max_bytes // 2**20} MB in total")
+                # What is left of the byte budget (save_upload and extract_archive take 0 as no limit)
+                remaining = max_bytes - written if max_bytes else 0
+                try:
+                    path = await save_upload(file, file_ext, directory, max_bytes=remaining)
+                    if file_ext in ARCHIVE_EXTENSIONS:
+                        extracted, archive_skipped = await asyncio.to_thread(
+                            extract_archive,
+                            path,
+                            name,
+                            directory,
+                            SUPPORTED_EXTENSIONS,
+                            max_files and max_files - len(paths),
+                            remaining,
+                        )
+                        os.unlink(path)
+                        paths.update(extracted)
+                        skipped.extend(archive_skipped)
+                        written += sum(os.path.getsize(extracted_path) for extracted_path in extracted)
+                    else:
+                        paths[path] = name
+                        written += os.path.getsize(path)
+                except UploadTooLargeError as e:
+                    if not written:
+                        raise
+                    raise UploadTooLargeError(f"The upload is larger than {max_bytes // 2**20} MB in total") from e
+
+            summary = await asyncio.to_thread(rag_service.add_files, paths)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return UploadManyResponse(
+        **summary,
+        skipped=skipped,
+        elapsed_seconds=round(time.perf_counter() - started, 3),
+        message=f"Processed {len(summary['files'])} files and added {summary['chunks_added']} chunks.",
+    )
 
 
 @router.post("/load-directory", response_model=AddTextResponse)
-async def load_directory(request: LoadDirectoryRequest) -> AddTextResponse:
+async def load_directory(request: LoadDirectoryRequest, collection: str | None = None) -> AddTextResponse:
     """
     Load all documents from a directory into the knowledge base.
     """
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
     try:
-        rag_service = get_rag_service()
-        chunks_added = rag_service.load_directory(request.directory_path)
+        chunks_added = await asyncio.to_thread(rag_service.load_directory, request.directory_path)
 
         return AddTextResponse(
             chunks_added=chunks_added,
@@ -120,29 +326,264 @@ async def load_directory(request: LoadDirectoryRequest) -> AddTextResponse:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/sync-directory", response_model=SyncDirectoryResponse)
+async def sync_directory(request: LoadDirectoryRequest, collection: str | None = None) -> SyncDirectoryResponse:
+    """
+    Incrementally sync a directory: only new or modified files are embedded,
+    and chunks of files that were removed from the directory are deleted.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
+    try:
+        summary = await asyncio.to_thread(rag_service.sync_directory, request.directory_path)
+
+        return SyncDirectoryResponse(**summary)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/stats", response_model=StatsResponse)
-async def get_stats() -> StatsResponse:
+async def get_stats(include_recall: bool = False, collection: str | None = None) -> StatsResponse:
     """
     Get statistics about the knowledge base.
+
+    With include_recall=true, also estimates recall@10 of the (possibly
+    quantized) index against exact search.
     """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
     try:
-        rag_service = get_rag_service()
-        stats = rag_service.get_collection_stats()
+        # The recall estimate is a brute-force pass over the vector file; shards answer over pipes
+        stats = await asyncio.to_thread(rag_service.get_collection_stats, include_recall=include_recall)
 
         return StatsResponse(**stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/filters")
+async def get_filters(collection: str | None = None) -> dict[str, list[str]]:
+    """
+    Values that searches can be filtered by, per metadata field
+    (source, doc_type, language, date).
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    try:
+        return await asyncio.to_thread(rag_service.filter_values)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/clear")
-async def clear_documents():
+async def clear_documents(collection: str | None = None):
     """
     Clear all documents from the knowledge base.
     """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
     try:
-        rag_service = get_rag_service()
-        rag_service.clear_collection()
+        await asyncio.to_thread(rag_service.clear_collection)
 
         return {"message": "Knowledge base cleared successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/snapshot")
+async def export_snapshot(collection: str | None = None) -> FileResponse:
+    """
+    Download the collection as one snapshot file (FAISS index, vectors,
+    chunk store and manifest) that POST /snapshot loads on another node.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    fd, path = tempfile.mkstemp(suffix=".tar")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(rag_service.export_snapshot, path)
+    except ValueError as e:
+        os.unlink(path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        os.unlink(path)
+        raise HTTPException(status_code=500, detail=str(e))
+    return FileResponse(
+        path,
+        media_type="application/x-tar",
+        filename=f"{rag_service.collection}-snapshot.tar",
+        background=BackgroundTask(os.unlink, path),
+    )
+
+
+@router.post("/snapshot", response_model=SnapshotImportResponse)
+async def import_snapshot(
+    file: UploadFile = File(...), collection: str | None = None, replace: bool = False
+) -> SnapshotImportResponse:
+    """
+    Load a snapshot file into the collection without calling the embedding
+    API. A collection with documents is only overwritten with replace=true.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
+    # Snapshots and vector imports are bulk transfers, exempt from upload_max_mb
+    path = await save_upload(file, ".tar", max_bytes=0)
+    try:
+        header = await asyncio.to_thread(rag_service.import_snapshot, path, replace)
+        return SnapshotImportResponse(
+            chunks=header["chunks"],
+            embedding_model=header["embedding_model"],
+            message=f"Imported {header['chunks']} chunks from '{file.filename}'.",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.unlink(path)
+
+
+@router.post("/import-vectors", response_model=AddTextResponse)
+async def import_vectors(
+    vectors: UploadFile = File(...),
+    records: UploadFile = File(...),
+    model: str | None = Form(None),
+    collection: str | None = None,
+) -> AddTextResponse:
+    """
+    Add chunks with precomputed embeddings: a .npy matrix (one row per
+    chunk) and a JSONL file of {"text", "metadata", "id"} records in the
+    same order. The embedding API is not called.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection, create=True)
+    vectors_path = await save_upload(vectors, ".npy", max_bytes=0)
+    records_path = await save_upload(records, ".jsonl", max_bytes=0)
+    try:
+        chunks_added = await asyncio.to_thread(rag_service.import_vectors, vectors_path, records_path, model)
+        return AddTextResponse(
+            chunks_added=chunks_added,
+            message=f"Successfully imported {chunks_added} precomputed embeddings.",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.unlink(vectors_path)
+        os.unlink(records_path)
+
+
+@router.post("/migration", response_model=MigrationStatus)
+async def start_migration(request: MigrationRequest, collection: str | None = None) -> MigrationStatus:
+    """
+    Start re-embedding the collection with another embedding model. Queries
+    keep using the current index until the new one is complete, then both
+    are switched at once.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    try:
+        return MigrationStatus(
+            **rag_service.migration.start(request.model, request.concurrency, request.max_chunks_per_second)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/migration", response_model=MigrationStatus)
+async def get_migration(collection: str | None = None) -> MigrationStatus:
+    """
+    Progress of the running (or last) migration, and the previous index
+    that can be rolled back to.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    try:
+        return MigrationStatus(**await asyncio.to_thread(rag_service.migration.status))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/migration", response_model=MigrationStatus)
+async def cancel_migration(collection: str | None = None) -> MigrationStatus:
+    """
+    Cancel a migration that has not switched yet.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    try:
+        await asyncio.to_thread(rag_service.migration.cancel)
+        return MigrationStatus(**await asyncio.to_thread(rag_service.migration.status))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/migration/rollback", response_model=MigrationStatus)
+async def rollback_migration(collection: str | None = None) -> MigrationStatus:
+    """
+    Switch back to the index and embedding model in use before the last
+    switch. Writes made since then are re-embedded into it first.
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    try:
+        return MigrationStatus(**await asyncio.to_thread(rag_service.migration.rollback))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/migration/previous")
+async def discard_previous_index(collection: str | None = None):
+    """
+    Delete the index kept for rollback (this ends the rollback window).
+    """
+    rag_service = await asyncio.to_thread(_collection_service, collection)
+    try:
+        discarded = await asyncio.to_thread(rag_service.migration.discard_previous)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not discarded:
+        raise HTTPException(status_code=404, detail="There is no previous index.")
+    return {"message": "Previous index discarded."}
+
+
+@router.get("/collections", response_model=CollectionsResponse)
+async def list_collections() -> CollectionsResponse:
+    """
+    List collections, which of them are loaded and the RAM they hold.
+
+    Every endpoint above takes a ?collection=<name> parameter (default
+    collection when omitted).
+    """
+    try:
+        return CollectionsResponse(**await asyncio.to_thread(get_collection_manager().stats))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/collections/{name}")
+async def create_collection(name: str):
+    """
+    Create an empty collection. Adding documents to an unknown collection
+    also creates it.
+    """
+    await asyncio.to_thread(_collection_service, name, create=True)
+    return {"message": f"Collection '{name}' is ready."}
+
+
+@router.delete("/collections/{name}")
+async def delete_collection(name: str):
+    """
+    Delete a collection with all its documents and files.
+    """
+    try:
+        await asyncio.to_thread(get_collection_manager().delete, name)
+        return {"message": f"Collection '{name}' deleted."}
+    except CollectionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
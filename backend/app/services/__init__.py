@@ -1,4 +1,15 @@
-from .openai_service import OpenAIService
-from .rag_service import RAGService
+# Re-exported lazily: importing the package must not load openai, FAISS and LangChain
+_EXPORTS = {
+    "OpenAIService": "app.services.openai_service",
+    "RAGService": "app.services.rag_service",
+}
 
 __all__ = ["OpenAIService", "RAGService"]
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        import importlib
+
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
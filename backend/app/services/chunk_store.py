@@ -0,0 +1,345 @@
+"""
+On-disk chunk store.
+
+Replaces LangChain's pickled InMemoryDocstore. Chunk text is stored
+zlib-compressed in SQLite, one row per chunk, and only the rows of the top-k
+hits of a query are ever read. Startup cost is opening the database and
+loading the position array, independent of how much text is indexed.
+
+FAISS positions map to SQLite rowids through a plain int64 array
+(positions.npy) that is held in memory - 8 bytes per chunk. Deleting chunks
+compacts the array the same way FAISS compacts the index, so the two always
+line up.
+
+Writes are buffered in one SQLite transaction until save(), which commits it
+together with the position array, so the store never runs ahead of the
+FAISS index saved next to it.
+
+The same database holds an FTS5 full-text index of every chunk (Hebrew-aware
+terms from app.services.lexical), ranked with BM25. It lives in the same
+transactions as the chunks, so adds and deletes keep it in sync for free.
+
+Filterable metadata tags (app.services.metadata_filter) are stored in a
+chunk_tags table in the same way. On the first filtered search they are
+loaded into one sorted rowid array per (field, value); a filter becomes a
+boolean bitmap over positions, cached until the next write.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+import numpy as np
+from langchain_core.documents import Document
+from app.services.lexical import index_terms, match_expression
+from app.services.metadata_filter import MetadataFilter, filter_tags
+
+# Filter bitmaps kept until the next write (one byte per chunk each)
+_MAX_CACHED_MASKS = 32
+
+
+class ChunkStore:
+    def __init__(self, directory: str):
+        self.db_path = os.path.join(directory, "chunks.sqlite")
+        self.positions_path = os.path.join(directory, "positions.npy")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # One connection shared by request threads, serialized by the lock
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level="DEFERRED")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " rowid INTEGER PRIMARY KEY,"
+            " id TEXT NOT NULL UNIQUE,"
+            " source TEXT,"
+            " text BLOB NOT NULL,"
+            " metadata TEXT NOT NULL)"
+        )
+        # Terms are pre-normalized, unicode61 only has to split them on spaces
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(terms, tokenize='unicode61 remove_diacritics 0')"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_tags ("
+            " field TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " chunk INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunk_tags_chunk ON chunk_tags (chunk)")
+        self._conn.commit()
+        self._backfill_lexical_index()
+        self._backfill_tags()
+        # (field, value) -> sorted rowids, loaded on the first filtered search
+        self._tags: dict[tuple[str, str], np.ndarray] | None = None
+        self._masks: OrderedDict[MetadataFilter, np.ndarray] = OrderedDict()
+        if os.path.exists(self.positions_path):
+            self._rows = np.load(self.positions_path)
+        else:
+            self._rows = np.empty(0, dtype=np.int64)
+        self._next_rowid = (self._conn.execute("SELECT MAX(rowid) FROM chunks").fetchone()[0] or 0) + 1
+
+    def _backfill_lexical_index(self):
+        """Index chunks stored before the full-text index existed."""
+        indexed = self._conn.execute("SELECT COUNT(*) FROM chunks_fts").fetchone()[0]
+        total = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        if indexed == total:
+            return
+        self._conn.execute("DELETE FROM chunks_fts")
+        rows = self._conn.execute("SELECT rowid, text FROM chunks")
+        self._conn.executemany(
+            "INSERT INTO chunks_fts (rowid, terms) VALUES (?, ?)",
+            ((rowid, index_terms(zlib.decompress(text).decode("utf-8"))) for rowid, text in rows.fetchall()),
+        )
+        self._conn.commit()
+        print(f"[RAG] Built full-text index over {total} chunks")
+
+    def _backfill_tags(self):
+        """Tag chunks stored before metadata filtering existed."""
+        if self._conn.execute("SELECT EXISTS (SELECT 1 FROM chunk_tags)").fetchone()[0]:
+            return
+        rows = self._conn.execute("SELECT rowid, metadata FROM chunks").fetchall()
+        if not rows:
+            return
+        self._conn.executemany(
+            "INSERT INTO chunk_tags (field, value, chunk) VALUES (?, ?, ?)",
+            self._tag_rows((rowid, json.loads(metadata)) for rowid, metadata in rows),
+        )
+        self._conn.commit()
+        print(f"[RAG] Tagged {len(rows)} chunks for metadata filtering")
+
+    @staticmethod
+    def _tag_rows(chunks):
+        """(field, value, rowid) rows for (rowid, metadata) pairs."""
+        for rowid, metadata in chunks:
+            for field, value in filter_tags(metadata).items():
+                yield field, value, int(rowid)
+
+    def memory_bytes(self) -> int:
+        """RAM held by the position array, loaded tag sets and cached filter bitmaps."""
+        total = self._rows.nbytes + sum(mask.nbytes for mask in self._masks.values())
+        if self._tags is not None:
+            total += sum(rowids.nbytes for rowids in self._tags.values())
+        return total
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, ids: list[str], documents: list[Document]):
+        """Append chunks at the next positions (the order they were added to the index)."""
+        rowids = np.arange(self._next_rowid, self._next_rowid + len(ids), dtype=np.int64)
+        rows = [
+            (
+                int(rowid),
+                chunk_id,
+                doc.metadata.get("source"),
+                zlib.compress(doc.page_content.encode("utf-8")),
+                json.dumps(doc.metadata, ensure_ascii=False),
+            )
+            for rowid, chunk_id, doc in zip(rowids, ids, documents)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO chunks (rowid, id, source, text, metadata) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.executemany(
+                "INSERT INTO chunks_fts (rowid, terms) VALUES (?, ?)",
+                [(int(rowid), index_terms(doc.page_content)) for rowid, doc in zip(rowids, documents)],
+            )
+            tags = list(self._tag_rows(zip(rowids, (doc.metadata for doc in documents))))
+            self._conn.executemany("INSERT INTO chunk_tags (field, value, chunk) VALUES (?, ?, ?)", tags)
+            if self._tags is not None:
+                grouped: dict[tuple[str, str], list[int]] = {}
+                for field, value, rowid in tags:
+                    grouped.setdefault((field, value), []).append(rowid)
+                for key, new in grouped.items():
+                    # New rowids are larger than all existing ones, so the arrays stay sorted
+                    self._tags[key] = np.concatenate([self._tags.get(key, np.empty(0, dtype=np.int64)), new])
+            self._masks.clear()
+            self._rows = np.concatenate([self._rows, rowids])
+            self._next_rowid += len(ids)
+
+    def get(self, positions: list[int] | np.ndarray) -> list[Document]:
+        """Chunks at the given index positions, in the same order."""
+        return [Document(page_content=text, metadata=metadata) for text, metadata in self.get_rows(positions)]
+
+    def get_rows(self, positions: list[int] | np.ndarray) -> list[tuple[str, dict]]:
+        """(text, metadata) of the chunks at the given index positions, without building Documents."""
+        rowids = [int(self._rows[p]) for p in positions]
+        if not rowids:
+            return []
+        placeholders = ",".join("?" * len(rowids))
+        with self._lock:
+            found = {
+                rowid: (zlib.decompress(text).decode("utf-8"), json.loads(metadata))
+                for rowid, text, metadata in self._conn.execute(
+                    f"SELECT rowid, text, metadata FROM chunks WHERE rowid IN ({placeholders})", rowids
+                )
+            }
+        return [found[rowid] for rowid in rowids]
+
+    def ids(self) -> list[str]:
+        """Every chunk id, in position order."""
+        with self._lock:
+            rows = self._rows
+            by_rowid = dict(self._conn.execute("SELECT rowid, id FROM chunks"))
+        return [by_rowid[int(rowid)] for rowid in rows]
+
+    def get_by_ids(self, ids: list[str]) -> dict[str, Document]:
+        """Chunks by id. Unknown ids are left out."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for chunk_id, text, metadata in self._conn.execute(
+                    f"SELECT id, text, metadata FROM chunks WHERE id IN ({placeholders})", batch
+                ):
+                    found[chunk_id] = Document(
+                        page_content=zlib.decompress(text).decode("utf-8"),
+                        metadata=json.loads(metadata),
+                    )
+        return found
+
+    def positions_of(self, ids: list[str]) -> np.ndarray:
+        """Sorted index positions of the given chunk ids. Unknown ids are ignored."""
+        return np.array(sorted(self.positions_by_id(ids).values()), dtype=np.int64)
+
+    def positions_by_id(self, ids: list[str]) -> dict[str, int]:
+        """Index position of each of the given chunk ids. Unknown ids are left out."""
+        if not ids:
+            return {}
+        with self._lock:
+            rowid_of = {}
+            for start in range(0, len(ids), 500):
+                batch = ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rowid_of.update(self._conn.execute(f"SELECT id, rowid FROM chunks WHERE id IN ({placeholders})", batch))
+            rows = self._rows
+        positions = np.flatnonzero(np.isin(rows, np.fromiter(rowid_of.values(), dtype=np.int64, count=len(rowid_of))))
+        position_of = {int(rows[p]): int(p) for p in positions}
+        return {chunk_id: position_of[rowid] for chunk_id, rowid in rowid_of.items() if rowid in position_of}
+
+    def filter_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        """
+        Boolean bitmap over index positions of the chunks matching a filter.
+
+        Built from the per-value rowid sets and cached until the next write;
+        the returned array must not be modified.
+        """
+        with self._lock:
+            mask = self._masks.get(metadata_filter)
+            if mask is not None:
+                self._masks.move_to_end(metadata_filter)
+                return mask
+
+            tags = self._load_tags()
+            mask = np.ones(len(self._rows), dtype=bool)
+            for field in metadata_filter.fields():
+                matching = [rowids for (f, value), rowids in tags.items() if f == field and metadata_filter.accepts(f, value)]
+                field_mask = np.zeros(len(self._rows), dtype=bool)
+                if matching:
+                    # Every tagged rowid is live, so searchsorted finds its exact position
+                    field_mask[np.searchsorted(self._rows, np.concatenate(matching))] = True
+                mask &= field_mask
+
+            self._masks[metadata_filter] = mask
+            while len(self._masks) > _MAX_CACHED_MASKS:
+                self._masks.popitem(last=False)
+            return mask
+
+    def _load_tags(self) -> dict[tuple[str, str], np.ndarray]:
+        """Per-value rowid sets, read from chunk_tags once (caller holds the lock)."""
+        if self._tags is None:
+            grouped: dict[tuple[str, str], list[int]] = {}
+            for field, value, rowid in self._conn.execute("SELECT field, value, chunk FROM chunk_tags"):
+                grouped.setdefault((field, value), []).append(rowid)
+            self._tags = {key: np.sort(np.array(rowids, dtype=np.int64)) for key, rowids in grouped.items()}
+        return self._tags
+
+    def tag_values(self) -> dict[str, list[str]]:
+        """Distinct values of every filterable field."""
+        with self._lock:
+            keys = sorted(self._load_tags())
+        values: dict[str, list[str]] = {}
+        for field, value in keys:
+            values.setdefault(field, []).append(value)
+        return values
+
+    def search_lexical(self, terms: list[str], k: int, mask: np.ndarray | None = None) -> list[tuple[int, float]]:
+        """
+        BM25 top-k over the full-text index.
+
+        Args:
+            terms: Query terms (see lexical.query_terms)
+            k: Hits to return
+            mask: Only return chunks whose position is set (see filter_mask)
+
+        Returns:
+            (position, score) pairs, best first; higher scores are better
+        """
+        if not terms:
+            return []
+        sql = "SELECT rowid, bm25(chunks_fts) FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY bm25(chunks_fts)"
+        hits = []
+        with self._lock:
+            if mask is None:
+                rows = self._conn.execute(sql + " LIMIT ?", (match_expression(terms), k)).fetchall()
+            else:
+                # BM25 ordering scores every match anyway; read ranked rows until k pass the filter
+                rows = []
+                for rowid, score in self._conn.execute(sql, (match_expression(terms),)):
+                    if mask[np.searchsorted(self._rows, rowid)]:
+                        rows.append((rowid, score))
+                        if len(rows) == k:
+                            break
+        # Rowids only grow and deletes keep order, so the position array is sorted
+        positions = np.searchsorted(self._rows, [rowid for rowid, _ in rows])
+        return [(int(position), -score) for position, (_, score) in zip(positions, rows)]
+
+    def delete(self, positions: np.ndarray):
+        """Remove chunks by position; later positions shift down like FAISS remove_ids."""
+        rowids = self._rows[positions].tolist()
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE rowid = ?", [(r,) for r in rowids])
+            self._conn.executemany("DELETE FROM chunks_fts WHERE rowid = ?", [(r,) for r in rowids])
+            self._conn.executemany("DELETE FROM chunk_tags WHERE chunk = ?", [(r,) for r in rowids])
+            if self._tags is not None:
+                removed = np.array(rowids, dtype=np.int64)
+                self._tags = {key: kept for key, ids in self._tags.items() if len(kept := ids[~np.isin(ids, removed)])}
+            self._masks.clear()
+            self._rows = np.delete(self._rows, positions)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM chunks_fts")
+            self._conn.execute("DELETE FROM chunk_tags")
+            self._conn.commit()
+            self._tags = None
+            self._masks.clear()
+            self._rows = np.empty(0, dtype=np.int64)
+            if os.path.exists(self.positions_path):
+                os.remove(self.positions_path)
+
+    def save(self):
+        """Commit pending writes and persist the position array."""
+        with self._lock:
+            self._conn.commit()
+            tmp_path = self.positions_path + ".tmp.npy"
+            np.save(tmp_path, self._rows)
+            os.replace(tmp_path, self.positions_path)
+
+    def backup(self, path: str):
+        """Consistent copy of the committed database to path (see save)."""
+        with self._lock:
+            target = sqlite3.connect(path)
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,199 @@
+"""
+Named collections - separate knowledge bases (per region, product line,
+language) under one persist directory:
+
+    <persist_directory>/                 default collection (settings.collection_name)
+    <persist_directory>/collections/<name>/   every other collection
+
+Each collection is a RAGService with its own index, chunk store, vector file
+and manifest. The embedding client, query micro-batcher, query embedding
+cache and PDF page cache are shared, since they do not depend on the index.
+
+Collections are loaded on first use. When the loaded ones hold more RAM than
+collection_memory_budget_mb, the least recently used are evicted (dropped
+from memory; their files stay on disk and they are reloaded on next use).
+A collection that is being written is never evicted, and the one just
+requested always stays, even if it alone exceeds the budget.
+"""
+
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.services.rag_service import RAGService
+
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+class CollectionNotFoundError(ValueError):
+    pass
+
+
+def _service_class(backend: str) -> type:
+    """The service class of a rag_backend setting, imported on first use (it loads FAISS and NumPy)."""
+    if backend == "full":
+        from app.services.rag_service import RAGService
+
+        return RAGService
+    if backend == "lite":
+        from app.services.lite_rag import LiteRAGService
+
+        return LiteRAGService
+    raise ValueError(f"Unknown rag_backend: {backend}")
+
+
+class CollectionManager:
+    def __init__(self):
+        settings = get_settings()
+        self.root = settings.chroma_persist_directory
+        self.default = settings.collection_name
+        self.memory_budget_bytes = int(settings.collection_memory_budget_mb * 2**20)
+        self._loaded: OrderedDict[str, "RAGService"] = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per collection, so a slow load does not block other collections
+        self._load_locks: dict[str, threading.Lock] = {}
+        # Components every collection reuses, taken from the first one loaded
+        self._shared: dict = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def directory(self, name: str) -> str:
+        if name == self.default:
+            return self.root
+        return os.path.join(self.root, "collections", name)
+
+    def exists(self, name: str) -> bool:
+        return name == self.default or os.path.isdir(self.directory(name))
+
+    def names(self) -> list[str]:
+        """All collections on disk, default first."""
+        collections_dir = os.path.join(self.root, "collections")
+        others = sorted(os.listdir(collections_dir)) if os.path.isdir(collections_dir) else []
+        return [self.default] + [name for name in others if name != self.default and _NAME.match(name)]
+
+    def get(self, name: str | None = None, create: bool = False) -> "RAGService":
+        """
+        The service of a collection, loading it if needed.
+
+        Raises:
+            ValueError: If the name is not a valid collection name
+            CollectionNotFoundError: If the collection does not exist and create is False
+        """
+        name = name or self.default
+        if not _NAME.match(name):
+            raise ValueError(f"Invalid collection name: {name!r} (letters, digits, '-' and '_', up to 64)")
+        with self._lock:
+            service = self._touch(name)
+            if service is not None:
+                return service
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                service = self._touch(name)
+                if service is not None:
+                    return service
+            if not self.exists(name):
+                if not create:
+                    raise CollectionNotFoundError(f"Collection not found: {name}")
+                os.makedirs(self.directory(name), exist_ok=True)
+
+            from app.services.embeddings import configured_model
+
+            service_class = _service_class(get_settings().rag_backend)
+            service = service_class(collection=name, persist_directory=self.directory(name), **self._shared)
+            with self._lock:
+                self._shared = self._shared or {
+                    "embedding_cache": service.embedding_cache,
+                    "pdf_cache": service.pdf_cache,
+                }
+                # Not from a collection migrated to another embedding model
+                if "embeddings" not in self._shared and service.embedding_model == configured_model():
+                    self._shared.update(embeddings=service.embeddings, query_batcher=service.query_batcher)
+                self._loaded[name] = service
+                self.loads += 1
+                self._evict(keep=name)
+            print(f"[RAG] Loaded collection '{name}' ({service.memory_bytes() / 2**20:.1f} MB)")
+            return service
+
+    def loaded(self) -> list["RAGService"]:
+        """Services of the collections currently in memory."""
+        with self._lock:
+            return list(self._loaded.values())
+
+    def _touch(self, name: str) -> "RAGService | None":
+        """Loaded service marked most recently used, or None (caller holds the lock)."""
+        service = self._loaded.get(name)
+        if service is not None:
+            self._loaded.move_to_end(name)
+            # Collections grow as documents are added, so the budget is rechecked on every use
+            self._evict(keep=name)
+        return service
+
+    def _evict(self, keep: str):
+        """Drop least recently used collections until the loaded ones fit the budget (caller holds the lock)."""
+        if self.memory_budget_bytes <= 0:
+            return
+        usage = {name: service.memory_bytes() for name, service in self._loaded.items()}
+        total = sum(usage.values())
+        for name in list(self._loaded):
+            if total <= self.memory_budget_bytes:
+                break
+            if name == keep or self._loaded[name].busy:
+                continue
+            # Requests still holding the service finish normally; its memory is freed after them
+            del self._loaded[name]
+            total -= usage[name]
+            self.evictions += 1
+            print(f"[RAG] Evicted collection '{name}' ({usage[name] / 2**20:.1f} MB)")
+
+    def create(self, name: str) -> "RAGService":
+        return self.get(name, create=True)
+
+    def delete(self, name: str):
+        """
+        Delete a collection and its files.
+
+        Raises:
+            ValueError: For the default collection
+            CollectionNotFoundError: If the collection does not exist
+        """
+        if name == self.default:
+            raise ValueError("The default collection cannot be deleted - clear it instead")
+        service = self.get(name)
+        service.clear_collection()
+        with self._lock:
+            self._loaded.pop(name, None)
+        if service.shards is not None:
+            service.shards.close()
+        shutil.rmtree(self.directory(name), ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            usage = {name: service.memory_bytes() for name, service in self._loaded.items()}
+            return {
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "resident_bytes": sum(usage.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "collections": [
+                    {"name": name, "loaded": name in usage, "memory_bytes": usage.get(name, 0)}
+                    for name in self.names()
+                ],
+            }
+
+
+# Singleton instance
+_collection_manager: CollectionManager | None = None
+
+
+def get_collection_manager() -> CollectionManager:
+    global _collection_manager
+    if _collection_manager is None:
+        _collection_manager = CollectionManager()
+    return _collection_manager
@@ -0,0 +1,160 @@
+"""
+Context packing for retrieved chunks.
+
+Neighbouring chunks of the same document share chunk_overlap characters, so
+joining hits verbatim sends the same text to the LLM twice. Packing:
+
+1. drops hits whose relevance is below a threshold,
+2. merges hits that overlap or touch in the same source (and page) into one
+   passage, using the chunk's start_index when the splitter recorded it and
+   a suffix/prefix text match otherwise,
+3. fills a token budget with passages, most relevant first.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Callable
+from langchain_core.documents import Document
+
+# Merge chunks separated by at most this many characters (typically whitespace the splitter dropped)
+_MAX_GAP = 2
+# Shortest shared text that counts as an overlap when start_index is unknown
+_MIN_TEXT_OVERLAP = 32
+
+
+@dataclass
+class Passage:
+    source: str
+    page: int | None
+    start: int | None
+    end: int | None
+    text: str
+    relevance: float
+    chunks: int = 1
+
+
+def relevance_from_l2(distance: float) -> float:
+    """
+    Map a squared L2 distance between unit vectors (0..4) to a 0..1 relevance,
+    the same way LangChain scores L2 indexes.
+    """
+    return 1.0 - math.sqrt(max(distance, 0.0)) / math.sqrt(2)
+
+
+def _text_overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of a that is a prefix of b (0 if shorter than _MIN_TEXT_OVERLAP)."""
+    probe = b[:_MIN_TEXT_OVERLAP]
+    if len(probe) < _MIN_TEXT_OVERLAP:
+        return 0
+    idx = a.find(probe, max(0, len(a) - len(b)))
+    while idx != -1:
+        if b.startswith(a[idx:]):
+            return len(a) - idx
+        idx = a.find(probe, idx + 1)
+    return 0
+
+
+def _merge(current: Passage, nxt: Passage) -> bool:
+    """Extend current with nxt when they overlap or touch; returns whether they were merged."""
+    if current.start is not None and nxt.start is not None:
+        if nxt.start > current.end + _MAX_GAP:
+            return False
+        # The shared span must hold the same text - guards against unrelated
+        # texts that share a source name (e.g. add_texts without metadata)
+        shared = min(current.end, nxt.end) - nxt.start
+        if shared > 0 and current.text[nxt.start - current.start:][:shared] != nxt.text[:shared]:
+            return False
+        if nxt.end > current.end:
+            tail = nxt.text[max(0, current.end - nxt.start):]
+            # Touching chunks: stand in for the whitespace the splitter dropped
+            # (two characters are almost always a paragraph break)
+            gap = nxt.start - current.end
+            current.text += ("\n\n" if gap == 2 else " " * gap) + tail
+            current.end = nxt.end
+    else:
+        overlap = _text_overlap(current.text, nxt.text)
+        if not overlap:
+            return False
+        current.text += nxt.text[overlap:]
+    current.relevance = max(current.relevance, nxt.relevance)
+    current.chunks += nxt.chunks
+    return True
+
+
+def merge_hits(hits: list[tuple[Document, float]]) -> list[Passage]:
+    """
+    Merge overlapping or adjacent hits of the same source into passages.
+
+    Args:
+        hits: (chunk, relevance) pairs
+
+    Returns:
+        Passages in order of their best relevance
+    """
+    groups: dict[tuple, list[Passage]] = {}
+    for doc, relevance in hits:
+        metadata = doc.metadata
+        start = metadata.get("start_index")
+        if start is not None and start < 0:
+            start = None
+        passage = Passage(
+            source=metadata.get("source", "Unknown"),
+            page=metadata.get("page"),
+            start=start,
+            end=start + len(doc.page_content) if start is not None else None,
+            text=doc.page_content,
+            relevance=relevance,
+        )
+        groups.setdefault((passage.source, passage.page), []).append(passage)
+
+    passages = []
+    for group in groups.values():
+        # Positioned chunks in document order; unpositioned ones keep retrieval order
+        group.sort(key=lambda p: (p.start is None, p.start or 0))
+        merged = [group[0]]
+        for passage in group[1:]:
+            if not _merge(merged[-1], passage):
+                merged.append(passage)
+        passages.extend(merged)
+
+    passages.sort(key=lambda p: p.relevance, reverse=True)
+    return passages
+
+
+def pack_context(
+    hits: list[tuple[Document, float]],
+    token_budget: int,
+    count_tokens: Callable[[str], int],
+    min_relevance: float = 0.0,
+) -> list[Passage]:
+    """
+    Select hits, most relevant first, while their merged passages fit the budget.
+
+    A hit is charged only for the text it adds once merged with the hits
+    already selected, so a neighbour of a selected chunk costs just its
+    non-overlapping part. Hits that do not fit are skipped so smaller, less
+    relevant ones can still use the remaining budget. The best hit is always
+    kept, even when it alone exceeds the budget.
+
+    Args:
+        hits: (chunk, relevance) pairs from retrieval
+        token_budget: Maximum total tokens of the selected passages
+        count_tokens: Token counter of the LLM's tokenizer
+        min_relevance: Hits below this relevance are dropped first (0 = keep all)
+
+    Returns:
+        Merged passages in order of their best relevance
+    """
+    candidates = sorted(
+        ((doc, relevance) for doc, relevance in hits if min_relevance <= 0 or relevance >= min_relevance),
+        key=lambda hit: hit[1],
+        reverse=True,
+    )
+    selected: list[tuple[Document, float]] = []
+    packed: list[Passage] = []
+    for hit in candidates:
+        passages = merge_hits(selected + [hit])
+        if not selected or sum(count_tokens(p.text) for p in passages) <= token_budget:
+            selected.append(hit)
+            packed = passages
+    return packed
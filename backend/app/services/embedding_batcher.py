@@ -0,0 +1,134 @@
+"""
+Micro-batching for query embeddings.
+
+Concurrent requests each embedding one short query would otherwise make one
+HTTP call apiece. A request that finds the queue empty is embedded at once,
+so a lone query pays no batching latency. Under contention (other requests
+already queued, e.g. behind an embedding call in flight) the batcher holds
+the batch for at most max_wait_ms, collects whatever else arrives in that
+window (up to max_batch_size texts), embeds it in one call and hands every
+caller its own vector. Identical texts in a batch are embedded once.
+
+    caller threads -> queue -> batching thread -> embed(batch) -> futures
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable
+import numpy as np
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        embed: Callable[[list[str]], list[list[float]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        history: int = 1024,
+    ):
+        """
+        Args:
+            embed: Function embedding a list of texts (e.g. embed_documents)
+            max_batch_size: Texts sent in one embedding call at most
+            max_wait_ms: How long a batch waits for more requests when others are already queued
+            history: Number of recent batches/requests kept for the metrics
+        """
+        self._embed = embed
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._batch_sizes: deque[int] = deque(maxlen=history)
+        self._added_ms: deque[float] = deque(maxlen=history)
+        self._call_ms: deque[float] = deque(maxlen=history)
+
+    def embed(self, text: str) -> list[float]:
+        """Embed one text, blocking until its batch has been embedded."""
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def _collect(self) -> list[tuple[str, Future, float]]:
+        """
+        Block for the first request and take whatever is already queued. A lone request goes out
+        at once; with company, gather more until the window closes or the batch is full.
+        """
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if len(batch) == 1:
+            return batch
+        deadline = batch[0][2] + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched = time.perf_counter()
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+
+            try:
+                vectors = dict(zip(texts, self._embed(texts)))
+                for text, future, _ in batch:
+                    future.set_result(vectors[text])
+                failed = False
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                failed = True
+
+            call_ms = (time.perf_counter() - dispatched) * 1000
+            with self._metrics_lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._errors += failed
+                self._batch_sizes.append(len(batch))
+                self._call_ms.append(call_ms)
+                # Latency added by batching: time spent queued before the call went out
+                self._added_ms.extend((dispatched - submitted) * 1000 for _, _, submitted in batch)
+
+    def metrics(self) -> dict:
+        """Counters plus batch-size and latency percentiles over recent history."""
+        with self._metrics_lock:
+            sizes = np.array(self._batch_sizes or [0])
+            added = np.array(self._added_ms or [0.0])
+            calls = np.array(self._call_ms or [0.0])
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_ms,
+                "requests": self._requests,
+                "batches": self._batches,
+                "errors": self._errors,
+                "mean_batch_size": round(float(sizes.mean()), 2),
+                "batch_size_p99": float(np.percentile(sizes, 99)),
+                "added_latency_ms_p50": round(float(np.percentile(added, 50)), 2),
+                "added_latency_ms_p99": round(float(np.percentile(added, 99)), 2),
+                "embed_call_ms_p50": round(float(np.percentile(calls, 50)), 2),
+                "embed_call_ms_p99": round(float(np.percentile(calls, 99)), 2),
+            }
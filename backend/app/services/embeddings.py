@@ -0,0 +1,159 @@
+"""
+Embedding providers.
+
+Every embedding client is a LangChain Embeddings (embed_documents /
+embed_query). Which one serves a model is decided by the model name, so the
+name recorded in index_meta.json, the query embedding cache keys and
+migrations work the same for every provider:
+
+    text-embedding-3-small     OpenAI (names without a provider prefix)
+    local:hash-ngram-384       LocalHashEmbeddings, 384 dimensions
+
+settings.embedding_provider picks the model new collections are embedded
+with (see configured_model()); register_provider() adds a provider prefix.
+
+LocalHashEmbeddings is an offline, deterministic CPU embedder for tests,
+benchmarks and air-gapped staging: character 3-5-grams of the normalized
+text are hashed into a fixed number of signed buckets (the "hashing trick"),
+weighted by log term frequency and L2-normalized. Similar wording gives
+similar vectors, Hebrew included, but there is no semantics beyond shared
+character sequences. A batch is embedded with a handful of NumPy operations
+over all its texts at once, with no Python loop per n-gram.
+"""
+
+import re
+import unicodedata
+from typing import Callable
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from app.config import get_settings
+
+LOCAL_PREFIX = "local:"
+_LOCAL_MODEL = re.compile(r"^hash-ngram-(\d+)$")
+
+_providers: dict[str, Callable[[str], Embeddings]] = {}
+
+
+def register_provider(prefix: str, factory: Callable[[str], Embeddings]):
+    """
+    Serve models named "<prefix>:<name>" with factory(name).
+
+    Args:
+        prefix: Provider name, without the colon
+        factory: Builds the embedding client of a model name
+    """
+    _providers[prefix] = factory
+
+
+def create_embeddings(model: str) -> Embeddings:
+    """
+    Embedding client for a model.
+
+    Raises:
+        ValueError: If the model has an unknown provider prefix or an invalid name
+    """
+    prefix, separator, name = model.partition(":")
+    if not separator:
+        # langchain_openai (and openai under it) is the slowest import of the app, so it is loaded on first use
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(openai_api_key=get_settings().openai_api_key, model=model)
+    if prefix not in _providers:
+        raise ValueError(f"Unknown embedding provider '{prefix}' in model {model!r}")
+    return _providers[prefix](name)
+
+
+def configured_model(settings=None) -> str:
+    """
+    The embedding model new collections use, from settings.embedding_provider.
+
+    Raises:
+        ValueError: For an unknown provider
+    """
+    settings = settings or get_settings()
+    if settings.embedding_provider == "openai":
+        return settings.openai_embedding_model
+    if settings.embedding_provider == "local":
+        return f"{LOCAL_PREFIX}hash-ngram-{settings.local_embedding_dim}"
+    raise ValueError(f"Unknown embedding_provider: {settings.embedding_provider}")
+
+
+class LocalHashEmbeddings(Embeddings):
+    """Hashed character n-gram embeddings (see module docstring)."""
+
+    # Multipliers of the polynomial n-gram hash and of the bucket/sign mix (odd 64-bit constants)
+    _BASE = np.uint64(0x100000001B3)
+    _MIX = np.uint64(0x9E3779B97F4A7C15)
+    _BLOCK_CHARS = 8192
+
+    def __init__(self, dim: int = 384, ngram_range: tuple[int, int] = (3, 5)):
+        if dim < 8:
+            raise ValueError("Local embeddings need at least 8 dimensions")
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        # Padded with spaces so word starts and ends form their own n-grams
+        return " " + " ".join(unicodedata.normalize("NFKC", text).casefold().split()) + " "
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_array([text])[0].tolist()
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """Embed a batch into an (n, dim) float32 array of unit vectors (zero for empty texts)."""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        normalized = [self._normalize(text) for text in texts]
+        # Texts are hashed in blocks small enough for the intermediate arrays to stay in CPU cache
+        # (one array over a whole 1000-text batch is about 2x slower)
+        start = 0
+        while start < len(texts):
+            end, characters = start, 0
+            while end < len(texts) and (end == start or characters + len(normalized[end]) <= self._BLOCK_CHARS):
+                characters += len(normalized[end])
+                end += 1
+            self._count_ngrams(normalized[start:end], vectors[start:end])
+            start = end
+        # Log term frequency keeps repeated n-grams from dominating
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    def _count_ngrams(self, texts: list[str], out: np.ndarray):
+        """Add the signed n-gram bucket counts of texts into out (len(texts), dim)."""
+        # All texts as one code point array; owner[i] = text of code point i
+        codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        owner = np.repeat(np.arange(len(texts)), lengths)
+
+        counts = np.zeros(len(texts) * self.dim)
+        low, high = self.ngram_range
+        with np.errstate(over="ignore"):  # the hashes wrap around modulo 2**64 on purpose
+            hashes = codes.copy()
+            for n in range(1, high + 1):
+                if n > 1:
+                    # Extend every n-1-gram hash by the next code point
+                    hashes = hashes[:-1] * self._BASE + codes[n - 1:]
+                if n < low:
+                    continue
+                # Only n-grams that start and end inside the same text
+                starts = owner[: len(hashes)]
+                valid = starts == owner[n - 1:]
+                mixed = (hashes[valid] + np.uint64(n)) * self._MIX
+                buckets = ((mixed >> np.uint64(33)) % np.uint64(self.dim)).astype(np.int64)
+                signs = np.where(mixed >> np.uint64(63), -1.0, 1.0)
+                counts += np.bincount(starts[valid] * self.dim + buckets, weights=signs, minlength=len(counts))
+        out += counts.reshape(len(texts), self.dim)
+
+
+def _local_embeddings(name: str) -> LocalHashEmbeddings:
+    match = _LOCAL_MODEL.match(name)
+    if not match:
+        raise ValueError(f"Unknown local embedding model {name!r} (expected hash-ngram-<dim>)")
+    return LocalHashEmbeddings(dim=int(match.group(1)))
+
+
+register_provider("local", _local_embeddings)
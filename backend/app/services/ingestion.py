@@ -0,0 +1,196 @@
+"""
+Streaming ingestion pipeline.
+
+Files are parsed in a process pool and handed to a splitter thread through
+bounded queues, so only a handful of parsed files are ever held in memory no
+matter how large the corpus is. The consumer (the embedding stage in
+RAGService) pulls chunked files from the last queue.
+
+    parse (process pool) -> parsed queue -> split (thread) -> chunk queue -> embed
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator
+from langchain_core.documents import Document
+from app.config import get_settings
+from app.services.pdf_extract import PageCache, extract_pdf_pages
+
+SUPPORTED_EXTENSIONS = {".txt", ".md", ".pdf", ".docx", ".doc"}
+
+_DONE = object()
+
+
+@dataclass
+class LoadedFile:
+    path: str
+    documents: list[Document] = field(default_factory=list)
+    error: str | None = None
+    elapsed_seconds: float = 0.0
+
+
+@lru_cache(maxsize=None)
+def _page_cache(db_path: str) -> PageCache:
+    # One cache handle per worker process
+    return PageCache(db_path, get_settings().pdf_page_cache_max_mb)
+
+
+def load_file(path: str, pdf_cache_path: str | None = None) -> list[Document]:
+    """
+    Load a single file with the loader matching its extension.
+
+    PDFs go through the page cache when pdf_cache_path is given.
+    """
+    # Loaders (and the parsers under them) are imported on first use
+    from langchain_community.document_loaders import Docx2txtLoader, PyPDFLoader, TextLoader
+
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix in [".txt", ".md"]:
+        loader = TextLoader(path, encoding="utf-8")
+    elif suffix == ".pdf":
+        if pdf_cache_path:
+            return list(extract_pdf_pages(path, cache=_page_cache(pdf_cache_path)))
+        loader = PyPDFLoader(path)
+    elif suffix in [".docx", ".doc"]:
+        loader = Docx2txtLoader(path)
+    else:
+        raise ValueError(f"Unsupported file type: {suffix}")
+    return loader.load()
+
+
+def _parse(path: str, pdf_cache_path: str | None = None) -> LoadedFile:
+    """Worker entry point - never raises, failures are reported on the result."""
+    start = time.perf_counter()
+    try:
+        documents = load_file(path, pdf_cache_path)
+        return LoadedFile(path, documents, elapsed_seconds=time.perf_counter() - start)
+    except Exception as e:
+        return LoadedFile(path, error=str(e), elapsed_seconds=time.perf_counter() - start)
+
+
+def resolve_workers(workers: int) -> int:
+    """0 means one worker per CPU core."""
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def iter_parsed(
+    paths: Iterable[str],
+    workers: int = 0,
+    max_in_flight: int = 8,
+    pdf_cache_path: str | None = None,
+) -> Iterator[LoadedFile]:
+    """
+    Parse files in parallel, yielding results in completion order.
+
+    At most max_in_flight files are submitted at once, which bounds how many
+    parsed files can pile up if the consumer is slower than the pool.
+    """
+    workers = resolve_workers(workers)
+    paths = iter(paths)
+
+    if workers == 1:
+        # No point paying process start-up for a single worker
+        for path in paths:
+            yield _parse(path, pdf_cache_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for path in paths:
+            pending.add(pool.submit(_parse, path, pdf_cache_path))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in pending:
+            yield future.result()
+
+
+def stream_chunks(
+    paths: Iterable[str],
+    split: Callable[[list[Document]], list[Document]],
+    workers: int = 0,
+    queue_size: int = 8,
+    pdf_cache_path: str | None = None,
+) -> Iterator[LoadedFile]:
+    """
+    Run the parse and split stages concurrently and yield chunked files.
+
+    Each yielded LoadedFile carries the chunks of one file in `documents`, or
+    an `error` if parsing or splitting failed. A failure never aborts the batch.
+
+    Args:
+        paths: Files to ingest
+        split: Function that turns parsed pages into chunks
+        workers: Parser processes (0 = one per CPU core)
+        queue_size: Capacity of each hand-off queue between stages
+        pdf_cache_path: SQLite page cache for PDF extraction (optional)
+    """
+    parsed_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    chunk_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(q: queue.Queue, item) -> bool:
+        # Blocking put that gives up when the consumer went away
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q: queue.Queue):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def parse_stage():
+        try:
+            for loaded in iter_parsed(paths, workers, queue_size, pdf_cache_path):
+                if not put(parsed_q, loaded):
+                    return
+        except Exception as e:
+            put(parsed_q, LoadedFile("", error=f"Parser pool failed: {e}"))
+        finally:
+            put(parsed_q, _DONE)
+
+    def split_stage():
+        while True:
+            loaded = get(parsed_q)
+            if loaded is _DONE:
+                break
+            if loaded.error is None:
+                try:
+                    loaded.documents = split(loaded.documents)
+                except Exception as e:
+                    loaded.documents, loaded.error = [], str(e)
+            if not put(chunk_q, loaded):
+                return
+        put(chunk_q, _DONE)
+
+    threads = [
+        threading.Thread(target=parse_stage, name="ingest-parse", daemon=True),
+        threading.Thread(target=split_stage, name="ingest-split", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            loaded = chunk_q.get()
+            if loaded is _DONE:
+                break
+            yield loaded
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,82 @@
+"""
+Hebrew-aware tokenization for the BM25 index, and rank fusion.
+
+Hebrew attaches prepositions, conjunctions and the article to the word
+(ו, ה, ב, כ, ל, מ, ש - "והתעריף" is "and the tariff"), and five letters take
+a different form at the end of a word (ך ם ן ף ץ). Tokens are normalized so
+these variants meet in the index:
+
+- NFC, case-folded, niqqud and cantillation marks removed
+- geresh/gershayim inside acronyms dropped (מע"מ -> מעמ)
+- final forms mapped to regular forms (תעריף -> תעריפ)
+- every Hebrew token is also indexed with 1-3 prefix letters stripped, as
+  long as at least 3 letters remain ("והתעריף" -> "התעריפ", "תעריפ")
+
+The surface form is kept alongside the stripped forms, so an exact match
+still scores higher than a match on the stem alone.
+"""
+
+import re
+import unicodedata
+
+_NIQQUD = re.compile(r"[֑-ׇ]")
+_ACRONYM_QUOTES = re.compile(r"(?<=[א-ת])[\"'׳״](?=[א-ת])")
+_TOKEN = re.compile(r"[^\W_]+")
+_HEBREW = re.compile(r"^[א-ת]+$")
+_FINAL_FORMS = str.maketrans("ךםןףץ", "כמנפצ")
+_PREFIX_LETTERS = set("ושהכלבמ")
+_MAX_PREFIXES = 3
+_MIN_STEM = 3
+
+
+def tokenize(text: str) -> list[str]:
+    """Normalized surface tokens of a text, in order."""
+    text = unicodedata.normalize("NFC", text).casefold()
+    text = _ACRONYM_QUOTES.sub("", _NIQQUD.sub("", text))
+    return [token.translate(_FINAL_FORMS) for token in _TOKEN.findall(text)]
+
+
+def variants(token: str) -> list[str]:
+    """The token plus its forms with Hebrew prefix letters stripped."""
+    forms = [token]
+    if _HEBREW.match(token):
+        for i in range(1, _MAX_PREFIXES + 1):
+            if len(token) - i < _MIN_STEM or token[i - 1] not in _PREFIX_LETTERS:
+                break
+            forms.append(token[i:])
+    return forms
+
+
+def index_terms(text: str) -> str:
+    """Space-separated terms stored in the full-text index for a chunk."""
+    return " ".join(form for token in tokenize(text) for form in variants(token))
+
+
+def query_terms(text: str) -> list[str]:
+    """Distinct surface tokens of a query."""
+    return list(dict.fromkeys(tokenize(text)))
+
+
+def match_expression(terms: list[str]) -> str:
+    """FTS5 MATCH expression: any variant of any query term."""
+    forms = dict.fromkeys(form for term in terms for form in variants(term))
+    # Tokens are letters/digits only, so quoting is all the escaping needed
+    return " OR ".join(f'"{form}"' for form in forms)
+
+
+def covers(terms: list[str], text: str) -> bool:
+    """True when every query term (or a prefix-stripped variant) occurs in text."""
+    present = set(index_terms(text).split())
+    return all(any(form in present for form in variants(term)) for term in terms)
+
+
+def reciprocal_rank_fusion(rankings: list[list[int]], k: int = 60) -> list[int]:
+    """
+    Fuse ranked id lists: score(id) = sum of 1 / (k + rank) over the lists
+    it appears in (rank starting at 1). Returns ids best first.
+    """
+    scores: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,484 @@
+"""
+Lightweight RAG backend (rag_backend="lite").
+
+Query and ingest without the LangChain embedding client and without
+Document objects on the query path. A query is embed -> FAISS search ->
+fetch text:
+
+    question -> OpenAI client (direct) -> IndexFlatL2 -> chunk store rows -> Hit records
+
+Vectors live in one exact flat index, saved as index.faiss next to the
+SQLite chunk store in <persist_directory>/lite_index. Hits are __slots__
+records, not Documents. Filtered searches score the allowed rows straight
+from the index's vector array with NumPy.
+
+LiteRAGService keeps RAGService's query / query_many / add_documents /
+add_texts / add_files contract, and enough of the rest (stats, filters,
+clear, warm-up) for chat, the knowledge-base tool, add-text, uploads and
+stats. Directory loading and sync, hybrid retrieval, context packing,
+quantized/ANN indexes, sharding, migration, snapshots and vector imports
+need the full backend; their methods raise LiteUnsupportedError (a
+ValueError, so the API answers 400).
+
+Searches run concurrently with each other. Appending to the index may
+reallocate its vector array, so an append waits for the searches in flight
+and holds new ones back until it is done (a few milliseconds per batch).
+"""
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from app.config import get_settings
+from app.services.chunk_store import ChunkStore
+from app.services.embeddings import configured_model, create_embeddings
+from app.services.ingestion import load_file, resolve_workers
+from app.services.metadata_filter import MetadataFilter, annotate
+from app.services.pdf_extract import PageCache, extract_pdf_pages
+from app.services.query_cache import LRUCache, QuestionLog, normalize_query
+from app.services.text_splitter import create_text_splitter
+
+_SEPARATOR = "\n\n---\n\n"
+
+
+class LiteUnsupportedError(ValueError):
+    pass
+
+
+def _unsupported(feature: str):
+    raise LiteUnsupportedError(f"{feature} is not supported by the lite backend (set RAG_BACKEND=full)")
+
+
+class Hit:
+    """One search result: chunk text, its metadata and its L2 distance."""
+
+    __slots__ = ("text", "metadata", "distance")
+
+    def __init__(self, text: str, metadata: dict, distance: float):
+        self.text = text
+        self.metadata = metadata
+        self.distance = distance
+
+    @property
+    def source(self) -> str:
+        return self.metadata.get("source", "Unknown")
+
+
+class OpenAIEmbedder:
+    """Embeds through the OpenAI client directly (no LangChain wrapper, no token-length pre-check)."""
+
+    def __init__(self, model: str, client=None):
+        if client is None:
+            from openai import OpenAI
+
+            client = OpenAI(api_key=get_settings().openai_api_key)
+        self.client = client
+        self.model = model
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        response = self.client.embeddings.create(model=self.model, input=texts)
+        return [item.embedding for item in response.data]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+class LiteRAGService:
+    def __init__(
+        self,
+        collection: str | None = None,
+        persist_directory: str | None = None,
+        embeddings=None,
+        query_batcher=None,
+        embedding_cache: LRUCache | None = None,
+        pdf_cache: PageCache | None = None,
+        shard_count: int | None = None,
+    ):
+        """
+        Args:
+            collection: Collection name (defaults to settings.collection_name)
+            persist_directory: Where the collection lives (defaults to settings.chroma_persist_directory)
+            embeddings: Any object with embed_documents/embed_query (defaults to OpenAIEmbedder,
+                or the provider of a non-OpenAI configured model)
+            embedding_cache, pdf_cache: Shared with other collections when given
+            query_batcher, shard_count: Accepted for CollectionManager and ignored
+        """
+        settings = get_settings()
+        self.collection = collection or settings.collection_name
+        self.embedding_model = configured_model(settings)
+        if embeddings is None:
+            # OpenAI models are called directly, without LangChain; other providers are plain numpy already
+            embeddings = (
+                OpenAIEmbedder(self.embedding_model) if ":" not in self.embedding_model else create_embeddings(self.embedding_model)
+            )
+        self.embeddings = embeddings
+        self.query_batcher = None
+        self.shards = None
+        self.embedding_cache = embedding_cache or LRUCache(settings.query_embedding_cache_size)
+        self.result_cache = LRUCache(settings.query_result_cache_size)
+        self.index_version = 0
+        self.persist_directory = persist_directory or settings.chroma_persist_directory
+        self.question_log = QuestionLog(
+            os.path.join(self.persist_directory, "frequent_questions.json"), settings.question_log_size
+        )
+        self.index_path = os.path.join(self.persist_directory, "lite_index")
+        self.index_file = os.path.join(self.index_path, "index.faiss")
+        self.top_k = settings.retrieval_top_k
+        self.embedding_batch_size = settings.embedding_batch_size
+        self.text_splitter = create_text_splitter(settings)
+        self.pdf_cache = pdf_cache
+        if pdf_cache is None and settings.pdf_page_cache:
+            self.pdf_cache = PageCache(
+                os.path.join(settings.chroma_persist_directory, "pdf_pages.sqlite"), settings.pdf_page_cache_max_mb
+            )
+        self.pdf_page_workers = settings.pdf_page_workers
+        self.pdf_pages_per_task = settings.pdf_pages_per_task
+        # Guards the fields below; searches run outside it (see _reading / _mutating)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._searches = 0
+        self._mutating_now = False
+        # One writer at a time (adds, saves, clear)
+        self._write_lock = threading.Lock()
+        self._active_writes = 0
+
+        self.index: faiss.IndexFlatL2 | None = None
+        self.chunk_store: ChunkStore | None = None
+        if os.path.exists(self.index_file):
+            self.index = faiss.read_index(self.index_file)
+            self.chunk_store = ChunkStore(self.index_path)
+            print(f"[RAG] Loaded lite index with {self.index.ntotal} chunks")
+
+    @property
+    def busy(self) -> bool:
+        return self._active_writes > 0
+
+    @property
+    def migration(self):
+        _unsupported("Embedding migration")
+
+    def memory_bytes(self) -> int:
+        index, chunk_store = self.index, self.chunk_store
+        if index is None:
+            return 0
+        return index.ntotal * index.d * 4 + chunk_store.memory_bytes()
+
+    @contextmanager
+    def _reading(self):
+        """Yields (index, chunk store) that stay valid until the block ends."""
+        with self._idle:
+            while self._mutating_now:
+                self._idle.wait()
+            self._searches += 1
+            index, chunk_store = self.index, self.chunk_store
+        try:
+            yield index, chunk_store
+        finally:
+            with self._idle:
+                self._searches -= 1
+                if not self._searches:
+                    self._idle.notify_all()
+
+    @contextmanager
+    def _mutating(self):
+        """Exclusive access to the index and chunk store: waits for the searches in flight."""
+        with self._idle:
+            self._mutating_now = True
+            while self._searches:
+                self._idle.wait()
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._mutating_now = False
+                self._idle.notify_all()
+
+    @contextmanager
+    def _write(self):
+        """Mark the collection as being written (see busy)."""
+        with self._lock:
+            self._active_writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active_writes -= 1
+
+    def add_documents(
+        self, documents: Iterable[Document], progress: Callable[[int], None] | None = None
+    ) -> int:
+        """
+        Split, embed and add documents, embedding_batch_size chunks at a time.
+
+        Args:
+            documents: Document objects (a list or any iterable)
+            progress: Called with the number of chunks added so far after every batch
+
+        Returns:
+            Number of chunks added
+        """
+        with self._write():
+            added = self._ingest(documents, progress)
+            if added:
+                self._save()
+            return added
+
+    def _ingest(self, documents: Iterable[Document], progress: Callable[[int], None] | None = None) -> int:
+        """Split, embed and add documents without saving. Returns the number of chunks added."""
+        added = 0
+        batch: list[Document] = []
+        for document in documents:
+            batch.extend(self.text_splitter.split_documents([document]))
+            if len(batch) >= self.embedding_batch_size:
+                added += self._add_chunks(batch)
+                batch = []
+                if progress:
+                    progress(added)
+        added += self._add_chunks(batch)
+        if progress:
+            progress(added)
+        return added
+
+    def add_texts(self, texts: list[str], metadatas: list[dict] | None = None) -> int:
+        """Add raw texts, with optional metadata for each."""
+        return self.add_documents(
+            Document(page_content=text, metadata=metadatas[i] if metadatas else {}) for i, text in enumerate(texts)
+        )
+
+    def add_files(self, files: dict[str, str]) -> dict:
+        """
+        Add several files, one after another (see RAGService.add_files).
+
+        Args:
+            files: File path -> source name stored with its chunks
+
+        Returns:
+            Summary dict with chunks per added file, failed files with their
+            errors, and the total number of chunks added
+        """
+        summary = {"files": {}, "failed": [], "errors": {}, "chunks_added": 0}
+        with self._write():
+            for path, source in files.items():
+                try:
+                    # Parsed completely first, so a file that fails to parse adds nothing
+                    documents = list(self.iter_file_documents(path, source=source))
+                except Exception as e:
+                    print(f"Error loading {source}: {e}")
+                    summary["failed"].append(source)
+                    summary["errors"][source] = str(e)
+                    continue
+                added = self._ingest(documents)
+                summary["files"][source] = summary["files"].get(source, 0) + added
+                summary["chunks_added"] += added
+            if summary["chunks_added"]:
+                self._save()
+        return summary
+
+    def load_directory(self, directory_path: str) -> int:
+        _unsupported("Directory loading")
+
+    def sync_directory(self, directory_path: str) -> dict:
+        _unsupported("Directory sync")
+
+    def export_snapshot(self, path: str) -> dict:
+        _unsupported("Snapshot export")
+
+    def import_snapshot(self, path: str, replace: bool = False) -> dict:
+        _unsupported("Snapshot import")
+
+    def import_vectors(self, vectors_path: str, records_path: str, model: str | None = None) -> int:
+        _unsupported("Vector import")
+
+    def iter_file_documents(self, file_path: str, source: str | None = None) -> Iterator[Document]:
+        """Load one file as a stream of pages (see RAGService.iter_file_documents)."""
+        if Path(file_path).suffix.lower() == ".pdf":
+            yield from extract_pdf_pages(
+                file_path,
+                cache=self.pdf_cache,
+                workers=resolve_workers(self.pdf_page_workers),
+                pages_per_task=self.pdf_pages_per_task,
+                source=source,
+            )
+            return
+        for document in load_file(file_path):
+            if source:
+                document.metadata["source"] = source
+            yield document
+
+    def _add_chunks(self, chunks: list[Document]) -> int:
+        if not chunks:
+            return 0
+        vectors = np.asarray(self.embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+        for chunk in chunks:
+            annotate(chunk.metadata, chunk.page_content)
+        ids = [str(uuid.uuid4()) for _ in chunks]
+        with self._write_lock:
+            chunk_store = self.chunk_store or ChunkStore(self.index_path)
+            with self._mutating():
+                if self.index is None:
+                    self.index = faiss.IndexFlatL2(vectors.shape[1])
+                    self.chunk_store = chunk_store
+                self.index.add(vectors)
+                self.chunk_store.add(ids, chunks)
+                self.index_version += 1
+        return len(chunks)
+
+    def _save(self):
+        # Saving only reads the index, so searches go on meanwhile
+        with self._write_lock:
+            if self.index is None:
+                return
+            tmp_path = self.index_file + ".tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, self.index_file)
+            self.chunk_store.save()
+
+    def search(self, vectors: np.ndarray, k: int, filters: MetadataFilter | None = None) -> list[list[Hit]]:
+        """
+        The k nearest chunks for each query vector.
+
+        Args:
+            vectors: (n, dim) float32 query vectors
+            k: Hits per query
+            filters: Only return chunks with matching metadata
+        """
+        with self._reading() as (index, chunk_store):
+            if index is None or index.ntotal == 0:
+                return [[] for _ in vectors]
+            if filters is None:
+                distances, positions = index.search(vectors, min(k, index.ntotal))
+            else:
+                allowed = np.flatnonzero(chunk_store.filter_mask(filters))
+                # The flat index's vector array, viewed in place
+                stored = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d)
+                candidates = stored.reshape(index.ntotal, index.d)[allowed]
+                # |c - q|^2 = |c|^2 - 2 c.q + |q|^2, one matrix product for all queries
+                scores = (
+                    (candidates ** 2).sum(axis=1)[None, :]
+                    - 2 * vectors @ candidates.T
+                    + (vectors ** 2).sum(axis=1)[:, None]
+                )
+                k = min(k, len(allowed))
+                top = np.argpartition(scores, k - 1, axis=1)[:, :k] if k else np.empty((len(vectors), 0), dtype=np.int64)
+                top = np.take_along_axis(top, np.argsort(np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+                distances = np.take_along_axis(scores, top, axis=1)
+                positions = allowed[top]
+            rows = [chunk_store.get_rows([p for p in row if p >= 0]) for row in positions]
+        return [
+            [Hit(text, metadata, float(distance)) for (text, metadata), distance in zip(hit_rows, row_distances)]
+            for hit_rows, row_distances in zip(rows, distances)
+        ]
+
+    def query(
+        self,
+        question: str,
+        k: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        filters: MetadataFilter | None = None,
+    ) -> tuple[str, list[str]]:
+        """
+        Query the collection for relevant context (see RAGService.query).
+        nprobe and ef_search are accepted for compatibility; the flat index is exact.
+
+        Returns:
+            Tuple of (combined context string, list of source names)
+        """
+        self.question_log.record(question)
+        return self._query_many([question], k, filters)[0]
+
+    def query_many(
+        self,
+        questions: list[str],
+        k: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        filters: MetadataFilter | None = None,
+    ) -> list[tuple[str, list[str]]]:
+        """Query several questions with one embedding call and one search (see RAGService.query_many)."""
+        for question in questions:
+            self.question_log.record(question)
+        return self._query_many(questions, k, filters)
+
+    def _query_many(
+        self, questions: list[str], k: int | None = None, filters: MetadataFilter | None = None
+    ) -> list[tuple[str, list[str]]]:
+        if self.index is None or not questions:
+            return [("", []) for _ in questions]
+        k = k or self.top_k
+        texts = [normalize_query(question) for question in questions]
+        keys = [(text, k, filters, self.index_version) for text in texts]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            vectors = self._embed([texts[i] for i in missing])
+            for i, hits in zip(missing, self.search(vectors, k, filters)):
+                results[i] = (_SEPARATOR.join(hit.text for hit in hits), tuple(dict.fromkeys(hit.source for hit in hits)))
+                self.result_cache.put(keys[i], results[i])
+        return [(context, list(sources)) for context, sources in results]
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        """Embed normalized questions, calling the API once for all cache misses."""
+        model = self.embedding_model
+        embeddings = {text: self.embedding_cache.get((model, text)) for text in dict.fromkeys(texts)}
+        to_embed = [text for text, embedding in embeddings.items() if embedding is None]
+        if to_embed:
+            for text, embedding in zip(to_embed, self.embeddings.embed_documents(to_embed)):
+                embeddings[text] = embedding
+                self.embedding_cache.put((model, text), embedding)
+        return np.asarray([embeddings[text] for text in texts], dtype=np.float32)
+
+    def warm_up(self, questions: int, dummy_search: bool = True) -> dict:
+        """Pre-warm the caches with the most frequent questions (see RAGService.warm_up)."""
+        timings = {"questions": 0}
+        top = self.question_log.top(questions) if questions > 0 else []
+        if top and self.index is not None:
+            started = time.perf_counter()
+            self._query_many(top)
+            timings["questions"] = len(top)
+            timings["query_cache_seconds"] = round(time.perf_counter() - started, 3)
+        if dummy_search and self.index is not None:
+            started = time.perf_counter()
+            self.search(np.zeros((1, self.index.d), dtype=np.float32), self.top_k)
+            timings["dummy_search_seconds"] = round(time.perf_counter() - started, 3)
+        return timings
+
+    def filter_values(self) -> dict[str, list[str]]:
+        """Distinct values of each filterable metadata field."""
+        return self.chunk_store.tag_values() if self.chunk_store is not None else {}
+
+    def get_collection_stats(self, include_recall: bool = False) -> dict:
+        """Statistics in the shape of RAGService.get_collection_stats (the flat index is exact)."""
+        dim = self.index.d if self.index is not None else 0
+        return {
+            "total_documents": self.index.ntotal if self.index is not None else 0,
+            "collection_name": self.collection,
+            "index_type": "flat",
+            "quantization": "none",
+            "index_memory_bytes": self.memory_bytes(),
+            "vectors_on_disk_bytes": 0,
+            "search_dimensions": dim,
+            "vector_dimensions": dim,
+            "index_version": self.index_version,
+            "retrieval_mode": "vector",
+            "query_cache": {"embeddings": self.embedding_cache.stats(), "results": self.result_cache.stats()},
+            "recall": {"recall@10": 1.0, "sample_queries": 0} if include_recall else None,
+        }
+
+    def clear_collection(self):
+        """Clear all documents from the collection."""
+        with self._write_lock, self._mutating():
+            self.index = None
+            if self.chunk_store is not None:
+                self.chunk_store.close()
+                self.chunk_store = None
+            self.index_version += 1
+            if os.path.exists(self.index_path):
+                shutil.rmtree(self.index_path, ignore_errors=True)
@@ -0,0 +1,79 @@
+"""
+File manifest for incremental directory sync.
+
+Keeps one entry per indexed file (size, mtime, content hash and the ids of the
+chunks it produced) so a sync only re-embeds files that actually changed.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field, asdict
+
+
+@dataclass
+class ManifestEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    chunk_ids: list[str] = field(default_factory=list)
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash a file in fixed-size blocks so large files are never fully in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentManifest:
+    """JSON-backed map of absolute file path -> ManifestEntry."""
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.entries: dict[str, ManifestEntry] = self._load()
+
+    def _load(self) -> dict[str, ManifestEntry]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                raw = json.load(f)
+            return {path: ManifestEntry(**entry) for path, entry in raw.items()}
+        except Exception as e:
+            print(f"Could not load manifest: {e}")
+            return {}
+
+    def save(self):
+        """Write the manifest atomically (temp file + rename)."""
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {path: asdict(entry) for path, entry in self.entries.items()},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+    def get(self, path: str) -> ManifestEntry | None:
+        return self.entries.get(path)
+
+    def set(self, entry: ManifestEntry):
+        self.entries[entry.path] = entry
+
+    def remove(self, path: str) -> ManifestEntry | None:
+        return self.entries.pop(path, None)
+
+    def paths_under(self, directory: str) -> list[str]:
+        """All tracked paths inside the given directory."""
+        prefix = os.path.join(directory, "")
+        return [path for path in self.entries if path.startswith(prefix)]
+
+    def clear(self):
+        self.entries = {}
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
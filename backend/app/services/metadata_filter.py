@@ -0,0 +1,133 @@
+"""
+Filterable chunk metadata.
+
+Every chunk is tagged with a few metadata fields that searches can be
+restricted to:
+
+- source:   file name of the document (basename of the "source" metadata)
+- doc_type: file type ("pdf", "docx", "txt", ...), from metadata or the source suffix
+- language: "he" or "en", from metadata or detected from the chunk text
+- date:     document date as YYYY-MM-DD (file mtime for synced directories,
+            ingestion date otherwise)
+
+The chunk store keeps one sorted id set per (field, value) and combines
+them into a position bitmap per filter, which is handed to FAISS as an
+IDSelector so only matching chunks are ever scored.
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from pathlib import PurePath
+from typing import Iterable
+
+FILTER_FIELDS = ("source", "doc_type", "language", "date")
+
+_HEBREW_LETTER = re.compile(r"[א-ת]")
+_LATIN_LETTER = re.compile(r"[A-Za-z]")
+
+
+def detect_language(text: str) -> str:
+    """"he" when Hebrew letters are at least as common as Latin ones, else "en"."""
+    hebrew = len(_HEBREW_LETTER.findall(text))
+    latin = len(_LATIN_LETTER.findall(text))
+    return "he" if hebrew and hebrew >= latin else "en"
+
+
+def annotate(metadata: dict, text: str):
+    """Fill in missing filter fields of a chunk's metadata in place."""
+    source = metadata.get("source")
+    if "doc_type" not in metadata and source:
+        suffix = PurePath(str(source)).suffix.lstrip(".").lower()
+        if suffix:
+            metadata["doc_type"] = suffix
+    metadata.setdefault("language", detect_language(text))
+    metadata.setdefault("date", date.today().isoformat())
+
+
+def filter_tags(metadata: dict) -> dict[str, str]:
+    """(field -> value) tags of an annotated chunk, in their normalized form."""
+    tags = {}
+    for field in FILTER_FIELDS:
+        value = metadata.get(field)
+        if value is not None and value != "":
+            tags[field] = _normalize(field, value)
+    return tags
+
+
+def _normalize(field: str, value) -> str:
+    value = str(value).strip()
+    if field == "source":
+        return os.path.basename(value)
+    if field == "date":
+        return value[:10]
+    return value.casefold()
+
+
+def _values(field: str, value: str | Iterable[str] | None) -> frozenset[str]:
+    if value is None:
+        return frozenset()
+    if isinstance(value, str):
+        value = [value]
+    return frozenset(_normalize(field, v) for v in value if v)
+
+
+def _iso_date(value: str | None) -> str | None:
+    if not value:
+        return None
+    # Raises ValueError for malformed dates, like any other invalid argument
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    """
+    Restriction of a search to chunks whose tags match.
+
+    Values within a field are alternatives (OR), fields are combined with AND.
+    Frozen, so a filter can be part of a cache key.
+    """
+
+    source: frozenset[str] = frozenset()
+    doc_type: frozenset[str] = frozenset()
+    language: frozenset[str] = frozenset()
+    date_from: str | None = None
+    date_to: str | None = None
+
+    @classmethod
+    def from_args(
+        cls,
+        source: str | Iterable[str] | None = None,
+        doc_type: str | Iterable[str] | None = None,
+        language: str | Iterable[str] | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+    ) -> "MetadataFilter | None":
+        """
+        Build a filter from request/tool arguments; None when nothing is restricted.
+
+        Raises:
+            ValueError: If a date is not an ISO date (YYYY-MM-DD)
+        """
+        metadata_filter = cls(
+            source=_values("source", source),
+            doc_type=_values("doc_type", doc_type),
+            language=_values("language", language),
+            date_from=_iso_date(date_from),
+            date_to=_iso_date(date_to),
+        )
+        return metadata_filter if metadata_filter.fields() else None
+
+    def fields(self) -> list[str]:
+        """Fields this filter restricts."""
+        fields = [field for field in ("source", "doc_type", "language") if getattr(self, field)]
+        if self.date_from or self.date_to:
+            fields.append("date")
+        return fields
+
+    def accepts(self, field: str, value: str) -> bool:
+        """Whether a tag value of a restricted field passes the filter."""
+        if field == "date":
+            return (not self.date_from or value >= self.date_from) and (not self.date_to or value <= self.date_to)
+        return value in getattr(self, field)
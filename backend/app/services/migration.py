@@ -0,0 +1,373 @@
+"""
+Zero-downtime embedding model migration.
+
+Vectors of one embedding model mean nothing to another, so changing the
+model used to mean clearing the collection and re-embedding everything while
+search was down. A migration builds the new-model index next to the active
+one instead, and queries keep using the old index until the switch:
+
+    <persist_directory>/faiss_index/              active index, answers every query
+    <persist_directory>/migration/faiss_index/    new-model index being built
+    <persist_directory>/previous/faiss_index/     index replaced by the last switch
+
+1. Build: a background thread re-embeds the collection's chunks with the new
+   model, migration_batch_size chunks per call, at most migration_concurrency
+   calls in flight and at most migration_max_chunks_per_second. Chunk ids are
+   kept, so the manifest (and incremental directory sync) stays valid.
+2. Catch up: chunks added or deleted meanwhile are found by comparing chunk
+   ids and replayed - once while writes continue, then again with writes
+   paused, which leaves only what arrived during the first catch-up.
+3. Switch: still with writes paused, the directories are renamed and the new
+   index and model are swapped in together. Searches wait while the active
+   index files are closed, renamed and reopened; a search whose question was
+   embedded with the old model before the swap runs again (see
+   RAGService._retrieve).
+4. Rollback: until the previous index is discarded - explicitly, or
+   migration_keep_previous_hours after the switch - rollback() catches it up
+   with the writes made since the switch (embedded with its own model) and
+   switches back. The migrated index becomes the previous one in turn.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from app.config import get_settings
+
+_INDEX_DIRECTORY = "faiss_index"
+_ACTIVE_STATES = ("building", "catching_up", "switching", "rolling_back")
+
+
+class MigrationCancelled(Exception):
+    pass
+
+
+class EmbeddingMigration:
+    def __init__(self, service):
+        """
+        Args:
+            service: The RAGService whose collection is migrated
+        """
+        settings = get_settings()
+        self.service = service
+        self.directory = os.path.join(service.persist_directory, "migration")
+        self.previous_directory = os.path.join(service.persist_directory, "previous")
+        self.batch_size = settings.migration_batch_size
+        self.concurrency = settings.migration_concurrency
+        self.max_chunks_per_second = settings.migration_max_chunks_per_second
+        self.keep_previous_hours = settings.migration_keep_previous_hours
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._throttle_lock = threading.Lock()
+        self._next_slot = 0.0
+        self._progress: dict = {"state": "idle"}
+
+        if os.path.isdir(self.directory):
+            # Interrupted by a restart; the partial index is not worth resuming
+            shutil.rmtree(self.directory, ignore_errors=True)
+            print(f"[RAG] Discarded the unfinished embedding migration of '{service.collection}'")
+        self.collect_garbage()
+
+    @property
+    def running(self) -> bool:
+        return self._progress["state"] in _ACTIVE_STATES
+
+    def start(self, model: str, concurrency: int | None = None, max_chunks_per_second: float | None = None) -> dict:
+        """
+        Start re-embedding the collection with another model in the background.
+
+        Args:
+            model: The new embedding model
+            concurrency: Embedding calls in flight at once (defaults to settings)
+            max_chunks_per_second: Re-embedding rate limit, 0 = none (defaults to settings)
+
+        Returns:
+            The migration status
+
+        Raises:
+            ValueError: If a migration is running, the collection is empty or
+                sharded, or already uses the model
+        """
+        from app.services.embeddings import create_embeddings
+
+        service = self.service
+        with self._lock:
+            if self.running:
+                raise ValueError(f"A migration of '{service.collection}' is already running")
+            if service.shards is not None:
+                raise ValueError("Embedding model migration is not supported in sharded mode")
+            if model == service.embedding_model:
+                raise ValueError(f"Collection '{service.collection}' is already embedded with {model}")
+            if service.index is None:
+                raise ValueError("The collection is empty - set the embedding model in the settings instead")
+
+            settings = get_settings()
+            self.concurrency = max(1, concurrency or settings.migration_concurrency)
+            self.max_chunks_per_second = (
+                settings.migration_max_chunks_per_second if max_chunks_per_second is None else max_chunks_per_second
+            )
+            self._cancel.clear()
+            self._next_slot = 0.0
+            shutil.rmtree(self.directory, ignore_errors=True)
+            target = self._open(self.directory, model, create_embeddings(model))
+            self._progress = {
+                "state": "building",
+                "from_model": service.embedding_model,
+                "to_model": model,
+                "total_chunks": 0,
+                "embedded_chunks": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "error": None,
+            }
+            self._thread = threading.Thread(target=self._run, args=(target,), name="rag-migration", daemon=True)
+            self._thread.start()
+        print(f"[RAG] Migrating '{service.collection}' from {service.embedding_model} to {model}")
+        return self.status()
+
+    def _run(self, target):
+        service = self.service
+        try:
+            self._replicate(service, target)
+            self._update(state="catching_up")
+            self._replicate(service, target)
+            with service.pause_writes():
+                self._replicate(service, target)
+                self._update(state="switching")
+                self._switch(target, os.path.join(self.directory, _INDEX_DIRECTORY))
+            self._update(state="completed", finished_at=time.time())
+            print(f"[RAG] Collection '{service.collection}' now uses {service.embedding_model}")
+        except MigrationCancelled:
+            self._update(state="cancelled", finished_at=time.time())
+            print(f"[RAG] Migration of '{service.collection}' cancelled")
+        except Exception as e:
+            self._update(state="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+            print(f"[RAG] Migration of '{service.collection}' failed: {e}")
+        finally:
+            if target.chunk_store is not None:
+                target.chunk_store.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def cancel(self):
+        """
+        Stop a migration that is still building; the active index is untouched.
+
+        Raises:
+            ValueError: If no migration is building or catching up
+        """
+        if self._progress["state"] not in ("building", "catching_up"):
+            raise ValueError("No migration to cancel")
+        self._cancel.set()
+        self._thread.join()
+
+    def rollback(self) -> dict:
+        """
+        Switch back to the previous index and its embedding model, after
+        catching it up with the writes made since the switch.
+
+        Returns:
+            The migration status
+
+        Raises:
+            ValueError: If a migration is running or there is no previous index
+        """
+        service = self.service
+        with self._lock:
+            if self.running:
+                raise ValueError(f"A migration of '{service.collection}' is running")
+            previous = self._previous_info()
+            if previous is None:
+                raise ValueError("There is no previous index to roll back to")
+            self._progress = {
+                "state": "rolling_back",
+                "from_model": service.embedding_model,
+                "to_model": previous["embedding_model"],
+                "total_chunks": 0,
+                "embedded_chunks": 0,
+                "started_at": time.time(),
+                "finished_at": None,
+                "error": None,
+            }
+
+        self._cancel.clear()
+        target = self._open(self.previous_directory, previous["embedding_model"])
+        try:
+            self._replicate(service, target)
+            with service.pause_writes():
+                self._replicate(service, target)
+                self._switch(target, os.path.join(self.previous_directory, _INDEX_DIRECTORY))
+        except Exception as e:
+            if target.chunk_store is not None:
+                target.chunk_store.close()
+            self._update(state="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+            raise
+        self._update(state="rolled_back", finished_at=time.time())
+        print(f"[RAG] Collection '{service.collection}' rolled back to {service.embedding_model}")
+        return self.status()
+
+    def discard_previous(self) -> bool:
+        """
+        Delete the index replaced by the last switch, which ends the rollback window.
+
+        Returns:
+            Whether there was one
+        """
+        with self._lock:
+            if self._progress["state"] == "rolling_back":
+                raise ValueError("A rollback is running")
+            if not os.path.isdir(self.previous_directory):
+                return False
+            shutil.rmtree(self.previous_directory, ignore_errors=True)
+        print(f"[RAG] Discarded the previous index of '{self.service.collection}'")
+        return True
+
+    def collect_garbage(self):
+        """Discard the previous index once migration_keep_previous_hours have passed."""
+        previous = self._previous_info()
+        if previous and previous["expires_at"] and time.time() >= previous["expires_at"] and not self.running:
+            self.discard_previous()
+
+    def status(self) -> dict:
+        """Progress of the last migration or rollback, and the rollback target if any."""
+        self.collect_garbage()
+        status = dict(self._progress)
+        if status["state"] in _ACTIVE_STATES:
+            elapsed = time.time() - status["started_at"]
+            rate = status["embedded_chunks"] / elapsed if elapsed > 0 else 0.0
+            remaining = max(status["total_chunks"] - status["embedded_chunks"], 0)
+            status["chunks_per_second"] = round(rate, 1)
+            status["eta_seconds"] = round(remaining / rate, 1) if rate else None
+        if status.get("total_chunks"):
+            status["progress"] = round(status["embedded_chunks"] / status["total_chunks"], 4)
+        status["collection"] = self.service.collection
+        status["embedding_model"] = self.service.embedding_model
+        status["previous"] = self._previous_info()
+        return status
+
+    def _update(self, **fields):
+        with self._lock:
+            self._progress.update(fields)
+
+    def _previous_info(self) -> dict | None:
+        path = os.path.join(self.previous_directory, "switched.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            info = json.load(f)
+        hours = self.keep_previous_hours
+        info["expires_at"] = info["switched_at"] + hours * 3600 if hours > 0 else None
+        return info
+
+    def _open(self, directory: str, model: str, embeddings=None):
+        """In-process RAGService over <directory>/faiss_index that embeds with the model."""
+        from app.services.embeddings import create_embeddings
+        from app.services.rag_service import RAGService
+
+        embeddings = embeddings or create_embeddings(model)
+        service = RAGService(
+            collection=f"{self.service.collection}/{os.path.basename(directory)}",
+            persist_directory=directory,
+            embeddings=embeddings,
+            pdf_cache=self.service.pdf_cache,
+            shard_count=0,
+        )
+        service._use_embeddings(embeddings, model)
+        return service
+
+    def _replicate(self, source, target):
+        """Make target hold exactly source's chunks, embedding the missing ones with target's model."""
+        source_ids = source.chunk_store.ids() if source.chunk_store is not None else []
+        target_ids = set(target.chunk_store.ids()) if target.chunk_store is not None else set()
+        present = set(source_ids)
+        stale = [chunk_id for chunk_id in target_ids if chunk_id not in present]
+        if stale:
+            target._delete_chunks(stale)
+        missing = [chunk_id for chunk_id in source_ids if chunk_id not in target_ids]
+        with self._lock:
+            self._progress["total_chunks"] += len(missing)
+
+        batches = (missing[start:start + self.batch_size] for start in range(0, len(missing), self.batch_size))
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="rag-migration-embed") as pool:
+            # Keep every worker busy while adding results in order, without queueing the whole corpus
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(self._embed_batch, source, target, batch))
+                if len(pending) > self.concurrency:
+                    self._add(target, *pending.popleft().result())
+            while pending:
+                self._add(target, *pending.popleft().result())
+        target._save_index()
+
+    def _embed_batch(self, source, target, ids: list[str]):
+        if self._cancel.is_set():
+            raise MigrationCancelled()
+        self._throttle(len(ids))
+        store = source.chunk_store
+        documents = store.get_by_ids(ids) if store is not None else {}
+        # Chunks deleted since the ids were listed are skipped; the next catch-up settles them
+        kept = [chunk_id for chunk_id in ids if chunk_id in documents]
+        chunks = [documents[chunk_id] for chunk_id in kept]
+        vectors = None
+        if chunks:
+            vectors = np.array(target.embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+        return len(ids), kept, chunks, vectors
+
+    def _add(self, target, listed: int, ids: list[str], chunks: list, vectors: np.ndarray | None):
+        if chunks:
+            target._add_chunks(chunks, vectors=vectors, ids=ids)
+        with self._lock:
+            self._progress["embedded_chunks"] += listed
+
+    def _throttle(self, chunks: int):
+        """Space embedding calls out to at most max_chunks_per_second across all workers."""
+        rate = self.max_chunks_per_second
+        if rate <= 0:
+            return
+        with self._throttle_lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + chunks / rate
+        time.sleep(start - now)
+
+    def _switch(self, incoming, incoming_path: str):
+        """
+        Make incoming's index the active one and keep the active one as the
+        previous index (writes are paused).
+        """
+        service = self.service
+        if incoming.index is None:
+            raise RuntimeError("The new index is empty - nothing to switch to")
+        incoming._save_index()
+        incoming.chunk_store.close()
+        service._save_index()
+        outgoing_model = service.embedding_model
+
+        parked = service.faiss_index_path + ".switching"
+        incoming.vector_file.close()
+        # No search may read the active directory while it is renamed under it
+        with service._mutating():
+            service._close_index_files()
+            try:
+                os.replace(service.faiss_index_path, parked)
+                try:
+                    os.replace(incoming_path, service.faiss_index_path)
+                except OSError:
+                    os.replace(parked, service.faiss_index_path)
+                    raise
+            except OSError:
+                # Nothing was switched: reopen the active index
+                service._install_index(service.embeddings, outgoing_model)
+                raise
+            service._install_index(incoming.embeddings, incoming.embedding_model)
+
+        # One previous index at a time
+        shutil.rmtree(self.previous_directory, ignore_errors=True)
+        os.makedirs(self.previous_directory)
+        os.replace(parked, os.path.join(self.previous_directory, _INDEX_DIRECTORY))
+        with open(os.path.join(self.previous_directory, "switched.json"), "w") as f:
+            json.dump({"embedding_model": outgoing_model, "switched_at": time.time()}, f)
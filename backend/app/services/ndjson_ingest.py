@@ -0,0 +1,189 @@
+"""
+Streaming NDJSON ingestion.
+
+A request body of newline-delimited JSON records, one per line:
+
+    {"text": "...", "metadata": {"source": "crm", "customer": 42}}
+
+is parsed as it arrives and fed to RAGService.add_documents, which splits
+and embeds in batches of embedding_batch_size chunks. Memory stays flat
+however large the body is:
+
+    request body -> lines -> bounded queue -> records -> split -> embed batches
+       (event loop)            (ingest_queue_size)     (worker thread)
+
+When embedding falls behind, the queue fills up and the event loop stops
+reading the body, which pushes back on the client through TCP flow control.
+A single record may not exceed ndjson_max_record_bytes.
+
+Bad lines (invalid JSON, no text) are counted and sampled in the progress,
+and do not stop the import. Progress of running and recent imports is kept
+in a small registry (see jobs()).
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Iterator
+from langchain_core.documents import Document
+from app.config import get_settings
+
+_DONE = object()
+_MAX_ERROR_SAMPLES = 20
+_MAX_JOBS = 100
+
+_jobs: OrderedDict[str, "NDJSONProgress"] = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+@dataclass
+class NDJSONProgress:
+    id: str
+    collection: str
+    state: str = "running"
+    bytes_read: int = 0
+    records: int = 0
+    chunks_added: int = 0
+    invalid_records: int = 0
+    errors: dict[int, str] = field(default_factory=dict)  # Line number -> problem (first few)
+    error: str | None = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def invalid(self, line: int, message: str):
+        self.invalid_records += 1
+        if len(self.errors) < _MAX_ERROR_SAMPLES:
+            self.errors[line] = message
+
+    def to_dict(self) -> dict:
+        progress = asdict(self)
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        progress["records_per_second"] = round(self.records / elapsed, 1) if elapsed > 0 else 0.0
+        return progress
+
+
+def jobs() -> list[dict]:
+    """Progress of running and recent NDJSON imports, newest first."""
+    with _jobs_lock:
+        return [job.to_dict() for job in reversed(_jobs.values())]
+
+
+def _register(progress: NDJSONProgress):
+    with _jobs_lock:
+        _jobs[progress.id] = progress
+        while len(_jobs) > _MAX_JOBS:
+            _jobs.popitem(last=False)
+
+
+def _records(lines: queue.Queue, progress: NDJSONProgress) -> Iterator[Document]:
+    """Documents parsed from the queued lines, until the end marker."""
+    number = 0
+    while True:
+        batch = lines.get()
+        if batch is _DONE:
+            return
+        for line in batch:
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                text = record.get("text") if isinstance(record, dict) else None
+                if not isinstance(text, str) or not text.strip():
+                    raise ValueError("record has no text")
+                metadata = record.get("metadata") or {}
+                if not isinstance(metadata, dict):
+                    raise ValueError("metadata is not an object")
+            except ValueError as e:
+                progress.invalid(number, str(e))
+                continue
+            progress.records += 1
+            yield Document(page_content=text, metadata=metadata)
+
+
+async def ingest_ndjson(service, body: AsyncIterator[bytes], job_id: str | None = None) -> NDJSONProgress:
+    """
+    Add the records of a streamed NDJSON body to a collection.
+
+    Args:
+        service: The collection's RAGService
+        body: The request body, chunk by chunk
+        job_id: Id to report progress under (generated by default)
+
+    Returns:
+        The final progress
+
+    Raises:
+        ValueError: If a record is longer than ndjson_max_record_bytes
+    """
+    settings = get_settings()
+    progress = NDJSONProgress(id=job_id or uuid.uuid4().hex[:12], collection=service.collection)
+    _register(progress)
+    lines: queue.Queue = queue.Queue(maxsize=settings.ingest_queue_size)
+    finished = threading.Event()
+
+    def work() -> int:
+        try:
+            return service.add_documents(
+                _records(lines, progress),
+                progress=lambda added: setattr(progress, "chunks_added", added),
+            )
+        finally:
+            finished.set()
+
+    def put(item) -> bool:
+        # Blocking put that gives up when the worker is gone
+        while not finished.is_set():
+            try:
+                lines.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    worker = asyncio.ensure_future(asyncio.to_thread(work))
+    # Start of the current (incomplete) line, in pieces so long records are not copied repeatedly
+    partial: list[bytes] = []
+    partial_size = 0
+    try:
+        async for chunk in body:
+            progress.bytes_read += len(chunk)
+            if b"\n" in chunk:
+                first, *complete, last = chunk.split(b"\n")
+                complete.insert(0, b"".join(partial) + first)
+                partial, partial_size = [last], len(last)
+            else:
+                complete = []
+                partial.append(chunk)
+                partial_size += len(chunk)
+            if partial_size > settings.ndjson_max_record_bytes:
+                raise ValueError(f"A record is longer than {settings.ndjson_max_record_bytes} bytes")
+            if complete and not await asyncio.to_thread(put, complete):
+                break
+        last = b"".join(partial)
+        if last.strip():
+            await asyncio.to_thread(put, [last])
+    except Exception as e:
+        progress.state, progress.error = "failed", str(e)
+        raise
+    finally:
+        await asyncio.to_thread(put, _DONE)
+        try:
+            progress.chunks_added = await worker
+            if progress.state == "running":
+                progress.state = "completed"
+        except Exception as e:
+            progress.state, progress.error = "failed", progress.error or str(e)
+            raise
+        finally:
+            progress.finished_at = time.time()
+            print(
+                f"[RAG] NDJSON import {progress.id}: {progress.records} records, "
+                f"{progress.chunks_added} chunks, {progress.invalid_records} invalid ({progress.state})"
+            )
+    return progress
@@ -1,13 +1,16 @@
+import asyncio
 import json
-from openai import OpenAI
 from app.config import get_settings
 from app.models import ChatMessage
 from app.tools.definitions import get_tools
-from app.tools.handlers import execute_tool
+from app.tools.handlers import execute_tools
 
 
 class OpenAIService:
     def __init__(self):
+        # openai is imported on first use (or at warm-up), not when the app is imported
+        from openai import OpenAI
+
         settings = get_settings()
         self.client = OpenAI(api_key=settings.openai_api_key)
         self.model = settings.openai_model
@@ -66,6 +69,7 @@ class OpenAIService:
         messages: list[ChatMessage],
         system_prompt: str | None = None,
         include_rag: bool = True,
+        collection: str | None = None,
     ) -> dict:
         """
         Send messages to OpenAI with function calling support.
@@ -81,6 +85,7 @@ class OpenAIService:
             messages: List of chat messages
             system_prompt: Optional system prompt to set behavior
             include_rag: Whether to include the knowledge base search tool
+            collection: Knowledge base collection the search tool uses (None = default)
         """
         openai_messages = []
 
@@ -184,17 +189,20 @@ Trigger: Questions about company services, billing, how to pay, tariffs, opening
                 ]
             })
 
-            # Execute each tool call
-            for tool_call in assistant_message.tool_calls:
-                function_name = tool_call.function.name
-                arguments = json.loads(tool_call.function.arguments)
-
+            # Execute all tool calls of this turn together, so several
+            # knowledge base searches become one batched search
+            calls = [
+                (tool_call.function.name, json.loads(tool_call.function.arguments))
+                for tool_call in assistant_message.tool_calls
+            ]
+            for function_name, arguments in calls:
                 print(f"[TOOL] Executing: {function_name}")
                 print(f"[TOOL] Arguments: {arguments}")
 
-                # Execute the tool
-                result = execute_tool(function_name, arguments)
+            # Off the event loop, so concurrent chats' searches can share embedding batches
+            results = await asyncio.to_thread(execute_tools, calls, collection)
 
+            for tool_call, (function_name, arguments), result in zip(assistant_message.tool_calls, calls, results):
                 print(f"[TOOL] Result: {result}")
 
                 tool_calls_made.append({
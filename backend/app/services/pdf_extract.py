@@ -0,0 +1,223 @@
+"""
+PDF page extraction with a per-page cache and parallel parsing.
+
+Text extraction with pypdf dominates ingestion time for large PDFs, so every
+extracted page is stored in a SQLite cache keyed by (file hash, page number).
+Re-uploading or re-syncing the same file then costs a hash and a lookup. The
+cache is bounded: least recently used files are evicted above pdf_page_cache_max_mb.
+Uncached pages of one large PDF are extracted by a process pool in page
+ranges, and pages are yielded in order as soon as they are ready so the
+chunker can start before the whole file is parsed.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator
+from langchain_core.documents import Document
+from app.services.manifest import file_sha256
+
+if TYPE_CHECKING:
+    from pypdf import PdfReader
+
+
+class PageCache:
+    """
+    SQLite store of extracted page text, safe to share between processes.
+
+    Per file it also records the page count (so a fully cached file is served
+    without opening it) and when it was last used. Above max_mb of page text,
+    the least recently used files are evicted.
+    """
+
+    def __init__(self, db_path: str, max_mb: float = 0):
+        """
+        Args:
+            db_path: SQLite file
+            max_mb: Page text kept at most, in MB (0 = no limit)
+        """
+        self.db_path = db_path
+        self.max_bytes = int(max_mb * 2**20)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " file_hash TEXT NOT NULL,"
+                " page INTEGER NOT NULL,"
+                " text TEXT NOT NULL,"
+                " PRIMARY KEY (file_hash, page))"
+            )
+            has_files = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'files'").fetchone()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                " file_hash TEXT PRIMARY KEY,"
+                " page_count INTEGER,"
+                " bytes INTEGER NOT NULL DEFAULT 0,"
+                " used_at REAL NOT NULL DEFAULT 0)"
+            )
+            if not has_files:
+                # Caches written before files were tracked: their page counts are learned on next use
+                conn.execute(
+                    "INSERT OR IGNORE INTO files (file_hash, bytes)"
+                    " SELECT file_hash, SUM(LENGTH(CAST(text AS BLOB))) FROM pages GROUP BY file_hash"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets parser processes write concurrently
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get_pages(self, file_hash: str) -> tuple[dict[int, str], int | None]:
+        """Cached pages of a file and its page count (None if not known yet)."""
+        with self._connect() as conn:
+            conn.execute("UPDATE files SET used_at = ? WHERE file_hash = ?", (time.time(), file_hash))
+            row = conn.execute("SELECT page_count FROM files WHERE file_hash = ?", (file_hash,)).fetchone()
+            rows = conn.execute("SELECT page, text FROM pages WHERE file_hash = ?", (file_hash,))
+            return dict(rows.fetchall()), row[0] if row else None
+
+    def put_pages(self, file_hash: str, pages: list[tuple[int, str]], page_count: int | None = None):
+        added = 0
+        with self._connect() as conn:
+            for page, text in pages:
+                # Same hash, same text: a page another process already stored is left as is
+                if conn.execute(
+                    "INSERT OR IGNORE INTO pages (file_hash, page, text) VALUES (?, ?, ?)", (file_hash, page, text)
+                ).rowcount:
+                    added += len(text.encode("utf-8"))
+            conn.execute(
+                "INSERT INTO files (file_hash, page_count, bytes, used_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (file_hash) DO UPDATE SET"
+                " page_count = COALESCE(excluded.page_count, page_count),"
+                " bytes = bytes + excluded.bytes, used_at = excluded.used_at",
+                (file_hash, page_count, added, time.time()),
+            )
+
+    def prune(self, keep: str | None = None) -> int:
+        """
+        Evict least recently used files until the page text fits in max_bytes.
+
+        Args:
+            keep: File hash never evicted (the file being read)
+
+        Returns:
+            Number of files evicted
+        """
+        if not self.max_bytes:
+            return 0
+        evicted = 0
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM files").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for file_hash, size in conn.execute(
+                "SELECT file_hash, bytes FROM files ORDER BY used_at"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                if file_hash == keep:
+                    continue
+                conn.execute("DELETE FROM pages WHERE file_hash = ?", (file_hash,))
+                conn.execute("DELETE FROM files WHERE file_hash = ?", (file_hash,))
+                total -= size
+                evicted += 1
+        return evicted
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.execute("DELETE FROM files")
+
+
+@lru_cache(maxsize=4)
+def _open_reader(path: str, mtime_ns: int) -> "PdfReader":
+    from pypdf import PdfReader
+
+    # Parsing the xref table is not free - reuse the reader for every task of the same file
+    return PdfReader(path)
+
+
+def _extract_range(path: str, pages: list[int], reader: "PdfReader | None" = None) -> list[tuple[int, str]]:
+    """Worker entry point: extract the text of the given pages."""
+    reader = reader or _open_reader(path, os.stat(path).st_mtime_ns)
+    return [(page, reader.pages[page].extract_text()) for page in pages]
+
+
+def extract_pdf_pages(
+    path: str,
+    cache: PageCache | None = None,
+    workers: int = 1,
+    pages_per_task: int = 32,
+    source: str | None = None,
+) -> Iterator[Document]:
+    """
+    Yield one Document per PDF page, in page order.
+
+    Metadata matches PyPDFLoader ({"source", "page"}) so chunks look the same
+    whichever path produced them.
+
+    Args:
+        path: PDF file to read
+        cache: Optional page cache
+        workers: Extraction processes for uncached pages (1 = in-process)
+        pages_per_task: Pages handed to a worker at a time
+        source: Value for the "source" metadata (defaults to path)
+    """
+    from pypdf import PdfReader
+
+    source = source or path
+    file_hash = file_sha256(path) if cache else None
+    cached, page_count = cache.get_pages(file_hash) if cache else ({}, None)
+
+    def page_document(page: int, text: str) -> Document:
+        return Document(page_content=text, metadata={"source": source, "page": page})
+
+    # Fully cached: served without parsing the file at all
+    if page_count is not None and len(cached) == page_count:
+        for page in range(page_count):
+            yield page_document(page, cached[page])
+        return
+
+    reader = PdfReader(path)
+    page_count = len(reader.pages)
+    missing = [page for page in range(page_count) if page not in cached]
+
+    if not missing:
+        if cache:
+            # Cached before page counts were recorded
+            cache.put_pages(file_hash, [], page_count)
+        for page in range(page_count):
+            yield page_document(page, cached[page])
+        return
+
+    tasks = [missing[i:i + pages_per_task] for i in range(0, len(missing), pages_per_task)]
+
+    if workers <= 1 or len(tasks) == 1:
+        results = (_extract_range(path, task, reader) for task in tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(tasks)))
+        results = pool.map(_extract_range, [path] * len(tasks), tasks)
+
+    try:
+        next_page = 0
+        for extracted in results:
+            if cache:
+                cache.put_pages(file_hash, extracted, page_count)
+            cached.update(extracted)
+            # Emit every page that is now contiguous with what was already yielded
+            while next_page < page_count and next_page in cached:
+                yield page_document(next_page, cached.pop(next_page))
+                next_page += 1
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    if cache:
+        cache.prune(keep=file_hash)
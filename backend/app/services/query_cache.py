@@ -0,0 +1,133 @@
+"""
+Bounded LRU caches for the query path.
+
+RAGService keeps two: normalized question -> embedding, and
+(normalized question, search parameters, index version) -> result. The index
+version changes on every add, delete, rebuild and clear, so a cached result
+can never outlive the index it was computed from; old entries simply age out.
+
+QuestionLog counts the questions a collection is asked, so the frequent ones
+can be pre-warmed into both caches at startup.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Hashable
+
+_WHITESPACE = re.compile(r"\s+")
+_MISSING = object()
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a question: NFC, case-folded, whitespace collapsed."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip().casefold()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int):
+        """maxsize 0 disables the cache (every get is a miss, put is a no-op)."""
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class QuestionLog:
+    """
+    How often each normalized question was asked, persisted to a JSON file so
+    the most frequent ones can be pre-warmed into the caches after a restart
+    (see app.services.warmup).
+
+    Holds at most max_entries questions; when full, the less frequent half is
+    dropped, so recurring questions survive and one-offs age out.
+    """
+
+    # Saved from the query path at most this often (and at shutdown), never per question
+    _SAVE_INTERVAL_SECONDS = 60.0
+
+    def __init__(self, path: str, max_entries: int):
+        """max_entries 0 disables the log."""
+        self.path = path
+        self.max_entries = max_entries
+        self._counts: dict[str, int] = {}
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        if max_entries > 0 and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._counts = {str(q): int(n) for q, n in json.load(f).items()}
+            except (OSError, ValueError, AttributeError) as e:
+                print(f"[RAG] Ignoring unreadable question log {path}: {e}")
+
+    def record(self, question: str):
+        if self.max_entries <= 0:
+            return
+        text = normalize_query(question)
+        if not text:
+            return
+        with self._lock:
+            self._counts[text] = self._counts.get(text, 0) + 1
+            if len(self._counts) > self.max_entries:
+                kept = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[: self.max_entries // 2]
+                self._counts = dict(kept)
+            self._unsaved += 1
+            save = time.monotonic() - self._saved_at >= self._SAVE_INTERVAL_SECONDS
+        if save:
+            self.save()
+
+    def top(self, n: int) -> list[str]:
+        """The n most frequent questions, most frequent first."""
+        with self._lock:
+            return [q for q, _ in sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[:n]]
+
+    def save(self):
+        with self._lock:
+            if not self._unsaved:
+                return
+            counts, self._unsaved, self._saved_at = dict(self._counts), 0, time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(counts, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
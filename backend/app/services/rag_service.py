@@ -1,16 +1,67 @@
+import contextlib
+import functools
+import json
 import os
 import pickle
+import threading
+import time
+import uuid
+from datetime import datetime
 from pathlib import Path
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import (
-    TextLoader,
-    PyPDFLoader,
-    Docx2txtLoader,
-)
-from langchain.schema import Document
+from typing import Callable, Iterable, Iterator
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from app.config import get_settings
+from app.services.chunk_store import ChunkStore
+from app.services.context_packing import pack_context, relevance_from_l2
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.embeddings import configured_model, create_embeddings
+from app.services.lexical import covers, query_terms, reciprocal_rank_fusion
+from app.services.metadata_filter import MetadataFilter, annotate
+from app.services.query_cache import LRUCache, QuestionLog, normalize_query
+from app.services.ingestion import SUPPORTED_EXTENSIONS, load_file, resolve_workers, stream_chunks
+from app.services.pdf_extract import PageCache, extract_pdf_pages
+from app.services.sharding import ShardPool
+from app.services.manifest import DocumentManifest, ManifestEntry, file_sha256
+from app.services.migration import EmbeddingMigration
+from app.services import snapshot
+from app.services.text_splitter import create_text_splitter, token_counter
+from app.services.vector_file import VectorFile
+from app.services.vector_index import (
+    IndexConfig,
+    all_vectors,
+    build_index,
+    exact_rerank,
+    index_kind,
+    index_memory_bytes,
+    needs_rebuild,
+    reduce_dims,
+    search_params,
+    supports_selector,
+)
+
+def _write_operation(method):
+    """
+    Mark a method as writing to the collection while it runs (see
+    RAGService.busy). Waits while writes are paused (see pause_writes), and
+    writes take turns: one runs at a time.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._writes_changed:
+            while self._writes_paused:
+                self._writes_changed.wait()
+            self._active_writes += 1
+        try:
+            with self._write_lock:
+                return method(self, *args, **kwargs)
+        finally:
+            with self._writes_changed:
+                self._active_writes -= 1
+                self._writes_changed.notify_all()
+    return wrapper
 
 
 class RAGService:
@@ -18,73 +69,541 @@ class RAGService:
     #Chunking
     #Persistence
     #Retrieval config
-    def __init__(self):
+    def __init__(
+        self,
+        collection: str | None = None,
+        persist_directory: str | None = None,
+        embeddings: Embeddings | None = None,
+        query_batcher: EmbeddingBatcher | None = None,
+        embedding_cache: LRUCache | None = None,
+        pdf_cache: PageCache | None = None,
+        shard_count: int | None = None,
+    ):
+        """
+        Args:
+            collection: Collection name (defaults to settings.collection_name)
+            persist_directory: Where the collection lives (defaults to settings.chroma_persist_directory)
+            embeddings, query_batcher, embedding_cache, pdf_cache: Shared with
+                other collections when given (see CollectionManager), else created here
+            shard_count: Shard worker processes (defaults to settings.shard_count; 0 = in-process index)
+        """
         settings = get_settings()
-        self.embeddings = OpenAIEmbeddings(
-            openai_api_key=settings.openai_api_key,
-            model=settings.openai_embedding_model, #embedding model choice must stay consistent across indexing and querying. If you change the model later, old vectors become invalid.
+        self.collection = collection or settings.collection_name
+        #embedding model choice must stay consistent across indexing and querying. If you change the model later, old vectors become invalid (see app.services.migration).
+        self.embedding_model = configured_model(settings)
+        self.embeddings = embeddings or create_embeddings(self.embedding_model)
+        #Concurrent query embeddings are coalesced into one call (None = embed each query directly)
+        self.query_batcher: EmbeddingBatcher | None = query_batcher
+        if query_batcher is None and settings.query_batch_window_ms > 0:
+            self.query_batcher = EmbeddingBatcher(
+                lambda texts: self.embeddings.embed_documents(texts),
+                max_batch_size=settings.query_batch_max_size,
+                max_wait_ms=settings.query_batch_window_ms,
+            )
+        #Repeated questions skip the embedding call and, until the index changes, the search
+        self.embedding_cache = embedding_cache or LRUCache(settings.query_embedding_cache_size)
+        self.result_cache = LRUCache(settings.query_result_cache_size)
+        #Question frequencies, the most frequent are pre-warmed into the caches at startup
+        self.question_log = QuestionLog(
+            os.path.join(persist_directory or settings.chroma_persist_directory, "frequent_questions.json"),
+            settings.question_log_size,
         )
-        self.persist_directory = settings.chroma_persist_directory
+        #Bumped on every add, delete, rebuild and clear; part of every result cache key
+        self.index_version = 0
+        #Adds, syncs and clears in progress - a collection that is being written is never evicted
+        self._active_writes = 0
+        self._writes_lock = threading.Lock()
+        self._writes_changed = threading.Condition(self._writes_lock)
+        self._writes_paused = False
+        #One write at a time (see _write_operation); reentrant for writes that call other writes
+        self._write_lock = threading.RLock()
+        #Searches run concurrently, index changes wait for them and hold new ones back (see _reading / _mutating)
+        self._guard = threading.Condition(threading.Lock())
+        self._searches = 0
+        self._mutating_now = False
+        #Odd while a migration swaps in another index, bumped again when done (see _retrieve)
+        self.index_generation = 0
+        self.persist_directory = persist_directory or settings.chroma_persist_directory
         self.faiss_index_path = os.path.join(self.persist_directory, "faiss_index") #where the FAISS index will be saved or loaded from
         self.chunk_size = settings.chunk_size
         self.chunk_overlap = settings.chunk_overlap #Overlap is important so context does not get cut in unnatural places, especially for explanations, definitions, or code blocks.
         self.top_k = settings.retrieval_top_k #This controls how many chunks are retrieved during similarity search.
+        #Context packing: merge overlapping hits and fill a token budget instead of joining top_k chunks
+        self.context_token_budget = settings.context_token_budget
+        self.context_candidates = settings.context_candidates
+        self.context_min_relevance = settings.context_min_relevance
+        self.tokenizer_encoding = settings.tokenizer_encoding
+        # Loaded with the service (startup / warm-up), never on the query path
+        self._count_tokens = token_counter(self.tokenizer_encoding) if self.context_token_budget else None
+        #"vector" or "hybrid" (BM25 over the chunk store fused with vector hits)
+        if settings.retrieval_mode not in ("vector", "hybrid"):
+            raise ValueError(f"Unknown retrieval_mode: {settings.retrieval_mode}")
+        self.retrieval_mode = settings.retrieval_mode
+        self.lexical_candidates = settings.lexical_candidates
+        self.rrf_k = settings.rrf_k
+        self.lexical_fast_path = settings.lexical_fast_path
+        self.lexical_fast_path_max_terms = settings.lexical_fast_path_max_terms
+        self.lexical_fast_path_margin = settings.lexical_fast_path_margin
+        self._fast_path_queries = 0
+        #Filtered searches over at most this many chunks score their exact vectors instead of the index
+        self.filter_exact_max = settings.filter_exact_max
+        self.ingest_workers = settings.ingest_workers
+        self.ingest_queue_size = settings.ingest_queue_size
+        self.embedding_batch_size = settings.embedding_batch_size
+        self.pdf_page_workers = settings.pdf_page_workers
+        self.pdf_pages_per_task = settings.pdf_pages_per_task
+        #Extracted PDF page text keyed by file hash, so re-uploads skip extraction (shared by all collections)
+        self.pdf_cache_path = os.path.join(settings.chroma_persist_directory, "pdf_pages.sqlite")
+        self.pdf_cache = pdf_cache
+        if pdf_cache is None and settings.pdf_page_cache:
+            self.pdf_cache = PageCache(self.pdf_cache_path, settings.pdf_page_cache_max_mb)
  
-        #tries to split on natural boundaries first such as paragraphs, then sentences, then characters
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len, #chunk size is measured in characters, not tokens
-        )
+        #"hebrew" (native, token-sized) or "recursive" (LangChain, character-sized), see create_text_splitter
+        self.text_splitter = create_text_splitter(settings)
+
+        #Index type (flat / hnsw / ivf), vector quantization and tuning parameters
+        self.index_config = IndexConfig.from_settings(settings)
+        self.index_file = os.path.join(self.faiss_index_path, "index.faiss")
+        self.index_meta_path = os.path.join(self.faiss_index_path, "index_meta.json")
+        self._index_meta: dict = {}  # How the current index was built (see build_index)
+        #Full-precision copy of every vector, rows aligned with index positions
+        self.vector_file: VectorFile | None = None
+        self._recall_cache: tuple[tuple, dict] | None = None
 
-        self.vectorstore: FAISS | None = self._load_vectorstore()
+        #Chunk text and metadata live on disk and are fetched only for search hits
+        self.index: faiss.Index | None = None
+        self.chunk_store: ChunkStore | None = None
         self._document_count = 0
+        #Sharded mode: the index lives in shard worker processes and this service coordinates them
+        self.shards: ShardPool | None = None
+        shard_count = settings.shard_count if shard_count is None else shard_count
+        if shard_count > 0:
+            if os.path.exists(self.index_file):
+                print(f"[RAG] Sharded mode ignores the unsharded index in {self.faiss_index_path} - re-index to use it")
+            self.shards = ShardPool(
+                self.collection,
+                self.faiss_index_path,
+                shard_count,
+                omp_threads=settings.shard_omp_threads,
+                timeout=settings.shard_timeout_seconds,
+            )
+        else:
+            self._load_index()
+            self._maybe_rebuild_index()
+        # An index migrated to another model keeps answering with that model
+        index_model = self._index_meta.get("embedding_model", self.embedding_model)
+        if index_model != self.embedding_model:
+            print(f"[RAG] Collection '{self.collection}' is embedded with {index_model}, not {self.embedding_model}")
+            self._use_embeddings(create_embeddings(index_model), index_model)
 
-    def _load_vectorstore(self) -> FAISS | None:
-        """Load existing FAISS index if it exists."""
+        #Tracks which files are already indexed so directory syncs are incremental
+        self.manifest = DocumentManifest(os.path.join(self.persist_directory, "manifest.json"))
+        #Re-embedding with another model in the background (see app.services.migration)
+        self.migration = EmbeddingMigration(self)
+
+    def _load_index(self):
+        """Load the saved FAISS index and its chunk store, if they exist."""
         try:
-            if os.path.exists(self.faiss_index_path):
-                return FAISS.load_local(
-                    self.faiss_index_path,
-                    self.embeddings,
-                    allow_dangerous_deserialization=True,
-                )
+            if os.path.exists(self.index_file):
+                if os.path.exists(os.path.join(self.faiss_index_path, "index.pkl")):
+                    self._migrate_pickled_docstore()
+                self.index, self.chunk_store, self.vector_file, self._index_meta = self._read_index()
         except Exception as e:
             print(f"Could not load existing index: {e}")
-        return None
 
-    def _save_vectorstore(self):
-        """Save FAISS index to disk."""
-        if self.vectorstore:
-            os.makedirs(self.persist_directory, exist_ok=True)
-            self.vectorstore.save_local(self.faiss_index_path)
+    def _read_index(self) -> tuple[faiss.Index, ChunkStore, VectorFile, dict]:
+        """
+        Open the saved index, chunk store and vector file without installing them.
+
+        Raises:
+            ValueError: If the files are out of sync with each other
+        """
+        meta = {}
+        if os.path.exists(self.index_meta_path):
+            with open(self.index_meta_path) as f:
+                meta = json.load(f)
+        index = faiss.read_index(self.index_file)
+        chunk_store = ChunkStore(self.faiss_index_path)
+        if len(chunk_store) != index.ntotal:
+            chunk_store.close()
+            raise ValueError("Chunk store is out of sync with the index - clear and re-index")
+        return index, chunk_store, self._open_vector_file(index, meta), meta
+
+    def _install_index(self, embeddings: Embeddings, model: str):
+        """
+        Swap in the index saved in faiss_index_path and the embedding model it
+        was built with (migration switch and rollback, snapshot import; writes
+        are paused and the caller holds _mutating()).
+        """
+        index, chunk_store, vector_file, meta = self._read_index()
+        self.index_generation += 1
+        self.index, self.chunk_store, self.vector_file, self._index_meta = index, chunk_store, vector_file, meta
+        self._use_embeddings(embeddings, model)
+        self._recall_cache = None
+        self.index_version += 1
+        self.index_generation += 1
+
+    def _close_index_files(self):
+        """
+        Close the chunk store and unmap the vector file, so their directory can
+        be renamed or removed (Windows refuses while they are open). The caller
+        holds _mutating() and installs an index afterwards.
+        """
+        if self.chunk_store is not None:
+            self.chunk_store.close()
+        if self.vector_file is not None:
+            self.vector_file.close()
+
+    def _use_embeddings(self, embeddings: Embeddings, model: str):
+        """Embed with another model from now on (query embeddings are cached per model)."""
+        changed = model != self.embedding_model
+        self.embeddings, self.embedding_model = embeddings, model
+        if changed and self.query_batcher is not None:
+            # The batcher may be shared with collections still on the other model
+            settings = get_settings()
+            self.query_batcher = EmbeddingBatcher(
+                lambda texts: self.embeddings.embed_documents(texts),
+                max_batch_size=settings.query_batch_max_size,
+                max_wait_ms=settings.query_batch_window_ms,
+            )
+
+    @contextlib.contextmanager
+    def _reading(self):
+        """Keep the index, chunk store and vector file from changing until the block ends."""
+        with self._guard:
+            while self._mutating_now:
+                self._guard.wait()
+            self._searches += 1
+        try:
+            yield
+        finally:
+            with self._guard:
+                self._searches -= 1
+                if not self._searches:
+                    self._guard.notify_all()
+
+    @contextlib.contextmanager
+    def _mutating(self):
+        """
+        Exclusive access to the index, chunk store and vector file: waits for
+        the searches in flight and holds new ones until the block ends. Not
+        reentrant; callers hold the write lock, so only one runs at a time.
+        """
+        with self._guard:
+            self._mutating_now = True
+            while self._searches:
+                self._guard.wait()
+        try:
+            yield
+        finally:
+            with self._guard:
+                self._mutating_now = False
+                self._guard.notify_all()
+
+    @contextlib.contextmanager
+    def pause_writes(self):
+        """Wait for running writes to finish and hold new ones until the block exits."""
+        with self._writes_changed:
+            while self._writes_paused:
+                self._writes_changed.wait()
+            self._writes_paused = True
+            while self._active_writes:
+                self._writes_changed.wait()
+        try:
+            yield
+        finally:
+            with self._writes_changed:
+                self._writes_paused = False
+                self._writes_changed.notify_all()
+
+    def _migrate_pickled_docstore(self):
+        """One-off move of chunks from LangChain's index.pkl into the chunk store."""
+        from langchain_community.vectorstores import FAISS
+
+        pickle_path = os.path.join(self.faiss_index_path, "index.pkl")
+        vectorstore = FAISS.load_local(
+            self.faiss_index_path,
+            self.embeddings,
+            allow_dangerous_deserialization=True,
+        )
+        store = ChunkStore(self.faiss_index_path)
+        store.clear()
+        ids = [vectorstore.index_to_docstore_id[p] for p in range(vectorstore.index.ntotal)]
+        for start in range(0, len(ids), 10_000):
+            batch = ids[start:start + 10_000]
+            store.add(batch, [vectorstore.docstore.search(chunk_id) for chunk_id in batch])
+        store.save()
+        store.close()
+        os.remove(pickle_path)
+        print(f"[RAG] Migrated {len(ids)} chunks from index.pkl to the chunk store")
+
+    def _save_index(self):
+        """Save FAISS index and chunk store to disk."""
+        if self.shards is not None:
+            self.shards.broadcast("save")
+        elif self.index is not None:
+            os.makedirs(self.faiss_index_path, exist_ok=True)
+            # Write the index first and swap it in after the chunk store commits
+            tmp_path = f"{self.index_file}.{uuid.uuid4().hex}.tmp"
+            faiss.write_index(self.index, tmp_path)
+            self.chunk_store.save()
+            os.replace(tmp_path, self.index_file)
+            with open(self.index_meta_path, "w") as f:
+                json.dump({**self._index_meta, "embedding_model": self.embedding_model}, f)
+
+    def _open_vector_file(self, index: faiss.Index, meta: dict) -> VectorFile:
+        """The full-precision vector file, created for indexes saved without one."""
+        dim = meta.get("vector_dimensions", index.d)
+        vector_file = VectorFile(os.path.join(self.faiss_index_path, "vectors.f32"), dim)
+        if len(vector_file) == index.ntotal:
+            return vector_file
+        if meta.get("quantization", "none") != "none" or index.d != dim:
+            raise ValueError("Vector file is missing or out of sync with a quantized or reduced index - clear and re-index")
+        # Index saved before the vector file existed: its float32 vectors are exact
+        vector_file.rewrite(all_vectors(index))
+        return vector_file
+
+    def _maybe_rebuild_index(self):
+        """Switch index type or quantization, or retrain, when the corpus size calls for it."""
+        if self.index is None:
+            return
+        if needs_rebuild(self.index_config, self._index_meta, self.index.ntotal, self.vector_file.dim):
+            self._rebuild_index()
+
+    def _rebuild_index(self, drop_positions: np.ndarray | None = None):
+        """
+        Rebuild the FAISS index from the vector file, optionally dropping chunks.
+
+        Used to switch index type, (re)train IVF and to delete from index types
+        whose ids cannot be removed in place.
+        """
+        keep = np.arange(self.index.ntotal)
+        if drop_positions is not None:
+            keep = np.setdiff1d(keep, drop_positions)
+        # Always rebuild from the exact vectors, never from quantized codes
+        vectors = self.vector_file.read_all()[keep]
+
+        start = time.perf_counter()
+        # Built while searches still use the old index (writes hold the write lock, so nothing else changes it)
+        index, meta = build_index(self.index_config, vectors)
+        with self._mutating():
+            self.index, self._index_meta = index, meta
+            self.index_version += 1
+            if drop_positions is not None:
+                self.chunk_store.delete(drop_positions)
+                self.vector_file.rewrite(vectors)
+        print(f"[RAG] Built {self._index_meta['description']} index over {len(keep)} vectors in {time.perf_counter() - start:.2f}s")
+
+    @property
+    def busy(self) -> bool:
+        """Whether documents are being added, synced or cleared, or a migration is running."""
+        return self._active_writes > 0 or self.migration.running
+
+    def warm_up(self, questions: int, dummy_search: bool = True) -> dict:
+        """
+        Fill the query caches with the most frequent recorded questions (one
+        embedding call, one batched search) and optionally run a search with
+        a zero vector, which pages the index in without calling the API.
+
+        Args:
+            questions: How many of the most frequent questions to pre-warm (0 = none)
+            dummy_search: Run the zero-vector search
+
+        Returns:
+            Seconds spent on each step and the number of questions pre-warmed
+        """
+        timings = {"questions": 0}
+        top = self.question_log.top(questions) if questions > 0 else []
+        if top and (self.index is not None or self.shards is not None):
+            started = time.perf_counter()
+            self._query_many(top)
+            timings["questions"] = len(top)
+            timings["query_cache_seconds"] = round(time.perf_counter() - started, 3)
+        if dummy_search and self.index is not None:
+            started = time.perf_counter()
+            zero = [0.0] * self.vector_file.dim
+            self._retrieve([""], self._default_k(), None, None, embed=lambda texts: [zero])
+            timings["dummy_search_seconds"] = round(time.perf_counter() - started, 3)
+        return timings
 
-    def add_documents(self, documents: list[Document]) -> int:
+    def memory_bytes(self) -> int:
+        """
+        RAM held by the loaded index and chunk store bookkeeping (the vector
+        file is memory-mapped). Shard workers' memory is not counted.
+        """
+        with self._reading():
+            if self.index is None:
+                return 0
+            return index_memory_bytes(self.index) + self.chunk_store.memory_bytes()
+
+    @_write_operation
+    def add_documents(
+        self, documents: Iterable[Document], progress: Callable[[int], None] | None = None
+    ) -> int:
         """
         Add documents to the vector store.
 
+        Documents are split one page at a time and embedded in batches, so a
+        generator of pages (e.g. iter_file_documents) is never fully buffered.
+
         Args:
-            documents: List of LangChain Document objects
+            documents: LangChain Document objects (a list or any iterable)
+            progress: Called with the number of chunks added so far after every batch
 
         Returns:
             Number of chunks added
         """
-        # Split documents into chunks
-        chunks = self.text_splitter.split_documents(documents)
+        added = 0
+        batch: list[Document] = []
+
+        for document in documents:
+            # Split documents into chunks
+            batch.extend(self.text_splitter.split_documents([document]))
+            if len(batch) >= self.embedding_batch_size:
+                added += len(self._add_chunks(batch))
+                batch = []
+                if progress:
+                    progress(added)
+        added += len(self._add_chunks(batch))
+        if progress:
+            progress(added)
+
+        if added:
+            self._save_index()
+
+        return added
+
+    def iter_file_documents(self, file_path: str, source: str | None = None) -> Iterator[Document]:
+        """
+        Load one file as a stream of pages.
+
+        PDFs are extracted in parallel through the page cache; other formats
+        go through their LangChain loader.
+
+        Args:
+            file_path: File to load
+            source: Value for the "source" metadata (defaults to file_path)
+        """
+        if Path(file_path).suffix.lower() == ".pdf":
+            yield from extract_pdf_pages(
+                file_path,
+                cache=self.pdf_cache,
+                workers=resolve_workers(self.pdf_page_workers),
+                pages_per_task=self.pdf_pages_per_task,
+                source=source,
+            )
+            return
+
+        for document in load_file(file_path):
+            if source:
+                document.metadata["source"] = source
+            yield document
+
+    def _add_chunks(
+        self,
+        chunks: list[Document],
+        vectors: np.ndarray | None = None,
+        ids: list[str] | None = None,
+    ) -> list[str]:
+        """
+        Embed and index already-split chunks. Returns their docstore ids.
 
+        Args:
+            chunks: The chunks
+            vectors: Their embeddings, when already computed (else embedded here)
+            ids: Their chunk ids (new ids are generated by default)
+        """
         if not chunks:
-            return 0
+            return []
+        ids = ids or [str(uuid.uuid4()) for _ in chunks]
+        if vectors is None:
+            texts = [chunk.page_content for chunk in chunks]
+            vectors = np.array(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+        if self.shards is not None:
+            self.shards.add(ids, chunks, vectors)
+            self._document_count += len(chunks)
+            self.index_version += 1
+            return ids
+
+        for chunk in chunks:
+            annotate(chunk.metadata, chunk.page_content)
+
+        with self._mutating():
+            if self.index is None:
+                dim = vectors.shape[1]
+                dims = self.index_config.search_dims_for(dim)
+                self.index = faiss.IndexFlatL2(dims)
+                self.chunk_store = ChunkStore(self.faiss_index_path)
+                self.chunk_store.clear()
+                self._index_meta = {
+                    "index_type": "flat",
+                    "quantization": "none",
+                    "description": "Flat",
+                    "trained_on": 0,
+                    "dimensions": dims,
+                    "vector_dimensions": dim,
+                }
+                self.vector_file = VectorFile(os.path.join(self.faiss_index_path, "vectors.f32"), dim)
+                self.vector_file.clear()
+
+            # Add to the index (possibly reduced); chunks and exact vectors go to disk in the same order
+            self.index.add(reduce_dims(vectors, self.index.d))
+            self.chunk_store.add(ids, chunks)
+            self.vector_file.append(vectors)
+
+            self._document_count += len(chunks)
+            self.index_version += 1
+        self._maybe_rebuild_index()
+        return ids
 
-        # Add to vectorstore
-        if self.vectorstore is None:
-            self.vectorstore = FAISS.from_documents(chunks, self.embeddings)
+    def _delete_chunks(self, ids: list[str]) -> int:
+        """Remove chunks by chunk id. Ids that are no longer indexed are ignored."""
+        if self.shards is not None and ids:
+            removed = self.shards.delete(ids)
+            self.index_version += 1
+            return removed
+        if self.index is None or not ids:
+            return 0
+        positions = self.chunk_store.positions_of(ids)
+        if not len(positions):
+            return 0
+        if index_kind(self.index) == "flat":
+            # Flat indexes compact in place, shifting later positions down like the chunk store
+            keep = np.setdiff1d(np.arange(self.index.ntotal), positions)
+            vectors = self.vector_file.read_all()[keep]
+            with self._mutating():
+                self.index.remove_ids(positions)
+                self.chunk_store.delete(positions)
+                self.vector_file.rewrite(vectors)
+                self.index_version += 1
         else:
-            self.vectorstore.add_documents(chunks)
+            # HNSW cannot remove ids and IVF does not renumber them
+            self._rebuild_index(drop_positions=positions)
+        return len(positions)
+
+    @_write_operation
+    def import_vectors(self, vectors_path: str, records_path: str, model: str | None = None) -> int:
+        """
+        Add chunks with precomputed embeddings, without calling the embedding API.
+
+        Args:
+            vectors_path: .npy matrix, one row per record
+            records_path: JSONL chunk records ({"text", "metadata", "id"})
+            model: Embedding model of the vectors (checked when given)
 
-        self._document_count += len(chunks)
-        self._save_vectorstore()
+        Returns:
+            Number of chunks added
+        """
+        return snapshot.import_vectors(self, vectors_path, records_path, model)
 
-        return len(chunks)
+    def export_snapshot(self, path: str) -> dict:
+        """Write the index, vectors, chunk store and manifest to one snapshot file (see app.services.snapshot)."""
+        return snapshot.export_snapshot(self, path)
+
+    def import_snapshot(self, path: str, replace: bool = False) -> dict:
+        """Replace the index with a snapshot file, without calling the embedding API."""
+        return snapshot.import_snapshot(self, path, replace)
 
     def add_texts(self, texts: list[str], metadatas: list[dict] | None = None) -> int:
         """
@@ -103,68 +622,475 @@ class RAGService:
         ]
         return self.add_documents(documents)
 
+    @_write_operation
+    def add_files(self, files: dict[str, str]) -> dict:
+        """
+        Add several files, parsed in parallel and streamed through splitting
+        and batched embedding like a directory sync (see app.services.ingestion).
+        Unlike sync_directory, the files are not tracked in the manifest.
+
+        Args:
+            files: File path -> source name stored with its chunks
+
+        Returns:
+            Summary dict with chunks per added file, failed files with their
+            errors, and the total number of chunks added
+        """
+        summary = {"files": {}, "failed": [], "errors": {}, "chunks_added": 0}
+        pending: list[tuple[str, list[Document]]] = []
+        pending_chunks = 0
+
+        def flush():
+            nonlocal pending_chunks
+            ids = self._add_chunks([chunk for _, chunks in pending for chunk in chunks])
+            for source, chunks in pending:
+                summary["files"][source] = summary["files"].get(source, 0) + len(chunks)
+            summary["chunks_added"] += len(ids)
+            pending.clear()
+            pending_chunks = 0
+
+        for loaded in stream_chunks(
+            list(files),
+            self.text_splitter.split_documents,
+            workers=self.ingest_workers,
+            queue_size=self.ingest_queue_size,
+            pdf_cache_path=self.pdf_cache_path if self.pdf_cache else None,
+        ):
+            # A failed parser pool reports its error without a path
+            source = files.get(loaded.path, loaded.path)
+            if loaded.error is not None:
+                print(f"Error loading {source}: {loaded.error}")
+                summary["failed"].append(source)
+                summary["errors"][source] = loaded.error
+                continue
+            for chunk in loaded.documents:
+                chunk.metadata["source"] = source
+            pending.append((source, loaded.documents))
+            pending_chunks += len(loaded.documents)
+            if pending_chunks >= self.embedding_batch_size:
+                flush()
+        flush()
+
+        if summary["chunks_added"]:
+            self._save_index()
+        return summary
+
     def load_directory(self, directory_path: str) -> int:
         """
         Load all supported documents from a directory.
 
+        Only new or modified files are embedded - see sync_directory.
+
         Args:
             directory_path: Path to directory containing documents
 
         Returns:
             Number of chunks added
         """
-        documents = []
+        return self.sync_directory(directory_path)["chunks_added"]
+
+    @_write_operation
+    def sync_directory(self, directory_path: str) -> dict:
+        """
+        Incrementally sync a directory with the index using the file manifest.
+
+        A file is unchanged when its size and mtime match the manifest, or when
+        they differ but the content hash is the same. New and modified files are
+        parsed in parallel and streamed through splitting and batched embedding
+        (see app.services.ingestion); chunks of removed files are deleted.
+
+        Args:
+            directory_path: Path to directory containing documents
+
+        Returns:
+            Summary dict with added/updated/removed/failed file lists, the
+            number of unchanged files, chunk counts and elapsed seconds
+        """
+        start = time.perf_counter()
         path = Path(directory_path)
 
         if not path.exists():
             raise ValueError(f"Directory not found: {directory_path}")
 
-        # Load different file types
-        for file_path in path.rglob("*"):
-            if file_path.is_file():
-                try:
-                    if file_path.suffix in [".txt", ".md"]:
-                        loader = TextLoader(str(file_path), encoding="utf-8")
-                        documents.extend(loader.load())
-                    elif file_path.suffix == ".pdf":
-                        loader = PyPDFLoader(str(file_path))
-                        documents.extend(loader.load())
-                    elif file_path.suffix in [".docx", ".doc"]:
-                        loader = Docx2txtLoader(str(file_path))
-                        documents.extend(loader.load())
-                except Exception as e:
-                    print(f"Error loading {file_path}: {e}")
-
-        if documents:
-            return self.add_documents(documents)
-        return 0
-
-    def query(self, question: str, k: int | None = None) -> tuple[str, list[str]]:
+        root = str(path.resolve())
+        summary = {
+            "added": [],
+            "updated": [],
+            "removed": [],
+            "failed": [],
+            "errors": {},
+            "unchanged": 0,
+            "chunks_added": 0,
+            "chunks_removed": 0,
+        }
+        seen = set()
+        changed: dict[str, ManifestEntry] = {}
+
+        for file_path in sorted(path.rglob("*")):
+            if not file_path.is_file() or file_path.suffix not in SUPPORTED_EXTENSIONS:
+                continue
+
+            key = str(file_path.resolve())
+            seen.add(key)
+            stat = file_path.stat()
+            entry = self.manifest.get(key)
+
+            if entry and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                summary["unchanged"] += 1
+                continue
+
+            try:
+                digest = file_sha256(key)
+            except OSError as e:
+                summary["failed"].append(key)
+                summary["errors"][key] = str(e)
+                continue
+
+            if entry and entry.sha256 == digest:
+                # Touched but not modified - just refresh the stat fields
+                entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+                summary["unchanged"] += 1
+                continue
+
+            changed[key] = ManifestEntry(
+                path=key, size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha256=digest
+            )
+
+        # Embedding stage: group chunks of several files into one embedding call
+        pending: list[tuple[str, list[Document]]] = []
+        # Deleted in one pass at the end - rebuilding indexes per file would be wasteful
+        stale_ids: list[str] = []
+        pending_chunks = 0
+
+        def flush():
+            nonlocal pending_chunks
+            if not pending:
+                return
+            for key, chunks in pending:
+                # Document date for filtering: the file's modification date
+                modified = datetime.fromtimestamp(changed[key].mtime_ns / 1e9).date().isoformat()
+                for chunk in chunks:
+                    chunk.metadata.setdefault("date", modified)
+            ids = self._add_chunks([chunk for _, chunks in pending for chunk in chunks])
+            offset = 0
+            for key, chunks in pending:
+                new_entry = changed[key]
+                new_entry.chunk_ids = ids[offset:offset + len(chunks)]
+                offset += len(chunks)
+                # Old chunks are dropped at the end, once the new version is indexed
+                old_entry = self.manifest.get(key)
+                if old_entry:
+                    stale_ids.extend(old_entry.chunk_ids)
+                self.manifest.set(new_entry)
+                summary["updated" if old_entry else "added"].append(key)
+            summary["chunks_added"] += len(ids)
+            pending.clear()
+            pending_chunks = 0
+
+        for loaded in stream_chunks(
+            list(changed),
+            self.text_splitter.split_documents,
+            workers=self.ingest_workers,
+            queue_size=self.ingest_queue_size,
+            pdf_cache_path=self.pdf_cache_path if self.pdf_cache else None,
+        ):
+            if loaded.error is not None:
+                print(f"Error loading {loaded.path}: {loaded.error}")
+                summary["failed"].append(loaded.path)
+                summary["errors"][loaded.path] = loaded.error
+                continue
+
+            pending.append((loaded.path, loaded.documents))
+            pending_chunks += len(loaded.documents)
+            if pending_chunks >= self.embedding_batch_size:
+                flush()
+        flush()
+
+        for key in self.manifest.paths_under(root):
+            if key not in seen:
+                entry = self.manifest.remove(key)
+                stale_ids.extend(entry.chunk_ids)
+                summary["removed"].append(key)
+
+        summary["chunks_removed"] = self._delete_chunks(stale_ids)
+
+        self._save_index()
+        self.manifest.save()
+
+        summary["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+    def query(
+        self,
+        question: str,
+        k: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        filters: MetadataFilter | None = None,
+    ) -> tuple[str, list[str]]:
         """
         Query the vector store for relevant context.
 
         Args:
             question: The user's question
             k: Number of results to return (defaults to settings.retrieval_top_k)
+            nprobe: IVF cells to visit for this query (defaults to settings)
+            ef_search: HNSW search breadth for this query (defaults to settings)
+            filters: Only search chunks with matching metadata (source, type, language, date)
 
         Returns:
             Tuple of (combined context string, list of source names)
         """
-        if self.vectorstore is None:
+        if self.index is None and self.shards is None:
             return "", []
 
-        k = k or self.top_k
+        k = k or self._default_k()
+        self.question_log.record(question)
+
+        # Results are only valid for the index version they were computed on
+        key = (normalize_query(question), k, nprobe, ef_search, filters, self.index_version)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return cached[0], list(cached[1])
+
+        results = self._retrieve(
+            [question], k, nprobe, ef_search, embed=lambda questions: [self._embed_query(questions[0])], filters=filters
+        )[0]
+        context, sources = self._combine_results(results)
+        self.result_cache.put(key, (context, tuple(sources)))
+        return context, sources
+
+    def _embed_query(self, question: str) -> list[float]:
+        """
+        Embed one query: from the embedding cache, else through the
+        micro-batcher when it is enabled.
+        """
+        text = normalize_query(question)
+        # Keyed by model: the cache may be shared with collections embedded with another one
+        key = (self.embedding_model, text)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            if self.query_batcher:
+                embedding = self.query_batcher.embed(text)
+            else:
+                embedding = self.embeddings.embed_query(text)
+            self.embedding_cache.put(key, embedding)
+        return embedding
+
+    def query_many(
+        self,
+        questions: list[str],
+        k: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        filters: MetadataFilter | None = None,
+    ) -> list[tuple[str, list[str]]]:
+        """
+        Query the vector store for several questions at once.
+
+        Questions missing from the caches are embedded in one embedding call
+        and searched with one batched FAISS search, which is much cheaper than
+        calling query() in a loop (evaluation jobs, several searches in one
+        agent turn).
+
+        Args:
+            questions: The questions
+            k: Number of results per question (defaults to settings.retrieval_top_k)
+            nprobe: IVF cells to visit (defaults to settings)
+            ef_search: HNSW search breadth (defaults to settings)
+            filters: Only search chunks with matching metadata (applies to every question)
+
+        Returns:
+            One (combined context string, list of source names) per question, in order
+        """
+        for question in questions:
+            self.question_log.record(question)
+        return self._query_many(questions, k, nprobe, ef_search, filters)
+
+    def _query_many(
+        self,
+        questions: list[str],
+        k: int | None = None,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        filters: MetadataFilter | None = None,
+    ) -> list[tuple[str, list[str]]]:
+        """query_many() without recording the questions (see warm_up)."""
+        if (self.index is None and self.shards is None) or not questions:
+            return [("", []) for _ in questions]
+
+        k = k or self._default_k()
+
+        texts = [normalize_query(question) for question in questions]
+        keys = [(text, k, nprobe, ef_search, filters, self.index_version) for text in texts]
+        results = [self.result_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            searched = self._retrieve(
+                [texts[i] for i in missing], k, nprobe, ef_search, embed=self._embed_many, filters=filters
+            )
+            for i, hits in zip(missing, searched):
+                context, sources = self._combine_results(hits)
+                results[i] = (context, tuple(sources))
+                self.result_cache.put(keys[i], results[i])
+
+        return [(context, list(sources)) for context, sources in results]
+
+    def _filter_mask(self, filters: MetadataFilter | None) -> np.ndarray | None:
+        """Bitmap over index positions of the chunks a filter allows (None = no filter)."""
+        if filters is None:
+            return None
+        return self.chunk_store.filter_mask(filters)
+
+    def _embed_many(self, texts: list[str]) -> list[list[float]]:
+        """Embed normalized questions, calling the API once for all cache misses."""
+        model = self.embedding_model
+        embeddings = {text: self.embedding_cache.get((model, text)) for text in dict.fromkeys(texts)}
+        to_embed = [text for text, embedding in embeddings.items() if embedding is None]
+        if to_embed:
+            for text, embedding in zip(to_embed, self.embeddings.embed_documents(to_embed)):
+                embeddings[text] = embedding
+                self.embedding_cache.put((model, text), embedding)
+        return [embeddings[text] for text in texts]
+
+    def _retrieve(
+        self,
+        questions: list[str],
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        embed: Callable[[list[str]], list[list[float]]],
+        filters: MetadataFilter | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """
+        Hits with their L2 distances for each question.
+
+        In hybrid mode the BM25 and vector rankings are fused with reciprocal
+        rank fusion, and a question whose BM25 result is decisive skips the
+        embedding call entirely (lexical fast path). In sharded mode every
+        question is embedded here and the shards do the rest.
+
+        Args:
+            embed: Embeds a list of questions; only called for questions that need vectors
+            filters: Only return chunks with matching metadata
+        """
+        # A migration switch replaces index and embedding model together; a
+        # search that overlapped it may have mixed the two, so it runs again
+        while True:
+            generation = self.index_generation
+            if generation % 2:
+                time.sleep(0.001)
+                continue
+            try:
+                results = self._retrieve_once(questions, k, nprobe, ef_search, embed, filters)
+            except Exception:
+                if generation == self.index_generation:
+                    raise
+                continue
+            if generation == self.index_generation:
+                return results
+
+    def _retrieve_once(
+        self,
+        questions: list[str],
+        k: int,
+        nprobe: int | None,
+        ef_search: int | None,
+        embed: Callable[[list[str]], list[list[float]]],
+        filters: MetadataFilter | None,
+    ) -> list[list[tuple[Document, float]]]:
+        if self.shards is not None:
+            return self.shards.search(questions, embed(questions), k, nprobe, ef_search, filters)
+        if self.retrieval_mode != "hybrid":
+            # Embedded before taking the read guard, so a write never waits for an embedding call
+            vectors = embed(questions)
+            with self._reading():
+                if self.index is None:
+                    return [[] for _ in questions]
+                mask = self._filter_mask(filters)
+                if mask is not None and not mask.any():
+                    return [[] for _ in questions]
+                return self._search_by_vectors(vectors, k, nprobe=nprobe, ef_search=ef_search, mask=mask)
+
+        while True:
+            results: list[list[tuple[Document, float]] | None] = [None] * len(questions)
+            lexical = []
+            with self._reading():
+                if self.index is None:
+                    return [[] for _ in questions]
+                version = self.index_version
+                mask = self._filter_mask(filters)
+                if mask is not None and not mask.any():
+                    return [[] for _ in questions]
+                for i, question in enumerate(questions):
+                    terms = query_terms(question)
+                    hits = self.chunk_store.search_lexical(terms, self.lexical_candidates, mask=mask)
+                    lexical.append([position for position, _ in hits])
+                    results[i] = self._lexical_fast_path(terms, hits, k)
+
+            pending = [i for i, result in enumerate(results) if result is None]
+            if not pending:
+                return results
+            vectors = np.array(embed([questions[i] for i in pending]), dtype=np.float32)
+            with self._reading():
+                if self.index_version != version:
+                    # The BM25 positions are stale: chunks were added or deleted during the embedding call
+                    continue
+                searched = self._search_positions(
+                    vectors, max(k, self.lexical_candidates), nprobe=nprobe, ef_search=ef_search, mask=mask
+                )
+                for i, vector, (_, positions) in zip(pending, vectors, searched):
+                    ranking = positions[positions != -1].tolist()
+                    fused = np.array(reciprocal_rank_fusion([ranking, lexical[i]], self.rrf_k)[:k], dtype=np.int64)
+                    # Exact distances for every fused hit, including those only BM25 found
+                    diff = self.vector_file.read(fused) - vector
+                    distances = np.einsum("ij,ij->i", diff, diff)
+                    results[i] = list(zip(self.chunk_store.get(fused), distances.tolist()))
+            return results
+
+    def _lexical_fast_path(
+        self,
+        terms: list[str],
+        hits: list[tuple[int, float]],
+        k: int,
+    ) -> list[tuple[Document, float]] | None:
+        """
+        BM25 hits when they are decisive on their own, else None.
+
+        Decisive means a short query (exact terms, meter numbers, form names),
+        a top hit that contains every query term, and a top score at least
+        lexical_fast_path_margin times the runner-up's.
+        """
+        if not self.lexical_fast_path or not hits or len(terms) > self.lexical_fast_path_max_terms:
+            return None
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        if hits[0][1] < self.lexical_fast_path_margin * runner_up:
+            return None
+        documents = self.chunk_store.get([position for position, _ in hits[:k]])
+        if not covers(terms, documents[0].page_content):
+            return None
+        self._fast_path_queries += 1
+        # No query embedding, so no distance - decisive lexical hits count as exact matches
+        return [(doc, 0.0) for doc in documents]
 
-        results = self.vectorstore.similarity_search(question, k=k)
+    def _default_k(self) -> int:
+        """Hits to retrieve: the packing candidates when a token budget is set, else top_k."""
+        return self.context_candidates if self.context_token_budget else self.top_k
 
+    def _combine_results(self, results: list[tuple[Document, float]]) -> tuple[str, list[str]]:
+        """Join hit texts into one context string and collect their distinct sources."""
         if not results:
             return "", []
 
+        if self.context_token_budget:
+            return self._pack_results(results)
+
         # Combine results into context
         context_parts = []
         sources = []
 
-        for doc in results:
+        for doc, _score in results:
             context_parts.append(doc.page_content)
             source = doc.metadata.get("source", "Unknown")
             if source not in sources:
@@ -173,32 +1099,249 @@ class RAGService:
         context = "\n\n---\n\n".join(context_parts)
         return context, sources
 
-    def get_collection_stats(self) -> dict:
-        """Get statistics about the vector store."""
+    def _pack_results(self, results: list[tuple[Document, float]]) -> tuple[str, list[str]]:
+        """Relevance-filtered, merged, token-budgeted context (see context_packing)."""
+        passages = pack_context(
+            [(doc, relevance_from_l2(distance)) for doc, distance in results],
+            self.context_token_budget,
+            self._count_tokens,
+            min_relevance=self.context_min_relevance,
+        )
+
+        context = "\n\n---\n\n".join(passage.text for passage in passages)
+        sources = list(dict.fromkeys(passage.source for passage in passages))
+        return context, sources
+
+    def _search_by_vectors(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        mask: np.ndarray | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """
+        Nearest chunks to each embedding with their L2 distances.
+
+        Only the hits are read from the chunk store, in one lookup for the
+        whole batch.
+        """
+        vectors = np.array(embeddings, dtype=np.float32)
+        searched = self._search_positions(vectors, k, nprobe=nprobe, ef_search=ef_search, mask=mask)
+
+        hits = [(distances[positions != -1], positions[positions != -1]) for distances, positions in searched]
+        unique = np.unique(np.concatenate([positions for _, positions in hits]))
+        documents = dict(zip(unique.tolist(), self.chunk_store.get(unique)))
+        return [
+            [(documents[int(position)], float(distance)) for distance, position in zip(distances, positions)]
+            for distances, positions in hits
+        ]
+
+    def _search_positions(
+        self,
+        vectors: np.ndarray,
+        k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        mask: np.ndarray | None = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Batched index search for full-dimension query vectors of shape (q, dim).
+
+        With quantized storage and faiss_rerank_factor set, or with a
+        reduced-dimension index, k * factor candidates are fetched and
+        re-scored with their exact full-dimension vectors, which are read from
+        the memory-mapped vector file (once for the whole batch).
+
+        With a mask the search is pre-filtered: the bitmap goes to FAISS as an
+        IDSelector, so non-matching chunks are never scored. HNSW and IVF lose
+        recall when few chunks match (the graph walk or the probed cells reach
+        too few of them), so up to filter_exact_max matching chunks are scored
+        exactly from the vector file instead.
+
+        Returns:
+            One (distances, positions) pair per query; positions may contain -1
+        """
+        index = self.index
+        selector = None
+        if mask is not None:
+            allowed = np.flatnonzero(mask)
+            approximate = index_kind(index) != "flat"
+            if not supports_selector(index) or (approximate and len(allowed) <= self.filter_exact_max):
+                exact = self.vector_file.read(allowed)
+                return [exact_rerank(query, allowed, exact, k) for query in vectors]
+            # The selector only points into the bitmap, which must stay alive until the search returns
+            bitmap = np.packbits(mask, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        params = search_params(self.index_config, index, nprobe=nprobe, ef_search=ef_search, selector=selector)
+        factor = self.index_config.rerank_factor_for(
+            quantized=self._index_meta.get("quantization", "none") != "none",
+            reduced=index.d < vectors.shape[1],
+        )
+        rerank = factor > 1
+        fetch = k * factor if rerank else k
+
+        distances, positions = index.search(reduce_dims(vectors, index.d), fetch, params=params)
+        if not rerank:
+            return list(zip(distances, positions))
+
+        candidates = np.unique(positions[positions != -1])
+        exact = self.vector_file.read(candidates)
+        results = []
+        for query, row in zip(vectors, positions):
+            valid = row[row != -1]
+            rows = np.searchsorted(candidates, valid)
+            results.append(exact_rerank(query, valid, exact[rows], k))
+        return results
+
+    def get_collection_stats(self, include_recall: bool = False) -> dict:
+        """
+        Get statistics about the vector store.
+
+        Args:
+            include_recall: Also estimate recall@10 of the index against exact
+                search (cached until the index changes)
+        """
         count = 0
-        if self.vectorstore:
-            count = self.vectorstore.index.ntotal
-        return {
-            "total_documents": count,
-            "collection_name": "faiss_index",
+        stats = {
+            "collection_name": self.collection,
+            "index_type": self.index_config.index_type,
+            "quantization": self.index_config.quantization,
+            "index_memory_bytes": 0,
+            "vectors_on_disk_bytes": 0,
+            "search_dimensions": 0,
+            "vector_dimensions": 0,
+            "embedding_batcher": self.query_batcher.metrics() if self.query_batcher else None,
+            "index_version": self.index_version,
+            "retrieval_mode": self.retrieval_mode,
+            "lexical_fast_path_queries": self._fast_path_queries,
+            "query_cache": {
+                "embeddings": self.embedding_cache.stats(),
+                "results": self.result_cache.stats(),
+            },
         }
+        if self.shards is not None:
+            shard_stats = self.shards.broadcast("stats", include_recall, strict=False)
+            answered = [entry for entry in shard_stats if entry is not None]
+            count = sum(entry["total_documents"] for entry in answered)
+            for field in ("index_memory_bytes", "vectors_on_disk_bytes"):
+                stats[field] = sum(entry[field] for entry in answered)
+            for field in ("index_type", "quantization", "search_dimensions", "vector_dimensions"):
+                if answered:
+                    stats[field] = answered[0][field]
+            stats["shards"] = [
+                {**health, "documents": entry["total_documents"] if entry else None}
+                | ({"recall": entry.get("recall")} if include_recall and entry else {})
+                for health, entry in zip(self.shards.health(), shard_stats)
+            ]
+        else:
+            with self._reading():
+                if self.index is not None:
+                    count = self.index.ntotal
+                    stats["index_type"] = self._index_meta.get("index_type", index_kind(self.index))
+                    stats["quantization"] = self._index_meta.get("quantization", "none")
+                    stats["index_memory_bytes"] = index_memory_bytes(self.index)
+                    stats["vectors_on_disk_bytes"] = len(self.vector_file) * self.vector_file.dim * 4
+                    stats["search_dimensions"] = self.index.d
+                    stats["vector_dimensions"] = self.vector_file.dim
+        if include_recall and self.shards is None and self.index is not None:
+            stats["recall"] = self.estimate_recall()
+        stats["total_documents"] = count
+        return stats
+
+    def filter_values(self) -> dict[str, list[str]]:
+        """Distinct values of each filterable metadata field."""
+        if self.shards is not None:
+            values: dict[str, set[str]] = {}
+            for shard_values in self.shards.broadcast("filter_values"):
+                for field, field_values in shard_values.items():
+                    values.setdefault(field, set()).update(field_values)
+            return {field: sorted(field_values) for field, field_values in sorted(values.items())}
+        with self._reading():
+            if self.chunk_store is None:
+                return {}
+            return self.chunk_store.tag_values()
 
+    def estimate_recall(self, sample: int = 50, k: int = 10) -> dict:
+        """
+        Recall@k of the live index (with its current quantization and re-rank
+        settings) against exact search over the full-precision vector file.
+
+        Stored vectors are used as queries, so no embedding calls are made.
+        """
+        with self._reading():
+            if self.index is None:
+                return {}
+            return self._estimate_recall(sample, k)
+
+    def _estimate_recall(self, sample: int, k: int) -> dict:
+        key = (
+            self.index.ntotal,
+            self._index_meta.get("description"),
+            self.index.d,
+            self.index_config.rerank_factor,
+        )
+        if self._recall_cache and self._recall_cache[0] == key:
+            return self._recall_cache[1]
+
+        n = len(self.vector_file)
+        k = min(k, n)
+        rng = np.random.default_rng(0)
+        queries = self.vector_file.read(np.sort(rng.choice(n, size=min(sample, n), replace=False)))
+
+        # Exact top-k by brute force, one block of the vector file at a time
+        exact = faiss.IndexFlatL2(self.vector_file.dim)
+        for start in range(0, n, 100_000):
+            exact.add(self.vector_file.read(np.arange(start, min(n, start + 100_000))))
+        _, truth = exact.search(queries, k)
+
+        hits = 0
+        for (_, found), expected in zip(self._search_positions(queries, k), truth):
+            hits += len(set(found.tolist()) & set(expected.tolist()))
+
+        result = {f"recall@{k}": round(hits / (len(queries) * k), 4), "sample_queries": len(queries)}
+        self._recall_cache = (key, result)
+        return result
+
+    @_write_operation
     def clear_collection(self):
         """Clear all documents from the collection."""
-        self.vectorstore = None
-        self._document_count = 0
+        if self.shards is not None:
+            self.shards.broadcast("clear")
+            self._document_count = 0
+            self.index_version += 1
+            self.manifest.clear()
+            return
+        with self._mutating():
+            self.index = None
+            if self.chunk_store:
+                self.chunk_store.close()
+                self.chunk_store = None
+            self._document_count = 0
+            self._index_meta = {}
+            self._recall_cache = None
+            self.index_version += 1
+            if self.vector_file:
+                self.vector_file.clear()
+                self.vector_file = None
+        self.manifest.clear()
         # Remove saved index
         if os.path.exists(self.faiss_index_path):
             import shutil
             shutil.rmtree(self.faiss_index_path, ignore_errors=True)
 
 
-# Singleton instance
-_rag_service: RAGService | None = None
+def get_rag_service(collection: str | None = None, create: bool = False) -> RAGService:
+    """
+    The service of a collection, loaded on demand (see CollectionManager).
+
+    Args:
+        collection: Collection name (defaults to settings.collection_name)
+        create: Create the collection if it does not exist yet
 
+    Raises:
+        CollectionNotFoundError: If the collection does not exist and create is False
+    """
+    from app.services.collections import get_collection_manager
 
-def get_rag_service() -> RAGService:
-    global _rag_service
-    if _rag_service is None:
-        _rag_service = RAGService()
-    return _rag_service
+    return get_collection_manager().get(collection, create=create)
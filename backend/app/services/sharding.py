@@ -0,0 +1,378 @@
+"""
+Sharded index: the collection is partitioned across N shard worker processes.
+
+    RAGService (coordinator)                       shard worker i (process)
+      embeds chunks and queries                      RAGService over faiss_index/shard_<i>/
+      chunk -> shard by hash(chunk id)  --pipe-->    owns its FAISS index, chunk store,
+      query -> all shards in parallel   <--pipe--    vector file; answers top-k
+      merges top-k by distance
+
+Each shard is a complete single-process RAGService over its slice, so index
+types, quantization, re-ranking, metadata filters and hybrid retrieval work
+unchanged inside a shard. Embedding stays in the coordinator (batching,
+caches, one API client). Shards return their own top-k with exact L2
+distances, which are comparable across shards, and the coordinator keeps the
+k best.
+
+Requests are pipelined: any number of threads may submit to a shard, a
+reader thread per shard routes each reply to its future, and the worker
+handles requests in order. A shard that dies is restarted from its saved
+files on the next request. Searches skip shards that fail or time out
+(reported in the shard health); writes fail loudly and are all or nothing:
+when one shard fails an add or delete, the shards that applied it are
+undone (the chunks removed again, or re-added) before the error is raised.
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+import zlib
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+from langchain_core.documents import Document
+
+_STOP = "stop"
+
+
+def shard_of(chunk_id: str, shard_count: int) -> int:
+    """Shard owning a chunk - stable across processes and restarts (unlike hash())."""
+    return zlib.crc32(chunk_id.encode("utf-8")) % shard_count
+
+
+def _serve(conn, collection: str, directory: str, omp_threads: int):
+    """Shard worker entry point: a RAGService over the shard directory, driven by commands."""
+    import faiss
+    from app.services.rag_service import RAGService
+
+    faiss.omp_set_num_threads(omp_threads)
+    service = RAGService(collection=collection, persist_directory=directory, shard_count=0)
+
+    while True:
+        try:
+            request_id, command, args = conn.recv()
+        except EOFError:
+            return
+        if command == _STOP:
+            return
+        try:
+            conn.send((request_id, True, _handle(service, command, args)))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+def _handle(service, command: str, args: tuple):
+    if command == "search":
+        questions, vectors, k, nprobe, ef_search, filters = args
+        if service.index is None:
+            return [[] for _ in questions]
+        # The coordinator already embedded every question
+        embedded = dict(zip(questions, vectors))
+        return service._retrieve(
+            questions, k, nprobe, ef_search, embed=lambda batch: [embedded[q] for q in batch], filters=filters
+        )
+    if command == "add":
+        ids, chunks, vectors = args
+        return len(service._add_chunks(chunks, vectors=vectors, ids=ids))
+    if command == "delete":
+        # The removed chunks go back to the coordinator, which re-adds them if another shard fails
+        removed = _records(service, args[0])
+        return service._delete_chunks(args[0]), removed
+    if command == "save":
+        return service._save_index()
+    if command == "clear":
+        return service.clear_collection()
+    if command == "stats":
+        return service.get_collection_stats(include_recall=args[0])
+    if command == "filter_values":
+        return service.filter_values()
+    raise ValueError(f"Unknown shard command: {command}")
+
+
+def _records(service, ids: list[str]) -> tuple | None:
+    """(ids, chunks, exact vectors) of the given chunk ids held by the shard, as an "add" takes them."""
+    positions = service.chunk_store.positions_by_id(ids) if service.index is not None else {}
+    if not positions:
+        return None
+    rows = list(positions.values())
+    return list(positions), service.chunk_store.get(rows), service.vector_file.read(rows)
+
+
+class ShardClient:
+    """Connection to one shard worker process."""
+
+    def __init__(self, shard: int, collection: str, directory: str, omp_threads: int, history: int = 1024):
+        self.shard = shard
+        self.collection = collection
+        self.directory = directory
+        self.omp_threads = omp_threads
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending: dict[int, tuple[Future, float]] = {}
+        self.process = None
+        self._conn = None
+
+        self._metrics_lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.restarts = -1
+        self._latency_ms: deque[float] = deque(maxlen=history)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def _start(self):
+        """(Re)start the worker; caller holds the lock."""
+        # spawn, not fork: the parent runs FAISS (OpenMP) and batcher threads
+        context = multiprocessing.get_context("spawn")
+        parent, child = context.Pipe()
+        process = context.Process(
+            target=_serve,
+            args=(child, f"{self.collection}/shard_{self.shard}", self.directory, self.omp_threads),
+            name=f"rag-shard-{self.shard}",
+            daemon=True,
+        )
+        process.start()
+        child.close()
+        # Requests sent to a previous worker will never be answered
+        stale, self._pending = self._pending, {}
+        for future, _ in stale.values():
+            future.set_exception(RuntimeError(f"Shard {self.shard} exited"))
+        self.process, self._conn = process, parent
+        self.restarts += 1
+        if self.restarts:
+            print(f"[RAG] Restarted shard {self.shard} (pid {process.pid})")
+        threading.Thread(target=self._read, args=(parent,), name=f"rag-shard-{self.shard}-reader", daemon=True).start()
+
+    def submit(self, command: str, *args) -> Future:
+        """Send a command; the future resolves with its result or raises its error."""
+        future: Future = Future()
+        with self._lock:
+            if not self.alive:
+                self._start()
+            request_id = next(self._ids)
+            self._pending[request_id] = (future, time.perf_counter())
+            try:
+                self._conn.send((request_id, command, args))
+            except (OSError, ValueError) as e:
+                self._pending.pop(request_id, None)
+                future.set_exception(RuntimeError(f"Shard {self.shard} is unavailable: {e}"))
+        return future
+
+    def _read(self, conn):
+        """Route replies to their futures until the worker's pipe closes."""
+        while True:
+            try:
+                request_id, ok, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future, submitted = self._pending.pop(request_id, (None, 0.0))
+            if future is None:
+                continue
+            with self._metrics_lock:
+                self.requests += 1
+                self.errors += not ok
+                self._latency_ms.append((time.perf_counter() - submitted) * 1000)
+            if ok:
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(f"Shard {self.shard}: {payload}"))
+
+        # Worker exited: fail whatever it did not answer
+        with self._lock:
+            if self._conn is not conn:
+                return
+            pending, self._pending = self._pending, {}
+        for future, _ in pending.values():
+            future.set_exception(RuntimeError(f"Shard {self.shard} exited"))
+
+    def stop(self):
+        with self._lock:
+            if self.alive:
+                try:
+                    self._conn.send((None, _STOP, ()))
+                except OSError:
+                    pass
+                self.process.join(timeout=5)
+                if self.process.is_alive():
+                    self.process.terminate()
+
+    def health(self) -> dict:
+        with self._metrics_lock:
+            latency = np.array(self._latency_ms or [0.0])
+            return {
+                "shard": self.shard,
+                "alive": self.alive,
+                "pid": self.process.pid if self.process else None,
+                "restarts": max(self.restarts, 0),
+                "requests": self.requests,
+                "errors": self.errors,
+                "latency_ms_p50": round(float(np.percentile(latency, 50)), 2),
+                "latency_ms_p99": round(float(np.percentile(latency, 99)), 2),
+            }
+
+
+def _stop_all(clients: list[ShardClient]):
+    for client in clients:
+        client.stop()
+
+
+class ShardPool:
+    def __init__(self, collection: str, directory: str, shard_count: int, omp_threads: int = 1, timeout: float = 30.0):
+        """
+        Args:
+            collection: Collection name (for worker names and logs)
+            directory: Holds one shard_<i> directory per shard and shards.json
+            shard_count: Number of shard worker processes
+            omp_threads: FAISS threads per shard worker
+            timeout: Seconds to wait for a shard before treating it as failed
+
+        Raises:
+            ValueError: If the directory was sharded with a different shard count
+        """
+        meta_path = os.path.join(directory, "shards.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing = json.load(f)["shard_count"]
+            if existing != shard_count:
+                raise ValueError(f"Index is split into {existing} shards but shard_count is {shard_count} - clear and re-index")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            with open(meta_path, "w") as f:
+                json.dump({"shard_count": shard_count}, f)
+
+        self.shard_count = shard_count
+        self.timeout = timeout
+        self.clients = [
+            ShardClient(i, collection, os.path.join(directory, f"shard_{i:02d}"), omp_threads)
+            for i in range(shard_count)
+        ]
+        for client in self.clients:
+            with client._lock:
+                client._start()
+        # Workers go down with the pool, including when an evicted collection is garbage collected
+        self._finalizer = weakref.finalize(self, _stop_all, self.clients)
+
+    def _gather(self, futures: list[Future], strict: bool) -> list:
+        """Results in shard order; failed shards give None unless strict."""
+        results = []
+        for client, future in zip(self.clients, futures):
+            try:
+                results.append(future.result(timeout=self.timeout))
+            except Exception as e:
+                if strict:
+                    raise RuntimeError(f"Shard {client.shard} failed: {e}") from e
+                with client._metrics_lock:
+                    client.errors += 1
+                print(f"[RAG] Shard {client.shard} failed, answering from the others: {e}")
+                results.append(None)
+        return results
+
+    def search(
+        self,
+        questions: list[str],
+        vectors: list[list[float]],
+        k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        filters=None,
+    ) -> list[list[tuple[Document, float]]]:
+        """
+        Top-k hits per question over all shards: every shard answers in
+        parallel, and the k smallest distances across shards are kept.
+
+        Raises:
+            RuntimeError: If no shard answered
+        """
+        futures = [client.submit("search", questions, vectors, k, nprobe, ef_search, filters) for client in self.clients]
+        answers = [answer for answer in self._gather(futures, strict=False) if answer is not None]
+        if not answers:
+            raise RuntimeError("No shard answered the search")
+        merged = []
+        for i in range(len(questions)):
+            hits = [hit for answer in answers for hit in answer[i]]
+            hits.sort(key=lambda hit: hit[1])
+            merged.append(hits[:k])
+        return merged
+
+    def _settle(self, futures: dict[int, Future]) -> tuple[dict[int, object], dict[int, Exception]]:
+        """Wait for a write on every shard it went to: (results, errors) by shard."""
+        results, errors = {}, {}
+        for shard, future in futures.items():
+            try:
+                results[shard] = future.result(timeout=self.timeout)
+            except Exception as e:
+                errors[shard] = e
+        return results, errors
+
+    def _undo(self, futures: dict[int, Future], action: str):
+        """Wait for the undo of a failed write; shards that cannot undo it are logged."""
+        for shard, error in self._settle(futures)[1].items():
+            print(f"[RAG] Shard {shard} could not undo the failed {action}: {error}")
+
+    def add(self, ids: list[str], chunks: list[Document], vectors: np.ndarray):
+        """
+        Route embedded chunks to their shards (see shard_of).
+
+        Raises:
+            RuntimeError: If a shard failed; the chunks were removed again from every shard
+        """
+        routed: dict[int, list[int]] = {}
+        for i, chunk_id in enumerate(ids):
+            routed.setdefault(shard_of(chunk_id, self.shard_count), []).append(i)
+        futures = {
+            shard: self.clients[shard].submit(
+                "add", [ids[i] for i in rows], [chunks[i] for i in rows], vectors[rows]
+            )
+            for shard, rows in routed.items()
+        }
+        _, errors = self._settle(futures)
+        if errors:
+            # Failed shards too: a shard handles requests in order, so this also undoes an add that only timed out
+            self._undo(
+                {shard: self.clients[shard].submit("delete", [ids[i] for i in rows]) for shard, rows in routed.items()},
+                "add",
+            )
+            shard, error = next(iter(errors.items()))
+            raise RuntimeError(f"Shard {shard} failed to add chunks: {error}") from error
+
+    def delete(self, ids: list[str]) -> int:
+        """
+        Remove chunks by chunk id from their shards. Returns how many were removed.
+
+        Raises:
+            RuntimeError: If a shard failed; the other shards got their removed chunks back
+        """
+        routed: dict[int, list[str]] = {}
+        for chunk_id in ids:
+            routed.setdefault(shard_of(chunk_id, self.shard_count), []).append(chunk_id)
+        futures = {shard: self.clients[shard].submit("delete", shard_ids) for shard, shard_ids in routed.items()}
+        results, errors = self._settle(futures)
+        if errors:
+            self._undo(
+                {
+                    shard: self.clients[shard].submit("add", *removed)
+                    for shard, (_, removed) in results.items()
+                    if removed is not None
+                },
+                "delete",
+            )
+            shard, error = next(iter(errors.items()))
+            raise RuntimeError(f"Shard {shard} failed to delete chunks: {error}") from error
+        return sum(count for count, _ in results.values())
+
+    def broadcast(self, command: str, *args, strict: bool = True) -> list:
+        """Run a command on every shard; results in shard order (None for failed shards unless strict)."""
+        return self._gather([client.submit(command, *args) for client in self.clients], strict=strict)
+
+    def health(self) -> list[dict]:
+        return [client.health() for client in self.clients]
+
+    def close(self):
+        self._finalizer()
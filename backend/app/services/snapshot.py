@@ -0,0 +1,252 @@
+"""
+Index snapshots and bulk import of precomputed embeddings.
+
+A snapshot is one uncompressed tar file holding everything a collection needs
+to serve, so a new node loads it instead of re-running every loader and
+re-embedding the corpus:
+
+    snapshot.json      format version, collection, embedding model, counts
+    index_meta.json    how the FAISS index was built
+    index.faiss        the FAISS index
+    vectors.npy        full-precision vectors (float32, rows = index positions)
+    chunks.sqlite      chunk store: text, metadata, BM25 index, filter tags
+    positions.npy      chunk store position -> rowid array
+    manifest.json      directory sync file manifest
+
+Tar keeps members uncompressed at 512-byte aligned offsets, so open_vectors()
+memory-maps vectors.npy straight out of the archive without extracting it.
+
+Importing a snapshot replaces the collection's index with one directory swap
+while writes are paused (like a migration switch). import_vectors() appends a
+raw .npy matrix of precomputed vectors with a JSONL file of chunk records.
+Neither calls the embedding API.
+"""
+
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import uuid
+from itertools import islice
+import numpy as np
+from langchain_core.documents import Document
+from app.services.manifest import DocumentManifest
+
+FORMAT = "rag-snapshot"
+VERSION = 1
+
+_COPY_ROWS = 65_536
+_INDEX_FILES = ("index.faiss", "index_meta.json", "positions.npy")
+
+
+def export_snapshot(service, path: str) -> dict:
+    """
+    Write the collection's index to a snapshot file.
+
+    Writes are paused only while the files are copied aside, not while the
+    archive is written.
+
+    Returns:
+        The snapshot header (snapshot.json)
+
+    Raises:
+        ValueError: If the collection is empty or sharded
+    """
+    if service.shards is not None:
+        raise ValueError("Snapshots are not supported in sharded mode")
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=directory, prefix=".snapshot-") as staging:
+        with service.pause_writes():
+            if service.index is None:
+                raise ValueError("The collection is empty - nothing to export")
+            service._save_index()
+            for name in _INDEX_FILES:
+                shutil.copyfile(os.path.join(service.faiss_index_path, name), os.path.join(staging, name))
+            service.chunk_store.backup(os.path.join(staging, "chunks.sqlite"))
+            _write_npy(service.vector_file, os.path.join(staging, "vectors.npy"))
+            service.manifest.save()
+            shutil.copyfile(service.manifest.manifest_path, os.path.join(staging, "manifest.json"))
+            header = {
+                "format": FORMAT,
+                "version": VERSION,
+                "collection": service.collection,
+                "embedding_model": service.embedding_model,
+                "chunks": service.index.ntotal,
+                "dimensions": service.vector_file.dim,
+                "index_type": service._index_meta.get("index_type"),
+                "created_at": time.time(),
+            }
+
+        tmp_path = path + ".tmp"
+        with tarfile.open(tmp_path, "w") as tar:
+            data = json.dumps(header, indent=2).encode("utf-8")
+            info = tarfile.TarInfo("snapshot.json")
+            info.size, info.mtime = len(data), int(header["created_at"])
+            tar.addfile(info, io.BytesIO(data))
+            for name in ("index_meta.json", "index.faiss", "vectors.npy", "chunks.sqlite", "positions.npy", "manifest.json"):
+                tar.add(os.path.join(staging, name), arcname=name)
+        os.replace(tmp_path, path)
+    print(f"[RAG] Exported {header['chunks']} chunks of '{service.collection}' to {path}")
+    return header
+
+
+def _write_npy(vector_file, path: str):
+    n = len(vector_file)
+    matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, vector_file.dim))
+    for start in range(0, n, _COPY_ROWS):
+        matrix[start:start + _COPY_ROWS] = vector_file.read(np.arange(start, min(n, start + _COPY_ROWS)))
+    matrix.flush()
+    del matrix
+
+
+def read_header(path: str) -> dict:
+    """
+    The snapshot.json of a snapshot file.
+
+    Raises:
+        ValueError: If the file is not a snapshot of a supported version
+    """
+    try:
+        with tarfile.open(path, "r:") as tar:
+            header = json.load(tar.extractfile("snapshot.json"))
+    except (tarfile.TarError, KeyError, json.JSONDecodeError) as e:
+        raise ValueError(f"Not a snapshot file: {e}")
+    if header.get("format") != FORMAT:
+        raise ValueError("Not a snapshot file")
+    if header.get("version", 0) > VERSION:
+        raise ValueError(f"Snapshot version {header['version']} is newer than supported ({VERSION})")
+    return header
+
+
+def open_vectors(path: str) -> np.memmap:
+    """The vectors of a snapshot, memory-mapped in place inside the tar file."""
+    with tarfile.open(path, "r:") as tar:
+        member = tar.getmember("vectors.npy")
+    with open(path, "rb") as f:
+        f.seek(member.offset_data)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset, order="F" if fortran_order else "C")
+
+
+def import_snapshot(service, path: str, replace: bool = False) -> dict:
+    """
+    Replace the collection's index with a snapshot. The collection adopts the
+    snapshot's embedding model.
+
+    Args:
+        service: The collection's RAGService
+        path: Snapshot file
+        replace: Allow replacing a collection that has documents
+
+    Returns:
+        The snapshot header
+
+    Raises:
+        ValueError: If the file is not a valid snapshot, the collection is
+            sharded, or it has documents and replace is False
+    """
+    from app.services.embeddings import create_embeddings
+
+    header = read_header(path)
+    if service.shards is not None:
+        raise ValueError("Snapshots are not supported in sharded mode")
+    if service.index is not None and not replace:
+        raise ValueError(f"Collection '{service.collection}' is not empty - pass replace=true to overwrite it")
+
+    staging = service.faiss_index_path + ".importing"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    try:
+        with tarfile.open(path, "r:") as tar:
+            # Copied member by member: extract() would trust paths inside the archive
+            for name in (*_INDEX_FILES, "chunks.sqlite", "manifest.json"):
+                with tar.extractfile(name) as source, open(os.path.join(staging, name), "wb") as target:
+                    shutil.copyfileobj(source, target, 1 << 20)
+        vectors = open_vectors(path)
+        positions = np.load(os.path.join(staging, "positions.npy"), mmap_mode="r")
+        if vectors.shape != (header["chunks"], header["dimensions"]) or len(positions) != header["chunks"]:
+            raise ValueError("Snapshot is inconsistent: vector and chunk counts differ from its header")
+        with open(os.path.join(staging, "vectors.f32"), "wb") as f:
+            for start in range(0, len(vectors), _COPY_ROWS):
+                f.write(np.ascontiguousarray(vectors[start:start + _COPY_ROWS], dtype=np.float32).tobytes())
+        del vectors
+
+        model = header["embedding_model"]
+        with service.pause_writes():
+            if service.index is not None and not replace:
+                raise ValueError(f"Collection '{service.collection}' is not empty - pass replace=true to overwrite it")
+            manifest_path = service.manifest.manifest_path
+            os.replace(os.path.join(staging, "manifest.json"), manifest_path)
+            embeddings = service.embeddings if model == service.embedding_model else create_embeddings(model)
+            # Searches wait from the moment the old files close until the imported index is installed
+            with service._mutating():
+                service._close_index_files()
+                shutil.rmtree(service.faiss_index_path, ignore_errors=True)
+                os.replace(staging, service.faiss_index_path)
+                service._install_index(embeddings, model)
+            service.manifest = DocumentManifest(manifest_path)
+            # The snapshot may have been built with other index settings
+            service._maybe_rebuild_index()
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    print(f"[RAG] Imported {header['chunks']} chunks ({model}) into '{service.collection}' from {path}")
+    return header
+
+
+def import_vectors(service, vectors_path: str, records_path: str, model: str | None = None, batch_size: int = 10_000) -> int:
+    """
+    Add chunks with precomputed embeddings.
+
+    Args:
+        service: The collection's RAGService
+        vectors_path: .npy float matrix, one row per record
+        records_path: JSONL, one {"text": ..., "metadata": {...}, "id": ...} per
+            line ("metadata" and "id" are optional)
+        model: Embedding model the vectors come from; checked against the collection's
+        batch_size: Chunks added per batch
+
+    Returns:
+        Number of chunks added
+
+    Raises:
+        ValueError: If the model, dimensions or record count do not match, a
+            record has no text, or an id is already indexed
+    """
+    if model and model != service.embedding_model:
+        raise ValueError(f"Collection '{service.collection}' is embedded with {service.embedding_model}, not {model}")
+    vectors = np.load(vectors_path, mmap_mode="r")
+    if vectors.ndim != 2:
+        raise ValueError(f"Expected a 2-d vector matrix, got shape {vectors.shape}")
+    if service.vector_file is not None and vectors.shape[1] != service.vector_file.dim:
+        raise ValueError(f"Vectors have {vectors.shape[1]} dimensions, the collection has {service.vector_file.dim}")
+    with open(records_path, encoding="utf-8") as f:
+        count = sum(1 for line in f if line.strip())
+    if count != len(vectors):
+        raise ValueError(f"{count} records but {len(vectors)} vectors")
+
+    added = 0
+    with open(records_path, encoding="utf-8") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        while batch := list(islice(records, batch_size)):
+            chunks, ids = [], []
+            for number, record in enumerate(batch, start=added + 1):
+                if not isinstance(record.get("text"), str):
+                    raise ValueError(f"Record {number} has no text")
+                chunks.append(Document(page_content=record["text"], metadata=dict(record.get("metadata") or {})))
+                ids.append(str(record.get("id") or uuid.uuid4()))
+            if service.chunk_store is not None and len(service.chunk_store.positions_of(ids)):
+                raise ValueError("Some record ids are already indexed")
+            rows = np.ascontiguousarray(vectors[added:added + len(batch)], dtype=np.float32)
+            service._add_chunks(chunks, vectors=rows, ids=ids)
+            added += len(batch)
+    service._save_index()
+    print(f"[RAG] Imported {added} precomputed embeddings into '{service.collection}'")
+    return added
@@ -0,0 +1,247 @@
+"""
+Hebrew-aware, token-sized text splitter.
+
+Text is cut into units (paragraphs, list items, sentences) with one
+precompiled boundary pattern that knows Hebrew punctuation (sof pasuq, geresh
+and gershayim closing a sentence, Hebrew-letter list markers). Units are then
+packed greedily into chunks measured in tokens of the embedding model's
+tokenizer, preferring to end a chunk on a paragraph boundary.
+"""
+
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator
+import tiktoken
+from langchain_core.documents import Document
+
+# Every boundary starts with one of these characters. Keeping that set as the
+# single leading charset lets the regex engine skip ahead instead of trying
+# each alternative at every position, which is several times faster.
+_BOUNDARY = re.compile(
+    r"[\n.!?…׃](?:"
+    # Paragraph break: a blank line
+    r"(?<=\n)[ \t]*\n\s*"
+    # List item: a new line starting with a bullet, "1." / "1)" or a Hebrew letter marker "א."
+    r"|(?<=\n)(?=[ \t]*(?:[-*•●▪–]|\d{1,3}[.)]|[א-ת][.)])[ \t])"
+    # Sentence end (incl. sof pasuq): terminator, optional closing quotes/brackets, then whitespace
+    r"|(?<!\n)[\"'׳״”’)\]]*(?=\s)"
+    r")"
+)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str) -> tiktoken.Encoding:
+    """Tokenizers are expensive to build, so each one is created once per process."""
+    return tiktoken.get_encoding(encoding_name)
+
+
+@lru_cache(maxsize=None)
+def load_encoding(encoding_name: str) -> "tiktoken.Encoding | ApproximateEncoding":
+    """
+    The tiktoken encoding, or an ApproximateEncoding where it cannot be
+    loaded. tiktoken downloads encodings on first use, which fails on offline
+    hosts; the outcome is cached, so the download is attempted once per process.
+    """
+    try:
+        return get_encoding(encoding_name)
+    except Exception as e:
+        print(f"[RAG] Tokenizer '{encoding_name}' unavailable ({type(e).__name__}); estimating tokens from text length")
+        return ApproximateEncoding(encoding_name)
+
+
+def token_counter(encoding_name: str) -> Callable[[str], int]:
+    """Token count of a text under an encoding (see load_encoding)."""
+    encoding = load_encoding(encoding_name)
+    if isinstance(encoding, ApproximateEncoding):
+        return lambda text: (len(text.encode("utf-8")) + 2) // 3
+    return lambda text: len(encoding.encode_ordinary(text))
+
+
+class ApproximateEncoding:
+    """
+    Offline stand-in for a tiktoken encoding. A "token" is a run of
+    characters of at most 3 UTF-8 bytes (a longer character is a token of its
+    own), which over-estimates BPE token counts, so chunk sizes and budgets
+    are still respected. Tokens are the substrings themselves.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def encode_ordinary(self, text: str) -> list[str]:
+        tokens, start, size = [], 0, 0
+        for i, char in enumerate(text):
+            width = 1 if char < "\x80" else 2 if char < "\u0800" else 3 if char < "\U00010000" else 4
+            if i > start and size + width > 3:
+                tokens.append(text[start:i])
+                start, size = i, 0
+            size += width
+        if text:
+            tokens.append(text[start:])
+        return tokens
+
+    def decode_with_offsets(self, tokens: list[str]) -> tuple[str, list[int]]:
+        offsets, position = [], 0
+        for token in tokens:
+            offsets.append(position)
+            position += len(token)
+        return "".join(tokens), offsets
+
+
+def create_text_splitter(settings):
+    """The splitter selected by settings.text_splitter."""
+    if settings.text_splitter == "hebrew":
+        #native splitter: Hebrew-aware boundaries, chunk size measured in embedding-model tokens
+        return HebrewTextSplitter(
+            chunk_size=settings.chunk_size_tokens,
+            chunk_overlap=settings.chunk_overlap_tokens,
+            encoding_name=settings.tokenizer_encoding,
+        )
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    #tries to split on natural boundaries first such as paragraphs, then sentences, then characters
+    return RecursiveCharacterTextSplitter(
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        length_function=len, #chunk size is measured in characters, not tokens
+        add_start_index=True, #lets context packing merge overlapping neighbours exactly
+    )
+
+
+class HebrewTextSplitter:
+    def __init__(
+        self,
+        chunk_size: int = 300,
+        chunk_overlap: int = 60,
+        encoding_name: str = "cl100k_base",
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.encoding = load_encoding(encoding_name)
+
+    def _units(self, text: str) -> list[tuple[int, int, bool]]:
+        """Cut text into (start, end, starts_block) spans with surrounding whitespace trimmed."""
+        spans = []
+        start, block = 0, True
+        for match in _BOUNDARY.finditer(text):
+            cut = match.end()
+            spans.append((start, cut, block))
+            # Anything starting with a new line is a paragraph or list item, not a sentence
+            start, block = cut, match.group().startswith("\n")
+        spans.append((start, len(text), block))
+
+        units = []
+        for start, end, block in spans:
+            piece = text[start:end]
+            stripped = piece.strip()
+            if stripped:
+                start += len(piece) - len(piece.lstrip())
+                units.append((start, start + len(stripped), block))
+        return units
+
+    def _split_long_unit(self, text: str, start: int, end: int) -> list[tuple[int, int, int]]:
+        """Token-window split for a single unit that is larger than chunk_size."""
+        encode = self.encoding.encode_ordinary
+        tokens = encode(text[start:end])
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        pieces = []
+        i = 0
+        while True:
+            j = min(i + self.chunk_size, len(tokens))
+            while True:
+                piece_start = start + offsets[i]
+                piece_end = start + offsets[j] if j < len(tokens) else end
+                # Offsets round to whole characters: with byte-level tokens a cut through a
+                # multibyte character re-encodes into more tokens than the window held
+                count = len(encode(text[piece_start:piece_end]))
+                if count <= self.chunk_size or j == i + 1:
+                    break
+                j -= 1
+            pieces.append((piece_start, piece_end, count))
+            if j == len(tokens):
+                break
+            i = max(j - self.chunk_overlap, i + 1)
+        return pieces
+
+    def _iter_spans(self, text: str) -> Iterator[tuple[int, int]]:
+        units = self._units(text)
+        if not units:
+            return
+        # Count each unit together with the whitespace before it, so that the sum
+        # over a chunk never undercounts the separators between its units
+        pieces = [text[s:e] for s, e, _ in units[:1]]
+        pieces += [text[prev[1]:cur[1]] for prev, cur in zip(units, units[1:])]
+        encode = self.encoding.encode_ordinary
+        counts = [len(encode(piece)) for piece in pieces]
+
+        # Current chunk as parallel lists of unit spans / token counts / block flags
+        spans: list[tuple[int, int]] = []
+        sizes: list[int] = []
+        blocks: list[bool] = []
+        total = 0
+
+        def emit(n: int) -> tuple[int, int]:
+            """Emit the first n units and keep an overlap tail of them for the next chunk."""
+            nonlocal spans, sizes, blocks, total
+            chunk = (spans[0][0], spans[n - 1][1])
+            keep, overlap = n, 0
+            while keep > 1 and overlap + sizes[keep - 1] <= self.chunk_overlap:
+                keep -= 1
+                overlap += sizes[keep]
+            spans, sizes, blocks = spans[keep:], sizes[keep:], blocks[keep:]
+            total = sum(sizes)
+            return chunk
+
+        for (start, end, block), count in zip(units, counts):
+            if count > self.chunk_size:
+                if spans:
+                    yield spans[0][0], spans[-1][1]
+                pieces = self._split_long_unit(text, start, end)
+                for piece_start, piece_end, _ in pieces[:-1]:
+                    yield piece_start, piece_end
+                # The tail of the long unit is packed together with what follows
+                start, end, count = pieces[-1]
+                spans, sizes, blocks, total = [(start, end)], [count], [block], count
+                continue
+
+            if spans and total + count > self.chunk_size:
+                # Prefer ending on the last paragraph/list boundary if the chunk is at least half full
+                cut = len(spans)
+                for i in range(len(spans) - 1, 0, -1):
+                    if blocks[i]:
+                        if sum(sizes[:i]) >= self.chunk_size // 2:
+                            cut = i
+                        break
+                yield emit(cut)
+                # The overlap tail plus the new unit may still not fit
+                while spans and total + count > self.chunk_size:
+                    spans, sizes, blocks = spans[1:], sizes[1:], blocks[1:]
+                    total = sum(sizes)
+
+            spans.append((start, end))
+            sizes.append(count)
+            blocks.append(block)
+            total += count
+
+        if spans:
+            yield spans[0][0], spans[-1][1]
+
+    def split_text(self, text: str) -> list[str]:
+        return [text[start:end] for start, end in self._iter_spans(text)]
+
+    def iter_split_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """Lazily split pages into chunks, one page at a time."""
+        for document in documents:
+            text = document.page_content
+            for start, end in self._iter_spans(text):
+                metadata = dict(document.metadata)
+                metadata["start_index"] = start
+                yield Document(page_content=text[start:end], metadata=metadata)
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        return list(self.iter_split_documents(documents))
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
@@ -0,0 +1,111 @@
+"""
+Upload handling: uploads are copied to disk in fixed-size chunks, never read
+into memory whole, and zip archives are unpacked entry by entry with the
+same limits.
+
+Limits (upload_max_mb, upload_max_files) count bytes actually written, not
+the sizes an archive claims in its headers, so a zip bomb stops at the cap.
+"""
+
+import os
+import tempfile
+import zipfile
+from fastapi import UploadFile
+from app.config import get_settings
+
+ARCHIVE_EXTENSIONS = {".zip"}
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+def max_upload_bytes() -> int:
+    """Upload size cap in bytes (0 = no limit)."""
+    return int(get_settings().upload_max_mb * 2**20)
+
+
+async def save_upload(
+    file: UploadFile, suffix: str = "", directory: str | None = None, max_bytes: int | None = None
+) -> str:
+    """
+    Copy an upload to a new temporary file, one chunk at a time. The caller deletes it.
+
+    Args:
+        file: The upload
+        suffix: File name suffix (loaders pick the parser by extension)
+        directory: Where to create the file (default temp directory)
+        max_bytes: Size cap (defaults to upload_max_mb; 0 = no limit)
+
+    Raises:
+        UploadTooLargeError: If the upload exceeds the cap (nothing is left on disk)
+    """
+    max_bytes = max_upload_bytes() if max_bytes is None else max_bytes
+    chunk_size = get_settings().upload_chunk_kb * 1024
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(chunk_size):
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise UploadTooLargeError(f"'{file.filename}' is larger than {max_bytes // 2**20} MB")
+                f.write(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def extract_archive(
+    path: str, name: str, directory: str, extensions: set[str], max_files: int, max_bytes: int
+) -> tuple[dict[str, str], list[str]]:
+    """
+    Unpack the supported files of a zip archive.
+
+    Entries are written under generated names, so paths inside the archive
+    can never point outside the directory.
+
+    Args:
+        path: The archive
+        name: Its upload name; entries are named "<name>/<entry path>"
+        directory: Where to write the entries
+        extensions: File types to extract; others are skipped
+        max_files: Most entries to extract (0 = no limit)
+        max_bytes: Most bytes to extract in total (0 = no limit)
+
+    Returns:
+        (extracted path -> entry name, skipped entry names)
+
+    Raises:
+        ValueError: If the file is not a zip archive or exceeds max_files
+        UploadTooLargeError: If the extracted size exceeds max_bytes
+    """
+    chunk_size = get_settings().upload_chunk_kb * 1024
+    extracted: dict[str, str] = {}
+    skipped: list[str] = []
+    written = 0
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"'{name}' is not a valid zip archive: {e}")
+    with archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            entry = f"{name}/{info.filename}"
+            suffix = os.path.splitext(info.filename)[1].lower()
+            if suffix not in extensions:
+                skipped.append(entry)
+                continue
+            if max_files and len(extracted) >= max_files:
+                raise ValueError(f"'{name}' has more than {max_files} files")
+            fd, target = tempfile.mkstemp(suffix=suffix, dir=directory)
+            with os.fdopen(fd, "wb") as out, archive.open(info) as source:
+                while chunk := source.read(chunk_size):
+                    written += len(chunk)
+                    if max_bytes and written > max_bytes:
+                        raise UploadTooLargeError(f"'{name}' unpacks to more than {max_bytes // 2**20} MB")
+                    out.write(chunk)
+            extracted[target] = entry
+    return extracted, skipped
@@ -0,0 +1,61 @@
+"""
+Full-precision vectors on disk.
+
+A raw float32 matrix file whose rows line up with FAISS index positions. It is
+memory-mapped, so only the rows that are actually read (re-rank candidates,
+recall samples) are paged in. It is also the source for index rebuilds, which
+keeps quantized indexes from losing precision every time they are retrained.
+"""
+
+import os
+import numpy as np
+
+
+class VectorFile:
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self._row_bytes = dim * 4
+        self._mmap: np.memmap | None = None
+
+    def __len__(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        return os.path.getsize(self.path) // self._row_bytes
+
+    def _matrix(self) -> np.ndarray:
+        if self._mmap is None or self._mmap.shape[0] != len(self):
+            n = len(self)
+            if n == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._mmap = np.memmap(self.path, dtype=np.float32, mode="r", shape=(n, self.dim))
+        return self._mmap
+
+    def append(self, vectors: np.ndarray):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def read(self, rows: np.ndarray | list[int]) -> np.ndarray:
+        """Rows by position (copied out of the memory map)."""
+        return np.asarray(self._matrix()[np.asarray(rows)], dtype=np.float32)
+
+    def read_all(self) -> np.ndarray:
+        return np.array(self._matrix(), dtype=np.float32)
+
+    def rewrite(self, vectors: np.ndarray):
+        """Replace the whole file, e.g. after rows were deleted."""
+        self._mmap = None
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        """Drop the memory map (reopened on the next read)."""
+        self._mmap = None
+
+    def clear(self):
+        self._mmap = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
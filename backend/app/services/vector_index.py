@@ -0,0 +1,275 @@
+"""
+FAISS index selection, training and per-query tuning.
+
+The LangChain FAISS wrapper always builds a flat (exact, brute-force) index of
+float32 vectors. These helpers build the index chosen in Settings instead and
+decide when it has to be rebuilt.
+
+Index types:
+- flat: exact search, cost grows linearly with the corpus
+- hnsw: graph index, no training, tuned with efSearch
+- ivf: inverted lists over nlist k-means cells, tuned with nprobe
+
+Vector storage (quantization), independent of the index type:
+- none: float32, 4 bytes per dimension
+- fp16: 2 bytes per dimension
+- sq8: int8 scalar quantization, 1 byte per dimension
+- pq: product quantization, one byte per sub-vector (pq_m bytes per vector)
+
+Reduced-dimension search (search_dims): text-embedding-3 models are trained so
+that a prefix of the vector, re-normalized, is itself a usable embedding. The
+index can hold only the first search_dims dimensions; candidates are then
+re-ranked at full dimension from the vector file on disk.
+
+IVF and PQ need enough vectors to train, so the index stays exact (flat,
+float32) until the corpus reaches min_train_factor times what the training
+needs. Trained indexes are retrained once the corpus has grown
+retrain_growth times since the last training.
+
+All index types use L2 distance, like the flat index LangChain creates, so
+scores stay comparable across types.
+"""
+
+import math
+from dataclasses import dataclass
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+QUANTIZATIONS = ("none", "fp16", "sq8", "pq")
+
+
+@dataclass
+class IndexConfig:
+    index_type: str = "flat"
+    quantization: str = "none"
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 64
+    ivf_nlist: int = 0  # 0 = 4 * sqrt(n), recomputed on every retrain
+    ivf_nprobe: int = 8
+    pq_m: int = 0  # 0 = dim / 4, i.e. 16x smaller than float32
+    rerank_factor: int = 0  # 0 = off, else re-rank k * factor candidates exactly
+    search_dims: int = 0  # 0 = full dimension
+    min_train_factor: int = 39
+    retrain_growth: float = 4.0
+
+    @classmethod
+    def from_settings(cls, settings) -> "IndexConfig":
+        if settings.faiss_index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown faiss_index_type: {settings.faiss_index_type}")
+        if settings.faiss_quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown faiss_quantization: {settings.faiss_quantization}")
+        return cls(
+            index_type=settings.faiss_index_type,
+            quantization=settings.faiss_quantization,
+            hnsw_m=settings.faiss_hnsw_m,
+            hnsw_ef_construction=settings.faiss_hnsw_ef_construction,
+            hnsw_ef_search=settings.faiss_hnsw_ef_search,
+            ivf_nlist=settings.faiss_ivf_nlist,
+            ivf_nprobe=settings.faiss_ivf_nprobe,
+            pq_m=settings.faiss_pq_m,
+            rerank_factor=settings.faiss_rerank_factor,
+            search_dims=settings.faiss_search_dimensions,
+            min_train_factor=settings.faiss_min_train_factor,
+            retrain_growth=settings.faiss_retrain_growth,
+        )
+
+    def nlist_for(self, n: int) -> int:
+        return self.ivf_nlist or max(1, int(4 * math.sqrt(n)))
+
+    def pq_m_for(self, dim: int) -> int:
+        """Sub-quantizer count; must divide the dimension."""
+        m = min(self.pq_m or max(1, dim // 4), dim)
+        while dim % m:
+            m -= 1
+        return m
+
+    def search_dims_for(self, dim: int) -> int:
+        """Dimensions held by the index for vectors of the given full dimension."""
+        return self.search_dims if 0 < self.search_dims < dim else dim
+
+    def rerank_factor_for(self, quantized: bool, reduced: bool) -> int:
+        """
+        Candidates fetched per result for the exact re-rank (0 = no re-rank).
+
+        Reduced-dimension search always re-ranks, with 4x candidates unless
+        rerank_factor says otherwise.
+        """
+        if reduced:
+            return self.rerank_factor if self.rerank_factor > 1 else 4
+        return self.rerank_factor if quantized and self.rerank_factor > 1 else 0
+
+    def min_train_size(self, n: int) -> int:
+        need = 0
+        if self.index_type == "ivf":
+            need = max(need, self.min_train_factor * self.nlist_for(n))
+        if self.quantization == "pq":
+            need = max(need, self.min_train_factor * 256)
+        return need
+
+
+def target_kind(config: IndexConfig, n: int) -> tuple[str, str]:
+    """(index type, quantization) to use for n vectors - exact until training is possible."""
+    if n < config.min_train_size(n):
+        return "flat", "none"
+    return config.index_type, config.quantization
+
+
+def reduce_dims(vectors: np.ndarray, dims: int) -> np.ndarray:
+    """First `dims` dimensions of each row, re-normalized to unit length."""
+    if vectors.shape[1] <= dims:
+        return vectors
+    reduced = np.ascontiguousarray(vectors[:, :dims], dtype=np.float32)
+    norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+    return reduced / np.maximum(norms, 1e-12)
+
+
+def factory_string(config: IndexConfig, kind: str, quantization: str, dim: int, n: int) -> str:
+    """faiss.index_factory description for the given index type and storage."""
+    codec = {
+        "none": "Flat",
+        "fp16": "SQfp16",
+        "sq8": "SQ8",
+        "pq": f"PQ{config.pq_m_for(dim)}",
+    }[quantization]
+    if kind == "hnsw":
+        return f"HNSW{config.hnsw_m}" if quantization == "none" else f"HNSW{config.hnsw_m}_{codec}"
+    if kind == "ivf":
+        return f"IVF{config.nlist_for(n)},{codec}"
+    return codec
+
+
+def needs_rebuild(config: IndexConfig, meta: dict, n: int, dim: int) -> bool:
+    """
+    True when the current index no longer matches the configuration.
+
+    Args:
+        config: Desired index configuration
+        meta: Description of the current index (see build_index)
+        n: Current number of vectors
+        dim: Full dimension of the vectors
+    """
+    if meta.get("dimensions", dim) != config.search_dims_for(dim):
+        return True
+    current = (meta.get("index_type", "flat"), meta.get("quantization", "none"))
+    if current != target_kind(config, n):
+        return True
+    trained = current[0] == "ivf" or current[1] in ("sq8", "pq")
+    return trained and n >= config.retrain_growth * max(meta.get("trained_on", 0), 1)
+
+
+def build_index(config: IndexConfig, vectors: np.ndarray) -> tuple[faiss.Index, dict]:
+    """
+    Build (and train) an index of the configured type holding `vectors`.
+
+    `vectors` are full-dimension; they are reduced to config.search_dims here.
+
+    Returns:
+        Tuple of (index, meta dict describing it, to be persisted next to it)
+    """
+    n, dim = vectors.shape
+    kind, quantization = target_kind(config, n)
+    dims = config.search_dims_for(dim)
+    vectors = reduce_dims(vectors, dims)
+    description = factory_string(config, kind, quantization, dims, n)
+
+    index = faiss.index_factory(dims, description)
+    if kind == "hnsw":
+        index.hnsw.efConstruction = config.hnsw_ef_construction
+        index.hnsw.efSearch = config.hnsw_ef_search
+    if not index.is_trained:
+        index.train(vectors)
+    if kind == "ivf":
+        faiss.extract_index_ivf(index).nprobe = config.ivf_nprobe
+    if n:
+        index.add(vectors)
+
+    meta = {
+        "index_type": kind,
+        "quantization": quantization,
+        "description": description,
+        "trained_on": n,
+        "dimensions": dims,
+        "vector_dimensions": dim,
+    }
+    return index, meta
+
+
+def index_kind(index: faiss.Index) -> str:
+    """Which of INDEX_TYPES a FAISS index is."""
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if faiss.try_extract_index_ivf(index) is not None:
+        return "ivf"
+    return "flat"
+
+
+def all_vectors(index: faiss.Index) -> np.ndarray:
+    """Every stored vector, in id order (exact only for unquantized flat/HNSW indexes)."""
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Approximate RAM held by the index (codes, graph links, ids, centroids)."""
+    if isinstance(index, faiss.IndexHNSW):
+        storage = faiss.downcast_index(index.storage)
+        return index_memory_bytes(storage) + index.hnsw.neighbors.size() * 4
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return ivf.ntotal * (ivf.code_size + 8) + ivf.nlist * ivf.d * 4
+    return index.ntotal * index.code_size
+
+
+def exact_rerank(
+    query: np.ndarray,
+    candidates: np.ndarray,
+    vectors: np.ndarray,
+    k: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Re-score candidates with full-precision vectors.
+
+    Args:
+        query: Query vector, shape (dim,)
+        candidates: Candidate positions, shape (c,)
+        vectors: Full-precision vectors of the candidates, shape (c, dim)
+        k: Results to keep
+
+    Returns:
+        Tuple of (L2 distances, positions), best first
+    """
+    diff = vectors - query
+    distances = np.einsum("ij,ij->i", diff, diff)
+    order = np.argsort(distances)[:k]
+    return distances[order], candidates[order]
+
+
+def search_params(
+    config: IndexConfig,
+    index: faiss.Index,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    selector: faiss.IDSelector | None = None,
+) -> faiss.SearchParameters | None:
+    """
+    Per-query search parameters. Passed to index.search instead of mutating
+    the index, so concurrent queries with different settings do not interfere.
+
+    A selector restricts the search to the ids it contains (see supports_selector).
+    """
+    kind = index_kind(index)
+    if kind == "ivf":
+        return faiss.SearchParametersIVF(nprobe=nprobe or config.ivf_nprobe, sel=selector)
+    if kind == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=ef_search or config.hnsw_ef_search, sel=selector)
+    if selector is not None:
+        return faiss.SearchParameters(sel=selector)
+    return None
+
+
+def supports_selector(index: faiss.Index) -> bool:
+    """Whether index.search honours an IDSelector (flat PQ does not)."""
+    return not isinstance(index, faiss.IndexPQ)
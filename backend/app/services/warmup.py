@@ -0,0 +1,132 @@
+"""
+Startup warm-up and readiness.
+
+Services are otherwise built on first use, so the first chat after a deploy
+pays for loading the FAISS index and chunk store and for creating the OpenAI
+client. The app's lifespan hook runs warm_up() in the background instead:
+
+    1. load the default collection (index, chunk store, vector file)
+    2. create the OpenAI chat client
+    3. pre-warm the query caches with the most frequent recorded questions
+    4. run a dummy search to page the index in
+
+/health only says the process is up; /ready answers 503 until steps 1-2 have
+succeeded and the warm-up has finished. Failures in steps 3-4 are reported
+but do not keep the service from becoming ready.
+"""
+
+import threading
+import time
+from app.config import get_settings
+
+
+class Readiness:
+    def __init__(self):
+        self.state = "starting"  # starting -> warming -> ready | failed
+        self.timings: dict[str, float] = {}
+        self.details: dict = {}
+        self.errors: dict[str, str] = {}
+        self.started_at = time.time()
+        self.ready_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def mark_ready(self):
+        with self._lock:
+            self.state = "ready"
+            self.ready_at = time.time()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "status": self.state,
+                "ready": self.state == "ready",
+                "timings": dict(self.timings),
+                "warmup": dict(self.details),
+                "errors": dict(self.errors),
+                "seconds_to_ready": round(self.ready_at - self.started_at, 3) if self.ready_at else None,
+            }
+
+
+def _step(readiness: Readiness, name: str, action, required: bool) -> bool:
+    """Run one warm-up step, recording its duration or its error."""
+    started = time.perf_counter()
+    try:
+        result = action()
+    except Exception as e:
+        print(f"[RAG] Warm-up step '{name}' failed: {e}")
+        with readiness._lock:
+            readiness.errors[name] = str(e)
+            if required:
+                readiness.state = "failed"
+        return False
+    with readiness._lock:
+        readiness.timings[f"{name}_seconds"] = round(time.perf_counter() - started, 3)
+        if isinstance(result, dict):
+            for key, value in result.items():
+                (readiness.timings if key.endswith("_seconds") else readiness.details)[key] = value
+    return True
+
+
+def warm_up(readiness: Readiness | None = None) -> Readiness:
+    """
+    Load the default collection and clients and pre-warm the query caches.
+
+    Args:
+        readiness: State to report into (defaults to the app's, see get_readiness())
+
+    Returns:
+        The readiness state, ready unless a required step failed
+    """
+    from app.services.openai_service import get_openai_service
+    from app.services.rag_service import get_rag_service
+
+    settings = get_settings()
+    readiness = readiness or get_readiness()
+    readiness.state = "warming"
+    started = time.perf_counter()
+
+    if not _step(readiness, "collection_load", get_rag_service, required=True):
+        return readiness
+    if not _step(readiness, "openai_client", get_openai_service, required=True):
+        return readiness
+    service = get_rag_service()
+    _step(
+        readiness,
+        "cache_warmup",
+        lambda: service.warm_up(settings.warmup_questions, dummy_search=settings.warmup_dummy_search),
+        required=False,
+    )
+
+    readiness.timings["total_seconds"] = round(time.perf_counter() - started, 3)
+    readiness.mark_ready()
+    print(
+        f"[RAG] Warm-up done in {readiness.timings['total_seconds']}s "
+        f"({readiness.details.get('questions', 0)} questions pre-warmed)"
+    )
+    return readiness
+
+
+def save_question_logs():
+    """Persist the question frequencies of every loaded collection (at shutdown)."""
+    from app.services.collections import get_collection_manager
+
+    for service in get_collection_manager().loaded():
+        try:
+            service.question_log.save()
+        except OSError as e:
+            print(f"[RAG] Could not save the question log of '{service.collection}': {e}")
+
+
+# Singleton instance
+_readiness: Readiness | None = None
+
+
+def get_readiness() -> Readiness:
+    global _readiness
+    if _readiness is None:
+        _readiness = Readiness()
+    return _readiness
@@ -82,6 +82,27 @@ RAG_TOOL = {
                 "query": {
                     "type": "string",
                     "description": "The search query - what information to look for (e.g., 'תעריפי מים', 'איך לשלם חשבון', 'שעות פעילות')"
+                },
+                "source": {
+                    "type": "string",
+                    "description": "Optional: only search this document (file name, e.g. 'tariffs_2024.pdf')"
+                },
+                "doc_type": {
+                    "type": "string",
+                    "description": "Optional: only search documents of this file type (e.g. 'pdf', 'docx', 'txt')"
+                },
+                "language": {
+                    "type": "string",
+                    "enum": ["he", "en"],
+                    "description": "Optional: only search text in this language"
+                },
+                "date_from": {
+                    "type": "string",
+                    "description": "Optional: only search documents dated on or after this date (YYYY-MM-DD)"
+                },
+                "date_to": {
+                    "type": "string",
+                    "description": "Optional: only search documents dated on or before this date (YYYY-MM-DD)"
                 }
             },
             "required": ["query"]
@@ -5,7 +5,6 @@ These define HOW each tool works when called.
 
 import random
 import smtplib
-import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
@@ -148,6 +147,8 @@ def get_weather(city: str) -> dict:
     """
     Get current weather for a city in Israel using Open-Meteo API (free, no API key needed).
     """
+    import requests  # Only this tool needs it; keeps it out of app startup
+
     # Normalize city name to lowercase for lookup
     city_lower = city.lower().strip()
 
@@ -230,47 +231,88 @@ def get_weather(city: str) -> dict:
         }
 
 
-def search_knowledge_base(query: str) -> dict:
+def _knowledge_base_result(context: str, sources: list[str]) -> dict:
+    """Tool result for one knowledge base search."""
+    if not context:
+        return {
+            "success": True,
+            "found": False,
+            "message": "לא נמצא מידע רלוונטי במאגר הידע.",
+            "context": "",
+            "sources": []
+        }
+
+    print(f"[RAG TOOL] Found {len(context)} chars from {len(sources)} sources")
+
+    return {
+        "success": True,
+        "found": True,
+        "context": context,
+        "sources": sources,
+        "message": f"נמצא מידע רלוונטי מ-{len(sources)} מקורות."
+    }
+
+
+def _knowledge_base_error(e: Exception) -> dict:
+    print(f"[RAG TOOL] Error: {e}")
+    return {
+        "success": False,
+        "found": False,
+        "message": f"שגיאה בחיפוש במאגר הידע: {str(e)}",
+        "context": "",
+        "sources": []
+    }
+
+
+def search_knowledge_base(
+    query: str,
+    source: str | list[str] = None,
+    doc_type: str | list[str] = None,
+    language: str = None,
+    date_from: str = None,
+    date_to: str = None,
+    collection: str = None,
+) -> dict:
     """
     Search the company knowledge base using RAG.
     This is now a tool that the agent decides when to use.
+
+    The optional arguments restrict the search to matching documents
+    (file name, file type, "he"/"en", document date range YYYY-MM-DD).
+    collection is set by the chat request, not by the model.
     """
+    from app.services.metadata_filter import MetadataFilter
     from app.services.rag_service import get_rag_service
 
     print(f"[RAG TOOL] Searching for: {query}")
 
     try:
-        rag_service = get_rag_service()
-        context, sources = rag_service.query(query)
+        filters = MetadataFilter.from_args(
+            source=source, doc_type=doc_type, language=language, date_from=date_from, date_to=date_to
+        )
+        if filters:
+            print(f"[RAG TOOL] Filters: {filters}")
+        rag_service = get_rag_service(collection)
+        context, sources = rag_service.query(query, filters=filters)
+        return _knowledge_base_result(context, sources)
+    except Exception as e:
+        return _knowledge_base_error(e)
 
-        if not context:
-            return {
-                "success": True,
-                "found": False,
-                "message": "לא נמצא מידע רלוונטי במאגר הידע.",
-                "context": "",
-                "sources": []
-            }
 
-        print(f"[RAG TOOL] Found {len(context)} chars from {len(sources)} sources")
+def search_knowledge_base_many(queries: list[str], collection: str = None) -> list[dict]:
+    """
+    Several knowledge base searches answered with one batched embedding call
+    and one FAISS search (see RAGService.query_many).
+    """
+    from app.services.rag_service import get_rag_service
 
-        return {
-            "success": True,
-            "found": True,
-            "context": context,
-            "sources": sources,
-            "message": f"נמצא מידע רלוונטי מ-{len(sources)} מקורות."
-        }
+    print(f"[RAG TOOL] Searching for {len(queries)} queries in one batch: {queries}")
 
+    try:
+        rag_service = get_rag_service(collection)
+        return [_knowledge_base_result(context, sources) for context, sources in rag_service.query_many(queries)]
     except Exception as e:
-        print(f"[RAG TOOL] Error: {e}")
-        return {
-            "success": False,
-            "found": False,
-            "message": f"שגיאה בחיפוש במאגר הידע: {str(e)}",
-            "context": "",
-            "sources": []
-        }
+        return [_knowledge_base_error(e) for _ in queries]
 
 
 # Map function names to their handlers
@@ -291,3 +333,31 @@ def execute_tool(tool_name: str, arguments: dict) -> dict:
         return handler(**arguments)
     except Exception as e:
         return {"success": False, "message": f"Tool execution error: {str(e)}"}
+
+
+def execute_tools(calls: list[tuple[str, dict]], collection: str = None) -> list[dict]:
+    """
+    Execute all tool calls of one assistant turn, returning results in order.
+
+    When the turn contains several knowledge base searches they are run as
+    one batch instead of one embedding call and search each. Knowledge base
+    searches go to the given collection (None = default).
+    """
+    results: list[dict | None] = [None] * len(calls)
+
+    searches = [
+        i for i, (name, arguments) in enumerate(calls)
+        if name == "search_knowledge_base" and set(arguments) == {"query"} and isinstance(arguments["query"], str)
+    ]
+    if len(searches) > 1:
+        batched = search_knowledge_base_many([calls[i][1]["query"] for i in searches], collection=collection)
+        for i, result in zip(searches, batched):
+            results[i] = result
+
+    for i, (name, arguments) in enumerate(calls):
+        if results[i] is None:
+            if name == "search_knowledge_base":
+                # The collection comes from the request, never from the model
+                arguments = {**arguments, "collection": collection}
+            results[i] = execute_tool(name, arguments)
+    return results
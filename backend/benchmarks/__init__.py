@@ -0,0 +1,7 @@
+"""
+Benchmarks for the RAG pipeline.
+
+Run from the backend directory, e.g.:
+
+    python -m benchmarks.bench_loading --files 200
+"""
@@ -0,0 +1,89 @@
+"""
+Context packing benchmark: prompt tokens of verbatim-joined hits vs packed
+context (merged overlaps, relevance threshold, token budget).
+
+Hits are simulated over a real split (1000/200 characters) of a synthetic
+corpus of short FAQ-style paragraphs: each query hits a run of neighbouring
+chunks of one document (as when a topic spans several chunks) plus unrelated
+distractor chunks with lower relevance.
+
+    python -m benchmarks.bench_context --queries 500 --candidates 8 --budget 800
+"""
+
+import argparse
+import random
+
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from benchmarks.common import synthetic_text, percentile, token_counter, write_results
+from app.services.context_packing import pack_context
+
+
+def simulate_hits(chunks_by_doc, rng, candidates, run_length):
+    """Ranked (chunk, relevance) hits: a run of neighbours, then distractors."""
+    doc = rng.choice(chunks_by_doc)
+    first = rng.randrange(max(1, len(doc) - run_length))
+    hits = [(chunk, 0.85 - 0.03 * i) for i, chunk in enumerate(doc[first:first + run_length])]
+    while len(hits) < candidates:
+        other = rng.choice(rng.choice(chunks_by_doc))
+        hits.append((other, rng.uniform(0.25, 0.6)))
+    hits.sort(key=lambda hit: hit[1], reverse=True)
+    return hits[:candidates]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--words", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=8)
+    parser.add_argument("--run-length", type=int, default=4, help="Neighbouring chunks hit per query")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=800)
+    parser.add_argument("--min-relevance", type=float, default=0.5)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    chunks_by_doc = [
+        splitter.split_documents([Document(page_content=synthetic_text(args.words, seed=i, paragraph_words=(8, 30)), metadata={"source": f"doc_{i}.txt"})])
+        for i in range(args.docs)
+    ]
+    tokenizer, count = token_counter()
+    rng = random.Random(0)
+
+    def joined_tokens(hits):
+        return len(count("\n\n---\n\n".join(doc.page_content for doc, _ in hits)))
+
+    runs = {"verbatim_top_k": [], "verbatim_candidates": [], "packed": []}
+    merged_chunks = []
+    for _ in range(args.queries):
+        hits = simulate_hits(chunks_by_doc, rng, args.candidates, args.run_length)
+        runs["verbatim_top_k"].append(joined_tokens(hits[:args.top_k]))
+        runs["verbatim_candidates"].append(joined_tokens(hits))
+        passages = pack_context(hits, args.budget, lambda text: len(count(text)), args.min_relevance)
+        runs["packed"].append(len(count("\n\n---\n\n".join(p.text for p in passages))))
+        merged_chunks.append(sum(p.chunks for p in passages))
+
+    results = {
+        "tokenizer": tokenizer,
+        "candidates": args.candidates,
+        "top_k": args.top_k,
+        "budget": args.budget,
+        "min_relevance": args.min_relevance,
+        "prompt_tokens": {
+            name: {
+                "mean": round(sum(values) / len(values), 1),
+                "p50": percentile(values, 50),
+                "p99": percentile(values, 99),
+            }
+            for name, values in runs.items()
+        },
+        "packed_chunks_per_query": round(sum(merged_chunks) / len(merged_chunks), 2),
+    }
+    write_results("context_packing", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Reduced-dimension search benchmark: a first-stage index over the leading
+dimensions, then an exact re-rank at full dimension from the on-disk vector
+file. Reports memory, latency and recall@k against full-dimension exact search.
+
+Synthetic vectors get a decaying per-dimension scale (--decay) to mimic
+Matryoshka embeddings; with --decay 0 every dimension matters equally and
+truncation is a worst case.
+
+    python -m benchmarks.bench_dimensions --vectors 100000 --dim 1536 --search-dims 128,256,512
+"""
+
+import argparse
+import os
+import tempfile
+
+import faiss
+
+from benchmarks.common import synthetic_vectors, recall_at_k, percentile, timer, write_results
+from app.services.vector_file import VectorFile
+from app.services.vector_index import IndexConfig, build_index, exact_rerank, index_memory_bytes, reduce_dims
+
+
+def run(index, vector_file, queries, truth, k, rerank_factor) -> dict:
+    fetch = k * rerank_factor if rerank_factor > 1 else k
+    latencies, found = [], []
+    for query in queries:
+        with timer() as t:
+            _, ids = index.search(reduce_dims(query[None, :], index.d), fetch)
+            ids = ids[0]
+            if rerank_factor > 1:
+                valid = ids[ids != -1]
+                _, ids = exact_rerank(query, valid, vector_file.read(valid), k)
+        latencies.append(t["seconds"] * 1000)
+        found.append(ids[:k])
+    return {
+        "rerank_factor": rerank_factor,
+        f"recall@{k}": round(recall_at_k(found, truth), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--search-dims", default="128,256,512")
+    parser.add_argument("--rerank-factors", default="1,4,10")
+    parser.add_argument("--decay", type=float, default=0.5)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim, seed=1, decay=args.decay)
+    queries = synthetic_vectors(args.queries, args.dim, seed=2, decay=args.decay)
+
+    results = {"vectors": args.vectors, "dim": args.dim, "decay": args.decay, "runs": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        vector_file = VectorFile(os.path.join(directory, "vectors.f32"), args.dim)
+        vector_file.append(vectors)
+
+        full = faiss.IndexFlatL2(args.dim)
+        full.add(vectors)
+        _, truth = full.search(queries, args.k)
+        baseline = run(full, vector_file, queries, truth, args.k, 0)
+        results["runs"][str(args.dim)] = {"index_memory_mb": round(index_memory_bytes(full) / 2**20, 1), "runs": [baseline]}
+        del full
+
+        for dims in (int(d) for d in args.search_dims.split(",")):
+            index, _ = build_index(IndexConfig(search_dims=dims), vectors)
+            results["runs"][str(dims)] = {
+                "index_memory_mb": round(index_memory_bytes(index) / 2**20, 1),
+                "runs": [
+                    run(index, vector_file, queries, truth, args.k, int(factor))
+                    for factor in args.rerank_factors.split(",")
+                ],
+            }
+            del index
+
+    write_results("dimensions", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Local embedding provider benchmark: throughput, determinism and neighbours.
+
+Embeds synthetic Hebrew/English chunks with LocalHashEmbeddings in batches
+of several sizes and reports texts/s, characters/s and per-query latency
+(embed_query, the path a question takes). It also checks that the vectors
+are identical across calls, batch compositions and a fresh interpreter, and
+that a paraphrase ranks its source chunk first more often than chance.
+
+    python -m benchmarks.bench_embeddings --texts 5000 --dim 384 --batch-sizes 1,32,256,1024
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.common import WORDS, percentile, synthetic_text, timer, write_results
+
+# Runs in a fresh interpreter: digest of the vectors of a few fixed texts
+_CHILD = """
+import hashlib
+from app.services.embeddings import LocalHashEmbeddings
+vectors = LocalHashEmbeddings(dim={dim}).embed_array({texts!r})
+print(hashlib.sha256(vectors.tobytes()).hexdigest())
+"""
+
+
+def digest(vectors: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(vectors).tobytes()).hexdigest()
+
+
+def throughput(embeddings, texts: list[str], batch_size: int) -> dict:
+    characters = sum(len(text) for text in texts)
+    with timer() as t:
+        for start in range(0, len(texts), batch_size):
+            embeddings.embed_array(texts[start:start + batch_size])
+    return {
+        "batch_size": batch_size,
+        "seconds": round(t["seconds"], 3),
+        "texts_per_second": round(len(texts) / t["seconds"], 1),
+        "mchars_per_second": round(characters / t["seconds"] / 1e6, 2),
+    }
+
+
+def determinism(embeddings, texts: list[str], dim: int) -> dict:
+    sample = texts[:20]
+    first = embeddings.embed_array(sample)
+    shuffled = list(range(len(sample)))
+    random.Random(0).shuffle(shuffled)
+    reordered = embeddings.embed_array([sample[i] for i in shuffled])[np.argsort(shuffled)]
+    env = dict(os.environ)
+    # A different hash seed proves the vectors do not depend on Python's hash()
+    env["PYTHONHASHSEED"] = "12345"
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD.format(dim=dim, texts=sample)], capture_output=True, text=True, check=True, env=env
+    )
+    return {
+        "repeat_identical": digest(first) == digest(embeddings.embed_array(sample)),
+        "batch_order_independent": bool(np.array_equal(first, reordered)),
+        "fresh_interpreter_identical": completed.stdout.strip() == digest(first),
+    }
+
+
+def paraphrase_recall(embeddings, texts: list[str], queries: int) -> dict:
+    """Query = 12 words of a chunk, with one word swapped; is its chunk the nearest?"""
+    rng = random.Random(3)
+    matrix = embeddings.embed_array(texts)
+    hits = 0
+    for _ in range(queries):
+        target = rng.randrange(len(texts))
+        words = texts[target].split()
+        start = rng.randrange(max(1, len(words) - 12))
+        query = words[start:start + 12]
+        query[rng.randrange(len(query))] = rng.choice(WORDS)
+        scores = matrix @ embeddings.embed_array([" ".join(query)])[0]
+        hits += int(np.argmax(scores) == target)
+    return {"queries": queries, "top1": round(hits / queries, 3), "chance": round(1 / len(texts), 5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=5_000)
+    parser.add_argument("--words", type=int, default=120, help="Words per text")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-sizes", default="1,32,256,1024")
+    parser.add_argument("--queries", type=int, default=1000, help="embed_query calls timed")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+    from app.services.embeddings import LocalHashEmbeddings
+
+    embeddings = LocalHashEmbeddings(dim=args.dim)
+    texts = [synthetic_text(args.words, seed=i) for i in range(args.texts)]
+    embeddings.embed_array(texts[:10])  # warm-up
+
+    timings = []
+    for i in range(args.queries):
+        with timer() as t:
+            embeddings.embed_query(f"how do I pay the water bill {i} איך משלמים את חשבון המים")
+        timings.append(t["seconds"] * 1_000_000)
+
+    results = {
+        "texts": args.texts,
+        "words_per_text": args.words,
+        "dim": args.dim,
+        "cpus": os.cpu_count(),
+        "batches": [throughput(embeddings, texts, int(size)) for size in args.batch_sizes.split(",")],
+        "embed_query": {
+            "p50_us": round(percentile(timings, 50), 1),
+            "p99_us": round(percentile(timings, 99), 1),
+        },
+        "determinism": determinism(embeddings, texts, args.dim),
+        "paraphrase_recall": paraphrase_recall(embeddings, texts[:2000], min(args.queries, 500)),
+    }
+    write_results("embeddings", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Metadata filter benchmark: selective filters on a large index.
+
+Chunks are tagged so that each filter matches a known fraction of the corpus
+(source: 0.1%, doc_type: 1%, date: 10%). For every filter and index type it
+compares:
+
+- post-filter: unfiltered search for k * overfetch hits, then drop non-matching ones
+- selector:    the chunk store's bitmap passed to FAISS as an IDSelector
+- exact:       score only the matching chunks' vectors (HNSW/IVF, up to filter_exact_max)
+
+and reports latency and recall@k against exact search within the filter.
+Loading the per-value id sets (once per process) and building each filter's
+bitmap (first use of a filter, before it is cached) are timed separately.
+
+    python -m benchmarks.bench_filters --vectors 200000 --dim 256 --index-types flat,hnsw
+"""
+
+import argparse
+import tempfile
+
+import faiss
+import numpy as np
+from langchain.schema import Document
+
+from benchmarks.common import synthetic_vectors, recall_at_k, percentile, timer, write_results
+from app.services.chunk_store import ChunkStore
+from app.services.metadata_filter import MetadataFilter
+from app.services.vector_index import IndexConfig, build_index, exact_rerank, search_params
+
+FILTERS = {
+    "source (0.1%)": MetadataFilter.from_args(source="s0.txt"),
+    "doc_type (1%)": MetadataFilter.from_args(doc_type="t0"),
+    "date (10%)": MetadataFilter.from_args(date_from="2024-01-01", date_to="2024-01-01"),
+}
+
+
+def build_store(directory: str, n: int) -> ChunkStore:
+    store = ChunkStore(directory)
+    for start in range(0, n, 50_000):
+        ids = list(range(start, min(n, start + 50_000)))
+        store.add(
+            [str(i) for i in ids],
+            [
+                Document(
+                    page_content=f"chunk {i}",
+                    metadata={
+                        "source": f"s{i % 1000}.txt",
+                        "doc_type": f"t{i % 100}",
+                        "language": "en",
+                        "date": f"2024-01-{i % 10 + 1:02d}",
+                    },
+                )
+                for i in ids
+            ],
+        )
+    store.save()
+    return store
+
+
+def run(strategy, index, config, vectors, queries, mask, k, overfetch) -> dict:
+    allowed = np.flatnonzero(mask)
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+    latencies, found = [], []
+    for query in queries:
+        with timer() as t:
+            if strategy == "post-filter":
+                _, ids = index.search(query[None, :], k * overfetch, params=search_params(config, index))
+                ids = ids[0][ids[0] != -1]
+                ids = ids[mask[ids]][:k]
+            elif strategy == "selector":
+                _, ids = index.search(query[None, :], k, params=search_params(config, index, selector=selector))
+                ids = ids[0]
+            else:
+                _, ids = exact_rerank(query, allowed, vectors[allowed], k)
+        latencies.append(t["seconds"] * 1000)
+        found.append(ids)
+    return {"latencies": latencies, "found": found}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--index-types", default="flat,hnsw")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--overfetch", type=int, default=10, help="Post-filter fetches k * overfetch hits")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim, seed=1)
+    queries = synthetic_vectors(args.queries, args.dim, seed=2)
+
+    results = {"vectors": args.vectors, "dim": args.dim, "k": args.k, "overfetch": args.overfetch, "filters": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        with timer() as t:
+            store = build_store(directory, args.vectors)
+        results["chunk_store_build_seconds"] = round(t["seconds"], 2)
+        with timer() as t:
+            store.tag_values()
+        results["tag_sets_load_ms"] = round(t["seconds"] * 1000, 1)
+
+        indexes = {}
+        for index_type in args.index_types.split(","):
+            config = IndexConfig(index_type=index_type, min_train_factor=1)
+            indexes[index_type] = (config, build_index(config, vectors)[0])
+
+        for name, metadata_filter in FILTERS.items():
+            with timer() as t:
+                mask = store.filter_mask(metadata_filter)
+            with timer() as cached:
+                store.filter_mask(metadata_filter)
+            allowed = np.flatnonzero(mask)
+            truth = [exact_rerank(query, allowed, vectors[allowed], args.k)[1] for query in queries]
+
+            entry = {
+                "matching_chunks": int(mask.sum()),
+                "bitmap_build_ms": round(t["seconds"] * 1000, 2),
+                "bitmap_cached_ms": round(cached["seconds"] * 1000, 3),
+                "runs": {},
+            }
+            for index_type, (config, index) in indexes.items():
+                for strategy in ("post-filter", "selector", "exact"):
+                    if strategy == "exact" and index_type != next(iter(indexes)):
+                        continue  # Independent of the index
+                    run_result = run(strategy, index, config, vectors, queries, mask, args.k, args.overfetch)
+                    label = "exact" if strategy == "exact" else f"{index_type} {strategy}"
+                    entry["runs"][label] = {
+                        f"recall@{args.k}": round(recall_at_k(run_result["found"], truth), 4),
+                        "p50_ms": round(percentile(run_result["latencies"], 50), 3),
+                        "p99_ms": round(percentile(run_result["latencies"], 99), 3),
+                    }
+            results["filters"][name] = entry
+        store.close()
+
+    write_results("filters", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
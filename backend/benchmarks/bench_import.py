@@ -0,0 +1,115 @@
+"""
+Cold-start import benchmark and import-time budget.
+
+Imports app.main in fresh interpreters with -X importtime and reports the
+median wall time, the slowest modules (cumulative, i.e. including what they
+import) and which heavy libraries were loaded. It also times what warm-up
+adds on top: importing the RAG service and the OpenAI client.
+
+Heavy libraries (FAISS, NumPy, LangChain integrations, openai, requests,
+pypdf, tiktoken) must load on first use or during warm-up, never when the app
+is imported. With --budget-ms the script exits with status 1 if the median
+import time exceeds the budget or a heavy library is imported, so CI can
+run it as a check:
+
+    python -m benchmarks.bench_import --budget-ms 1500
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import write_results
+
+HEAVY_MODULES = [
+    "faiss",
+    "numpy",
+    "openai",
+    "langchain",
+    "langchain_openai",
+    "langchain_community",
+    "langchain_text_splitters",
+    "requests",
+    "pypdf",
+    "tiktoken",
+]
+
+# Runs in a fresh interpreter; must not import anything before the timed import
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+app_seconds = time.perf_counter() - start
+loaded = [m for m in {heavy!r} if m in sys.modules]
+start = time.perf_counter()
+import app.services.rag_service, app.services.openai_service, langchain_openai, openai
+warmup_seconds = time.perf_counter() - start
+print(json.dumps({{"app_seconds": app_seconds, "warmup_imports_seconds": warmup_seconds, "heavy_loaded": loaded}}))
+"""
+
+
+def run_child(importtime: bool) -> tuple[dict, str]:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "unused")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", _CHILD.format(heavy=HEAVY_MODULES)]
+    completed = subprocess.run(command, capture_output=True, text=True, check=True, env=env)
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def slowest_modules(importtime_log: str, top: int) -> list[dict]:
+    """Modules of the app.main import with the highest cumulative import time."""
+    modules = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    # The log lists a package after its submodules; the warm-up imports come last
+    app_end = next(i for i, m in enumerate(modules) if m["module"] == "app.main")
+    modules = modules[: app_end + 1]
+    return sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to report")
+    parser.add_argument("--budget-ms", type=float, default=0, help="Fail if importing app.main takes longer (0 = report only)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    # One untimed run first, so the timed ones see warm bytecode and OS caches
+    run_child(importtime=False)
+    runs = [run_child(importtime=False)[0] for _ in range(args.runs)]
+    _, log = run_child(importtime=True)
+
+    app_ms = statistics.median(run["app_seconds"] for run in runs) * 1000
+    heavy_loaded = sorted({module for run in runs for module in run["heavy_loaded"]})
+    results = {
+        "runs": args.runs,
+        "import_app_main_ms": round(app_ms, 1),
+        "import_app_main_ms_all": [round(run["app_seconds"] * 1000, 1) for run in runs],
+        "warmup_imports_ms": round(statistics.median(run["warmup_imports_seconds"] for run in runs) * 1000, 1),
+        "heavy_modules_loaded": heavy_loaded,
+        "slowest_modules": slowest_modules(log, args.top),
+        "budget_ms": args.budget_ms or None,
+    }
+    failures = []
+    if args.budget_ms and app_ms > args.budget_ms:
+        failures.append(f"import app.main took {app_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+    if args.budget_ms and heavy_loaded:
+        failures.append(f"import app.main loads heavy modules: {', '.join(heavy_loaded)}")
+    results["passed"] = not failures
+
+    write_results("import", results, args.output)
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
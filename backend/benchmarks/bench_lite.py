@@ -0,0 +1,168 @@
+"""
+Per-query overhead benchmark: the full RAGService vs the lite backend.
+
+Both services index the same synthetic chunks with the same vectors in an
+exact flat index, with the query caches off. Embeddings come from a lookup
+table, so what is timed is everything around the FAISS search: result
+records, chunk fetch, context assembly. The raw FAISS search time is
+reported as the floor.
+
+The embedding client overhead is measured separately against a mocked HTTP
+transport (no network): LangChain's OpenAIEmbeddings vs the OpenAI client
+called directly (lite's OpenAIEmbedder). LangChain's default token-length
+pre-check needs the tiktoken encoding, and is reported as skipped when that
+cannot be downloaded.
+
+    python -m benchmarks.bench_lite --chunks 5000 --queries 2000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.common import percentile, synthetic_text, synthetic_vectors, timer, write_results
+
+
+class LookupEmbeddings(Embeddings):
+    """Precomputed vectors by text, so embedding costs nothing."""
+
+    def __init__(self, table: dict[str, np.ndarray]):
+        self.table = table
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.table[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.table[text]
+
+
+def latency(fn, queries: list[str]) -> dict:
+    timings = []
+    for query in queries:
+        with timer() as t:
+            fn(query)
+        timings.append(t["seconds"] * 1_000_000)
+    return {
+        "p50_us": round(percentile(timings, 50), 1),
+        "p99_us": round(percentile(timings, 99), 1),
+        "mean_us": round(sum(timings) / len(timings), 1),
+    }
+
+
+def allocations(fn, queries: list[str]) -> dict:
+    """Memory allocated per query (tracemalloc, Python objects only)."""
+    tracemalloc.start()
+    for query in queries:
+        tracemalloc.reset_peak()
+        fn(query)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_kb": round(peak / 1024, 1)}
+
+
+def client_overhead(dim: int, calls: int) -> dict:
+    """embed_query through each client against a mocked transport."""
+    import httpx
+    from openai import OpenAI
+    from langchain_openai import OpenAIEmbeddings
+    from app.services.lite_rag import OpenAIEmbedder
+
+    payload = json.dumps({
+        "object": "list",
+        "data": [{"object": "embedding", "index": 0, "embedding": [0.1] * dim}],
+        "model": "text-embedding-3-small",
+        "usage": {"prompt_tokens": 5, "total_tokens": 5},
+    }).encode()
+
+    def http_client():
+        return httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=payload)))
+
+    queries = [f"how do I reset my password {i}" for i in range(calls)]
+    direct = OpenAIEmbedder("text-embedding-3-small", client=OpenAI(api_key="unused", http_client=http_client()))
+    results = {"direct_openai": latency(direct.embed_query, queries)}
+    for name, check in (("langchain", True), ("langchain_no_ctx_check", False)):
+        embeddings = OpenAIEmbeddings(
+            api_key="unused", model="text-embedding-3-small", http_client=http_client(), check_embedding_ctx_length=check
+        )
+        try:
+            embeddings.embed_query("warm up")
+        except Exception as e:
+            results[name] = {"skipped": f"{type(e).__name__}: {str(e)[:120]}"}
+            continue
+        results[name] = latency(embeddings.embed_query, queries)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=5_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--words", type=int, default=120, help="Words per chunk")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--client-calls", type=int, default=500, help="embed_query calls per client (0 = skip)")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["CHROMA_PERSIST_DIRECTORY"] = directory
+        os.environ.setdefault("OPENAI_API_KEY", "unused")
+        os.environ["QUERY_RESULT_CACHE_SIZE"] = "0"
+        os.environ["QUERY_EMBEDDING_CACHE_SIZE"] = "0"
+        os.environ["QUERY_BATCH_WINDOW_MS"] = "0"
+        os.environ["FAISS_INDEX_TYPE"] = "flat"
+        os.environ["CONTEXT_TOKEN_BUDGET"] = "0"
+        # Chunks are added whole, so both services store exactly the same texts
+        os.environ["CHUNK_SIZE"] = "1000000"
+        os.environ["CHUNK_OVERLAP"] = "0"
+        from app.services.lite_rag import LiteRAGService
+        from app.services.rag_service import RAGService
+
+        texts = [f"{i} " + synthetic_text(args.words, seed=i) for i in range(args.chunks)]
+        vectors = synthetic_vectors(args.chunks, args.dim, seed=1)
+        queries = [f"query {i}" for i in range(args.queries)]
+        query_vectors = synthetic_vectors(args.queries, args.dim, seed=2)
+        embeddings = LookupEmbeddings({**dict(zip(texts, vectors)), **dict(zip(queries, query_vectors))})
+        metadatas = [{"source": f"doc_{i // 50}.pdf"} for i in range(args.chunks)]
+
+        services = {
+            "full": RAGService(collection="full", persist_directory=os.path.join(directory, "full"), embeddings=embeddings),
+            "lite": LiteRAGService(collection="lite", persist_directory=os.path.join(directory, "lite"), embeddings=embeddings),
+        }
+        for service in services.values():
+            for start in range(0, args.chunks, 10_000):
+                service.add_texts(texts[start:start + 10_000], metadatas[start:start + 10_000])
+
+        index = services["lite"].index
+        raw = latency(lambda q: index.search(np.asarray([embeddings.table[q]], dtype=np.float32), args.k), queries)
+        results = {
+            "chunks": args.chunks,
+            "dim": args.dim,
+            "queries": args.queries,
+            "k": args.k,
+            "faiss_search_only": raw,
+        }
+        assert services["full"].query(queries[0], k=args.k) == services["lite"].query(queries[0], k=args.k)
+        for name, service in services.items():
+            query = lambda q, service=service: service.query(q, k=args.k)
+            results[name] = {
+                **latency(query, queries),
+                **allocations(query, queries[:200]),
+            }
+            results[name]["overhead_p50_us"] = round(results[name]["p50_us"] - raw["p50_us"], 1)
+        results["overhead_ratio_p50"] = round(
+            results["full"]["overhead_p50_us"] / max(results["lite"]["overhead_p50_us"], 0.1), 2
+        )
+        if args.client_calls:
+            results["embedding_client"] = client_overhead(args.dim, args.client_calls)
+
+    write_results("lite", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
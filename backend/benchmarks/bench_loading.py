@@ -0,0 +1,104 @@
+"""
+Parallel document loading benchmark.
+
+Generates a synthetic corpus of .txt and .docx files and runs the ingestion
+pipeline (parse + split, no embedding) with 1..N parser processes. Each
+worker count runs in a fresh interpreter, so its peak memory (of the main
+process and of the largest parser process) is its own and not the high-water
+mark of the runs before it.
+
+    python -m benchmarks.bench_loading --files 200 --words 4000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import synthetic_text, timer, peak_rss_mb, write_results
+from app.services.ingestion import stream_chunks
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+def build_corpus(directory: str, files: int, words: int) -> list[str]:
+    from docx import Document as DocxDocument
+
+    paths = []
+    for i in range(files):
+        text = synthetic_text(words, seed=i)
+        if i % 2:
+            path = os.path.join(directory, f"doc_{i}.docx")
+            docx = DocxDocument()
+            for paragraph in text.split("\n\n"):
+                docx.add_paragraph(paragraph)
+            docx.save(path)
+        else:
+            path = os.path.join(directory, f"doc_{i}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        paths.append(path)
+    return paths
+
+
+def child(workers: int, directory: str):
+    """One worker count over an existing corpus; prints its measurements as JSON."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    paths = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+    chunks = failures = 0
+    with timer() as t:
+        for loaded in stream_chunks(paths, splitter.split_documents, workers=workers):
+            chunks += len(loaded.documents)
+            failures += loaded.error is not None
+    print(json.dumps({
+        "seconds": t["seconds"],
+        "chunks": chunks,
+        "failures": failures,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "worker_peak_rss_mb": round(peak_rss_mb(children=True), 1) if workers > 1 else None,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--words", type=int, default=4000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--child", nargs=2, metavar=("WORKERS", "DIR"), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.child:
+        child(int(args.child[0]), args.child[1])
+        return
+
+    worker_counts = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+
+    runs = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = build_corpus(directory, args.files, args.words)
+        baseline = None
+        for workers in worker_counts:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_loading", "--child", str(workers), directory],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            run = json.loads(output.strip().splitlines()[-1])
+            baseline = baseline or run["seconds"]
+            runs.append({
+                "workers": workers,
+                "seconds": round(run["seconds"], 3),
+                "files_per_second": round(len(paths) / run["seconds"], 1),
+                "speedup": round(baseline / run["seconds"], 2),
+                "chunks": run["chunks"],
+                "failures": run["failures"],
+                "peak_rss_mb": run["peak_rss_mb"],
+                "worker_peak_rss_mb": run["worker_peak_rss_mb"],
+            })
+
+    write_results("loading", {"files": args.files, "words_per_file": args.words, "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+PDF extraction benchmark on a synthetic multi-hundred-page PDF.
+
+Compares PyPDFLoader with extract_pdf_pages cold (sequential and parallel)
+and warm (every page served from the page cache). Also reports the time to
+the first page, which is what the chunker waits for when pages are streamed.
+
+    python -m benchmarks.bench_pdf --pages 400
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import write_synthetic_pdf, timer, write_results
+from app.services.ingestion import resolve_workers
+from app.services.pdf_extract import PageCache, extract_pdf_pages
+from langchain_community.document_loaders import PyPDFLoader
+
+
+def run_stream(path: str, **kwargs) -> dict:
+    first_page = None
+    pages = 0
+    start = time.perf_counter()
+    with timer() as t:
+        for _ in extract_pdf_pages(path, **kwargs):
+            if first_page is None:
+                first_page = time.perf_counter() - start
+            pages += 1
+    return {"seconds": round(t["seconds"], 3), "first_page_seconds": round(first_page, 3), "pages": pages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=0, help="0 = one per CPU core")
+    parser.add_argument("--pages-per-task", type=int, default=32)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+    workers = resolve_workers(args.workers)
+
+    results = {"pages": args.pages, "workers": workers}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "synthetic.pdf")
+        write_synthetic_pdf(path, args.pages)
+        results["file_mb"] = round(os.path.getsize(path) / (1024 * 1024), 2)
+
+        with timer() as t:
+            pages = len(PyPDFLoader(path).load())
+        results["pypdfloader"] = {"seconds": round(t["seconds"], 3), "pages": pages}
+
+        results["sequential"] = run_stream(path, workers=1)
+        results["parallel"] = run_stream(path, workers=workers, pages_per_task=args.pages_per_task)
+
+        cache = PageCache(os.path.join(directory, "pages.sqlite"))
+        results["cold_cache"] = run_stream(path, cache=cache, workers=workers, pages_per_task=args.pages_per_task)
+        results["warm_cache"] = run_stream(path, cache=cache, workers=workers)
+
+    write_results("pdf_extraction", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Quantized index benchmark: memory footprint, recall@k and latency per
+vector storage mode, with and without exact re-rank from the on-disk
+vector file.
+
+    python -m benchmarks.bench_quantization --vectors 50000 --dim 1536
+"""
+
+import argparse
+import os
+import tempfile
+
+import faiss
+
+from benchmarks.common import synthetic_vectors, recall_at_k, percentile, timer, write_results
+from app.services.vector_file import VectorFile
+from app.services.vector_index import (
+    QUANTIZATIONS,
+    IndexConfig,
+    build_index,
+    exact_rerank,
+    index_memory_bytes,
+    search_params,
+)
+
+
+def run(index, config, vector_file, queries, truth, k, rerank_factor) -> dict:
+    params = search_params(config, index)
+    fetch = k * rerank_factor if rerank_factor > 1 else k
+    latencies, found = [], []
+    for query in queries:
+        with timer() as t:
+            distances, ids = index.search(query[None, :], fetch, params=params)
+            ids = ids[0]
+            if rerank_factor > 1:
+                valid = ids[ids != -1]
+                _, ids = exact_rerank(query, valid, vector_file.read(valid), k)
+        latencies.append(t["seconds"] * 1000)
+        found.append(ids[:k])
+    return {
+        "rerank_factor": rerank_factor,
+        f"recall@{k}": round(recall_at_k(found, truth), 4),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat", choices=["flat", "hnsw", "ivf"])
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.vectors, args.dim, seed=1)
+    queries = synthetic_vectors(args.queries, args.dim, seed=2)
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    float32_bytes = args.vectors * args.dim * 4
+    del exact
+
+    modes = {}
+    with tempfile.TemporaryDirectory() as directory:
+        vector_file = VectorFile(os.path.join(directory, "vectors.f32"), args.dim)
+        vector_file.append(vectors)
+
+        for quantization in QUANTIZATIONS:
+            config = IndexConfig(index_type=args.index_type, quantization=quantization, min_train_factor=1)
+            with timer() as t:
+                index, meta = build_index(config, vectors)
+            memory = index_memory_bytes(index)
+            runs = [run(index, config, vector_file, queries, truth, args.k, 0)]
+            if quantization != "none":
+                runs.append(run(index, config, vector_file, queries, truth, args.k, args.rerank_factor))
+            modes[quantization] = {
+                "description": meta["description"],
+                "build_seconds": round(t["seconds"], 2),
+                "index_memory_mb": round(memory / (1024 * 1024), 1),
+                "compression_vs_float32": round(float32_bytes / memory, 1),
+                "runs": runs,
+            }
+            del index
+
+    results = {"vectors": args.vectors, "dim": args.dim, "index_type": args.index_type, "modes": modes}
+    write_results("quantization", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
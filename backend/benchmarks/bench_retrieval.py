@@ -0,0 +1,242 @@
+"""
+Retrieval quality and latency benchmark: chunking, top-k, retrieval mode and
+index type sweeps over a labelled question set.
+
+The dataset (benchmarks/data/retrieval_he_en.json) holds Hebrew and English
+support documents and questions labelled with the document that answers
+them. The documents, plus synthetic distractor documents that make the index
+big enough for HNSW/IVF, are ingested through RAGService.load_directory for
+every (chunk_size, chunk_overlap, index type), and each index is queried in
+every retrieval mode. Reported per configuration:
+
+    ingestion      seconds, chunks, index type actually built, index and RSS memory
+    ranking        recall@k (the labelled source is among the top k chunks) and MRR,
+                   overall and per question language
+    per top_k      query() p50/p99 latency and context tokens per answer
+
+Embeddings come from the local provider by default (offline and
+deterministic, so runs are comparable between commits); --provider openai
+uses the configured OpenAI model. Other settings are read from the
+environment as usual, e.g. TEXT_SPLITTER=hebrew or CONTEXT_TOKEN_BUDGET=800.
+With --baseline, the changes against an earlier --output file are reported.
+
+    python -m benchmarks.bench_retrieval --chunk-sizes 500,1000,2000 --overlaps 0,200 --top-ks 3,5 \\
+        --index-types flat,hnsw --modes vector,hybrid --output retrieval.json
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import subprocess
+import tempfile
+
+from benchmarks.common import current_rss_mb, peak_rss_mb, percentile, synthetic_text, timer, token_counter, write_results
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "retrieval_he_en.json")
+
+
+def configure(**settings):
+    """Set settings through the environment; services created afterwards read them."""
+    from app.config import get_settings
+
+    for name, value in settings.items():
+        os.environ[name.upper()] = str(value)
+    get_settings.cache_clear()
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_corpus(directory: str, dataset: dict, distractors: int, words: int) -> int:
+    """Dataset documents and distractor documents as files; returns the total characters."""
+    os.makedirs(directory)
+    characters = 0
+    documents = dict(dataset["documents"])
+    documents.update({f"distractor_{i}.txt": synthetic_text(words, seed=i) for i in range(distractors)})
+    for name, text in documents.items():
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(text)
+        characters += len(text)
+    return characters
+
+
+def ranking(service, questions: list[dict], ks: list[int]) -> dict:
+    """recall@k and MRR of the labelled sources, overall and per language."""
+    depth = max(ks)
+    ranks = []
+    for question in questions:
+        hits = service._retrieve([question["question"]], depth, None, None, embed=service._embed_many)[0]
+        # Loaded files are recorded with their full path
+        sources = [os.path.basename(doc.metadata.get("source", "")) for doc, _ in hits]
+        ranks.append(sources.index(question["source"]) + 1 if question["source"] in sources else None)
+
+    def summary(selected: list[int | None]) -> dict:
+        return {
+            "questions": len(selected),
+            **{f"recall@{k}": round(sum(1 for r in selected if r and r <= k) / len(selected), 3) for k in ks},
+            "mrr": round(sum(1 / r for r in selected if r) / len(selected), 3),
+        }
+
+    languages = sorted({question.get("language", "") for question in questions})
+    return {
+        **summary(ranks),
+        "by_language": {
+            language: summary([r for r, q in zip(ranks, questions) if q.get("language", "") == language])
+            for language in languages
+        },
+    }
+
+
+def answers(service, questions: list[dict], k: int, repeats: int, count_tokens) -> dict:
+    """query() latency and context size at top_k = k."""
+    timings, tokens = [], []
+    for _ in range(repeats):
+        for question in questions:
+            with timer() as t:
+                context, _ = service.query(question["question"], k=k)
+            timings.append(t["seconds"] * 1000)
+            tokens.append(len(count_tokens(context)))
+    return {
+        "top_k": k,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "context_tokens_mean": round(sum(tokens) / len(tokens), 1),
+        "context_tokens_p99": percentile(tokens, 99),
+    }
+
+
+def compare(configs: list[dict], baseline_path: str) -> list[dict]:
+    """Per configuration, what changed against the configurations of an earlier run."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {config["key"]: config for config in json.load(f)["results"]["configs"]}
+    changes = []
+    for config in configs:
+        before = baseline.get(config["key"])
+        if before is None:
+            continue
+        delta = {
+            metric: round(config["ranking"][metric] - before["ranking"][metric], 3)
+            for metric in config["ranking"]
+            if metric.startswith("recall@") or metric == "mrr"
+            if metric in before["ranking"]
+        }
+        delta["ingestion_seconds"] = round(config["ingestion"]["seconds"] - before["ingestion"]["seconds"], 3)
+        for now, then in zip(config["answers"], before["answers"]):
+            if now["top_k"] == then["top_k"]:
+                delta[f"p50_ms@top_k={now['top_k']}"] = round(now["p50_ms"] - then["p50_ms"], 3)
+        changes.append({"key": config["key"], **delta})
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--chunk-sizes", default="500,1000,2000")
+    parser.add_argument("--overlaps", default="0,200")
+    parser.add_argument("--top-ks", default="3,5")
+    parser.add_argument("--index-types", default="flat,hnsw,ivf")
+    parser.add_argument("--modes", default="vector,hybrid")
+    parser.add_argument("--recall-ks", default="1,3,5,10")
+    parser.add_argument("--distractors", type=int, default=300, help="Synthetic documents added to the corpus")
+    parser.add_argument("--distractor-words", type=int, default=400)
+    parser.add_argument("--ivf-nlist", type=int, default=8, help="IVF cells, small enough to train on the corpus")
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the questions when timing query()")
+    parser.add_argument("--provider", default="local", help="Embedding provider (see settings.embedding_provider)")
+    parser.add_argument("--baseline", help="Earlier --output file to compare against")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    with open(args.dataset, encoding="utf-8") as f:
+        dataset = json.load(f)
+    questions = dataset["questions"]
+    top_ks = [int(k) for k in args.top_ks.split(",")]
+    recall_ks = sorted({int(k) for k in args.recall_ks.split(",")} | set(top_ks))
+    tokenizer, count_tokens = token_counter()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ.setdefault("OPENAI_API_KEY", "unused")
+        # Every query is computed, never served from a cache
+        configure(
+            chroma_persist_directory=directory,
+            embedding_provider=args.provider,
+            faiss_ivf_nlist=args.ivf_nlist,
+            query_result_cache_size=0,
+            query_embedding_cache_size=0,
+            query_batch_window_ms=0,
+            pdf_page_cache="false",
+        )
+        from app.services.embeddings import configured_model
+        from app.services.rag_service import RAGService
+        from app.services.vector_index import index_kind
+
+        corpus = os.path.join(directory, "corpus")
+        characters = write_corpus(corpus, dataset, args.distractors, args.distractor_words)
+        configs = []
+        sweep = itertools.product(
+            [int(size) for size in args.chunk_sizes.split(",")],
+            [int(overlap) for overlap in args.overlaps.split(",")],
+            args.index_types.split(","),
+        )
+        for chunk_size, overlap, index_type in sweep:
+            if overlap >= chunk_size:
+                continue
+            name = f"c{chunk_size}_o{overlap}_{index_type}"
+            configure(chunk_size=chunk_size, chunk_overlap=overlap, faiss_index_type=index_type, retrieval_mode="vector")
+            gc.collect()
+            rss_before = current_rss_mb()
+            service = RAGService(collection=name, persist_directory=os.path.join(directory, name))
+            with timer() as ingest:
+                chunks = service.load_directory(corpus)
+            ingestion = {
+                "seconds": round(ingest["seconds"], 3),
+                "chunks": chunks,
+                "index_type": index_kind(service.index),
+                "index_memory_mb": round(service.memory_bytes() / 2**20, 2),
+                "rss_added_mb": round(current_rss_mb() - rss_before, 1),
+            }
+            for mode in args.modes.split(","):
+                if mode != service.retrieval_mode:
+                    configure(retrieval_mode=mode)
+                    service = RAGService(collection=name, persist_directory=os.path.join(directory, name))
+                configs.append({
+                    "key": f"{name}_{mode}",
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": overlap,
+                    "index_type": index_type,
+                    "retrieval_mode": mode,
+                    "ingestion": ingestion,
+                    "ranking": ranking(service, questions, recall_ks),
+                    "answers": [answers(service, questions, k, args.repeats, count_tokens) for k in top_ks],
+                })
+                print(f"[bench] {configs[-1]['key']}: mrr {configs[-1]['ranking']['mrr']}")
+            del service
+
+        results = {
+            "commit": git_commit(),
+            "dataset": os.path.basename(args.dataset),
+            "documents": len(dataset["documents"]),
+            "distractors": args.distractors,
+            "corpus_characters": characters,
+            "questions": len(questions),
+            "embedding_model": configured_model(),
+            "tokenizer": tokenizer,
+            "cpus": os.cpu_count(),
+            "configs": configs,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+        if args.baseline:
+            results["changes_vs_baseline"] = compare(configs, args.baseline)
+
+    write_results("retrieval", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Sharding benchmark: query throughput and latency vs shard count.
+
+The same synthetic corpus (precomputed vectors, so no embedding calls) is
+indexed in-process (0 shards) and split across 1, 2, 4... shard worker
+processes. Client threads then issue single-question searches concurrently,
+the way parallel API requests reach the service, and the benchmark reports
+QPS, p50/p99 latency and the per-shard document counts. Results are checked
+against the in-process answers.
+
+Sharding pays off when there are several cores to spread shards over; on a
+single core it only adds the pipe round trip.
+
+    python -m benchmarks.bench_shards --vectors 200000 --dim 256 --shards 0,1,2,4 --clients 8
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+
+from langchain.schema import Document
+
+from benchmarks.common import synthetic_vectors, percentile, timer, write_results
+
+
+def build(service, vectors, batch: int = 20_000):
+    for start in range(0, len(vectors), batch):
+        rows = range(start, min(len(vectors), start + batch))
+        service._add_chunks(
+            [Document(page_content=f"chunk {i}", metadata={"source": f"doc_{i // 100}.txt"}) for i in rows],
+            vectors=vectors[start:start + len(rows)],
+            ids=[str(uuid.uuid4()) for _ in rows],
+        )
+    service._save_index()
+
+
+def run(service, queries, k: int, clients: int) -> dict:
+    """Each client thread searches its share of the queries one at a time."""
+    vectors = {f"q{i}": query.tolist() for i, query in enumerate(queries)}
+    latencies: list[float] = []
+    answers: dict[str, list[str]] = {}
+    lock = threading.Lock()
+
+    def client(names: list[str]):
+        for name in names:
+            with timer() as t:
+                hits = service._retrieve([name], k, None, None, embed=lambda batch: [vectors[q] for q in batch])[0]
+            with lock:
+                latencies.append(t["seconds"] * 1000)
+                answers[name] = [doc.page_content for doc, _ in hits]
+
+    names = list(vectors)
+    threads = [threading.Thread(target=client, args=(names[i::clients],)) for i in range(clients)]
+    with timer() as total:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return {
+        "qps": round(len(names) / total["seconds"], 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "answers": answers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--shards", default="0,1,2,4", help="Shard counts to compare (0 = in-process)")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client threads")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    # Shard workers read their settings from the environment they inherit
+    directory = tempfile.mkdtemp(prefix="bench_shards_")
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = directory
+    os.environ["FAISS_INDEX_TYPE"] = args.index_type
+    os.environ["QUERY_RESULT_CACHE_SIZE"] = "0"
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+    from app.services.embeddings import LocalHashEmbeddings
+    from app.services.rag_service import RAGService
+
+    vectors = synthetic_vectors(args.vectors, args.dim, seed=1)
+    queries = synthetic_vectors(args.queries, args.dim, seed=2)
+    embeddings = LocalHashEmbeddings(dim=args.dim)
+
+    results = {
+        "vectors": args.vectors,
+        "dim": args.dim,
+        "index_type": args.index_type,
+        "clients": args.clients,
+        "cpus": os.cpu_count(),
+        "runs": {},
+    }
+    reference = None
+    for shard_count in [int(n) for n in args.shards.split(",")]:
+        service = RAGService(
+            persist_directory=os.path.join(directory, f"shards_{shard_count}"),
+            embeddings=embeddings,
+            shard_count=shard_count,
+        )
+        with timer() as t:
+            build(service, vectors)
+        run(service, queries[:20], args.k, args.clients)  # Warm up
+        entry = run(service, queries, args.k, args.clients)
+        answers = entry.pop("answers")
+        reference = reference or answers
+        entry["build_seconds"] = round(t["seconds"], 2)
+        entry["matches_in_process"] = round(
+            sum(answers[name] == reference[name] for name in reference) / len(reference), 4
+        )
+        if service.shards is not None:
+            stats = service.get_collection_stats()
+            entry["documents_per_shard"] = [shard["documents"] for shard in stats["shards"]]
+            service.shards.close()
+        results["runs"][str(shard_count)] = entry
+
+    shutil.rmtree(directory, ignore_errors=True)
+    write_results("shards", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Snapshot benchmark: bringing up a node from a snapshot vs re-indexing.
+
+A collection of synthetic chunks is indexed once. The benchmark then times:
+
+- reindex:   adding every chunk again through the ingestion path with its
+             vectors precomputed (a lower bound - real re-indexing also pays
+             for loading, splitting and the embedding API)
+- export:    writing the snapshot file
+- import:    loading the snapshot into an empty collection
+- mmap open: memory-mapping the vectors inside the snapshot file
+
+and the latency of the first query after import.
+
+    python -m benchmarks.bench_snapshot --chunks 200000 --dim 256
+"""
+
+import argparse
+import os
+import tempfile
+import uuid
+
+from langchain.schema import Document
+
+from benchmarks.common import synthetic_text, synthetic_vectors, timer, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--words", type=int, default=120, help="Words per chunk")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["CHROMA_PERSIST_DIRECTORY"] = directory
+        os.environ.setdefault("OPENAI_API_KEY", "unused")
+        from app.services.embeddings import LocalHashEmbeddings
+        from app.services import snapshot
+        from app.services.rag_service import RAGService
+
+        embeddings = LocalHashEmbeddings(dim=args.dim)
+        vectors = synthetic_vectors(args.chunks, args.dim, seed=1)
+        chunks = [
+            Document(page_content=synthetic_text(args.words, seed=i), metadata={"source": f"doc_{i // 50}.pdf"})
+            for i in range(args.chunks)
+        ]
+
+        def reindex(name: str) -> RAGService:
+            service = RAGService(collection=name, persist_directory=os.path.join(directory, name), embeddings=embeddings)
+            for start in range(0, args.chunks, 10_000):
+                batch = chunks[start:start + 10_000]
+                service._add_chunks(
+                    [Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in batch],
+                    vectors=vectors[start:start + 10_000],
+                    ids=[str(uuid.uuid4()) for _ in batch],
+                )
+            service._save_index()
+            return service
+
+        with timer() as t_reindex:
+            source = reindex("source")
+        path = os.path.join(directory, "snapshot.tar")
+        with timer() as t_export:
+            source.export_snapshot(path)
+        with timer() as t_mmap:
+            mapped = snapshot.open_vectors(path)
+
+        target = RAGService(collection="target", persist_directory=os.path.join(directory, "target"), embeddings=embeddings)
+        with timer() as t_import:
+            target.import_snapshot(path)
+        query = vectors[:1].tolist()
+        with timer() as t_query:
+            target._retrieve(["q"], 10, None, None, embed=lambda batch: query)
+
+        results = {
+            "chunks": args.chunks,
+            "dim": args.dim,
+            "snapshot_mb": round(os.path.getsize(path) / 2**20, 1),
+            "reindex_seconds": round(t_reindex["seconds"], 2),
+            "export_seconds": round(t_export["seconds"], 2),
+            "import_seconds": round(t_import["seconds"], 2),
+            "mmap_open_ms": round(t_mmap["seconds"] * 1000, 2),
+            "mmap_shape": list(mapped.shape),
+            "first_query_ms": round(t_query["seconds"] * 1000, 2),
+            "import_speedup": round(t_reindex["seconds"] / t_import["seconds"], 1),
+        }
+
+    write_results("snapshot", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Text splitter benchmark: LangChain RecursiveCharacterTextSplitter vs the
+native HebrewTextSplitter.
+
+Reports throughput (MB/s) and the distribution of chunk sizes in tokens -
+the unit we are billed in - for both splitters on the same synthetic text.
+
+    python -m benchmarks.bench_splitter --words 500000
+"""
+
+import argparse
+import statistics
+
+from benchmarks.common import synthetic_text, timer, write_results
+from app.services.text_splitter import HebrewTextSplitter, get_encoding
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+
+def describe(chunks: list[str], seconds: float, size_mb: float, encoding) -> dict:
+    tokens = [len(t) for t in encoding.encode_ordinary_batch(chunks)]
+    return {
+        "seconds": round(seconds, 3),
+        "mb_per_second": round(size_mb / seconds, 2),
+        "chunks": len(chunks),
+        "tokens_mean": round(statistics.mean(tokens), 1),
+        "tokens_stdev": round(statistics.pstdev(tokens), 1),
+        "tokens_min": min(tokens),
+        "tokens_max": max(tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters, recursive splitter")
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--chunk-size-tokens", type=int, default=300)
+    parser.add_argument("--chunk-overlap-tokens", type=int, default=60)
+    parser.add_argument("--encoding", default="cl100k_base")
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    encoding = get_encoding(args.encoding)
+    recursive = RecursiveCharacterTextSplitter(
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap, length_function=len
+    )
+    native = HebrewTextSplitter(args.chunk_size_tokens, args.chunk_overlap_tokens, args.encoding)
+
+    paragraphed = synthetic_text(args.words)
+    # One huge paragraph, e.g. a CRM export or a badly extracted PDF
+    flat = paragraphed.replace("\n\n", " ")
+
+    results = {}
+    for scenario, text in [("paragraphed", paragraphed), ("flat", flat)]:
+        size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+        results[scenario] = {"text_mb": round(size_mb, 2)}
+        for name, splitter in [("recursive", recursive), ("hebrew", native)]:
+            with timer() as t:
+                chunks = splitter.split_text(text)
+            results[scenario][name] = describe(chunks, t["seconds"], size_mb, encoding)
+
+    write_results("splitter", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
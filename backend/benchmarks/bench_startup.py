@@ -0,0 +1,130 @@
+"""
+Cold-start benchmark: pickled LangChain docstore (index.pkl) vs the SQLite
+chunk store.
+
+Both layouts hold the same FAISS index and the same chunks. Each is opened in
+a fresh interpreter, which reports the time to load, the time of a first
+top-k query including fetching the hit texts, and the memory added by loading.
+
+    python -m benchmarks.bench_startup --chunks 200000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+from benchmarks.common import synthetic_text, synthetic_vectors, timer, current_rss_mb, write_results
+
+
+def build(directory: str, chunks: int, dim: int, words: int):
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain.schema import Document
+    from app.services.embeddings import LocalHashEmbeddings
+    from app.services.chunk_store import ChunkStore
+
+    vectors = synthetic_vectors(chunks, dim, seed=1)
+    ids = [str(uuid.uuid4()) for _ in range(chunks)]
+    documents = [
+        Document(page_content=synthetic_text(words, seed=i), metadata={"source": f"doc_{i // 50}.pdf", "page": i % 50})
+        for i in range(chunks)
+    ]
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+
+    legacy = FAISS(
+        embedding_function=LocalHashEmbeddings(dim=dim),
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, documents))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    legacy.save_local(os.path.join(directory, "legacy"))
+
+    store_dir = os.path.join(directory, "store")
+    store = ChunkStore(store_dir)
+    for start in range(0, chunks, 10_000):
+        store.add(ids[start:start + 10_000], documents[start:start + 10_000])
+    store.save()
+    store.close()
+    faiss.write_index(index, os.path.join(store_dir, "index.faiss"))
+
+
+def child(layout: str, directory: str, dim: int, k: int):
+    """Runs in a fresh interpreter: load one layout and answer one query."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+    from app.services.embeddings import LocalHashEmbeddings
+    from app.services.chunk_store import ChunkStore
+
+    baseline = current_rss_mb()
+    query = synthetic_vectors(1, dim, seed=2)
+
+    with timer() as load:
+        if layout == "pickle":
+            vectorstore = FAISS.load_local(
+                os.path.join(directory, "legacy"),
+                LocalHashEmbeddings(dim=dim),
+                allow_dangerous_deserialization=True,
+            )
+        else:
+            index = faiss.read_index(os.path.join(directory, "store", "index.faiss"))
+            store = ChunkStore(os.path.join(directory, "store"))
+
+    with timer() as first_query:
+        if layout == "pickle":
+            _, positions = vectorstore.index.search(query, k)
+            texts = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[p]).page_content for p in positions[0]]
+        else:
+            _, positions = index.search(query, k)
+            texts = [doc.page_content for doc in store.get(positions[0])]
+
+    print(json.dumps({
+        "load_seconds": round(load["seconds"], 3),
+        "first_query_ms": round(first_query["seconds"] * 1000, 2),
+        "rss_added_mb": round(current_rss_mb() - baseline, 1),
+        "hits": len(texts),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--child", nargs=2, metavar=("LAYOUT", "DIR"), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="Write JSON results to this file")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], args.dim, args.k)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        with timer() as t:
+            build(directory, args.chunks, args.dim, args.words)
+        sizes = {
+            "pickle_mb": round(os.path.getsize(os.path.join(directory, "legacy", "index.pkl")) / 2**20, 1),
+            "chunk_store_mb": round(os.path.getsize(os.path.join(directory, "store", "chunks.sqlite")) / 2**20, 1),
+        }
+
+        layouts = {}
+        for layout in ("pickle", "chunk_store"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_startup", "--dim", str(args.dim), "--k", str(args.k),
+                 "--child", layout, directory],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            layouts[layout] = json.loads(output.strip().splitlines()[-1])
+
+    results = {"chunks": args.chunks, "build_seconds": round(t["seconds"], 1), "on_disk": sizes, "layouts": layouts}
+    write_results("startup", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Shared helpers for the benchmark scripts."""
+
+import json
+import os
+import random
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+# Make `app` importable when running a script file directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "water meter bill payment tariff leak pressure pipe technician service "
+    "customer account invoice reading consumption sewage connection "
+    "מים מונה חשבון תשלום תעריף נזילה לחץ צינור טכנאי שירות לקוח חשבונית "
+    "קריאה צריכה ביוב חיבור"
+).split()
+
+
+def synthetic_text(words: int, seed: int = 0, paragraph_words: tuple[int, int] = (40, 120)) -> str:
+    """Paragraphed pseudo-text mixing Hebrew and English vocabulary."""
+    rng = random.Random(seed)
+    paragraphs = []
+    while words > 0:
+        n = min(words, rng.randint(*paragraph_words))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(n))
+        paragraphs.append(sentence.replace(" ", ". ", 1) + ".")
+        words -= n
+    return "\n\n".join(paragraphs)
+
+
+@contextmanager
+def timer():
+    """Yields a dict whose 'seconds' key is filled in on exit."""
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process in MB (children: of its largest terminated child process)."""
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """Current resident set size in MB (Linux; falls back to the peak elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return peak_rss_mb()
+
+
+def token_counter():
+    """(name, encode) of cl100k_base when tiktoken can load it, else of a whitespace word split."""
+    try:
+        from app.services.text_splitter import get_encoding
+
+        return "cl100k_base", get_encoding("cl100k_base").encode_ordinary
+    except Exception:
+        return "words", str.split
+
+
+def write_results(name: str, results: dict, output: str | None = None):
+    """Print results as JSON and optionally write them to a file."""
+    payload = {"benchmark": name, "timestamp": time.time(), "results": results}
+    text = json.dumps(payload, indent=2, ensure_ascii=False)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int = 45, seed: int = 0):
+    """
+    Write a text PDF with the given number of pages using pypdf only.
+
+    Uses the built-in Helvetica font, so only the Latin part of the vocabulary
+    is used.
+    """
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    rng = random.Random(seed)
+    latin = [w for w in WORDS if w.isascii()]
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    resources = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+    })
+
+    for _ in range(pages):
+        page = writer.add_blank_page(612, 792)
+        lines = [" ".join(rng.choice(latin) for _ in range(12)) for _ in range(lines_per_page)]
+        content = "BT /F1 10 Tf 40 760 Td 16 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = DecodedStreamObject()
+        stream.set_data(content.encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = resources
+
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0, clusters: int = 256, decay: float = 0.0):
+    """
+    Unit-norm float32 vectors drawn around random cluster centres, which is
+    closer to real embedding distributions than uniform noise.
+
+    With decay > 0 dimension i is scaled by (i + 1) ** -decay, concentrating
+    information in the leading dimensions like Matryoshka-trained embeddings
+    (text-embedding-3), whose prefixes are usable embeddings on their own.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    scale = (np.arange(1, dim + 1, dtype=np.float32) ** -decay)[None, :]
+    vectors = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, 100_000):
+        end = min(n, start + 100_000)
+        labels = rng.integers(0, clusters, end - start)
+        vectors[start:end] = centres[labels] + 0.6 * rng.standard_normal((end - start, dim), dtype=np.float32)
+        vectors[start:end] *= scale
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found, truth) -> float:
+    """Mean fraction of the exact top-k ids that were found."""
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * len(truth[0]))